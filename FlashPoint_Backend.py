@@ -1,12 +1,37 @@
 import random
-from typing import List, Tuple, Dict, Set
-from mesa import Model, Agent
-from mesa.space import MultiGrid
-from mesa.time import RandomActivation
-import matplotlib.pyplot as plt
+from time import perf_counter
+from typing import List, Optional, Tuple, Dict, Set
+from simcore import BACKEND_BUILTIN, Agent, Model, empty_grid_like, make_grid, make_scheduler
+from board_state import direction_index, OPPOSITE, POI_REVEALED, POI_VICTIM
+from board_topology import BoardTopology
+from edge_store import EDGE_DOOR, DOOR_CLOSED, DOOR_DESTROYED, DOOR_OPEN, COST_OPEN
+from fire_frontier import FireFrontier
+from shockwave_rays import ShockwaveRays
+from agent_registry import AgentRegistry
+from free_cells import EXCLUDE_FIRE, EXCLUDE_OCCUPIED, EXCLUDE_POI, FreeCellIndex
+from navigation import FIELD_EXITS, FIELD_FIRE, FIELD_POIS, NavigationFields
+from reservations import CooperativePathing
+from checkpoint import decode_checkpoint, encode_checkpoint, stream_mask
+from lookahead import ACTION_CHOP, ACTION_DOOR, ACTION_EXTINGUISH, ACTION_MOVE, ACTION_RULES
+from memory_report import model_memory_report
+from file_parser import board_size, parse_game_config
+
+# Flujos de azar del juego que se pueden sembrar por separado (ver FlashPointModel, streams)
+RNG_STREAMS = ("fire", "poi", "respawn")
+
+
+def stream_seeds(seed) -> Dict[str, str]:
+    """
+    Semillas de los flujos de RNG_STREAMS derivadas de la semilla de un juego, distintas entre sí
+    y entre juegos, para el argumento streams de FlashPointModel.
+    """
+    return {name: f"{seed}/{name}" for name in RNG_STREAMS}
 
 
 class FirefighterAgent(Agent):
+    # Estado compacto del bombero, sin __dict__ por instancia
+    __slots__ = ("position", "ap", "saved_ap", "max_ap", "carrying_victim", "focus")
+
     def __init__(self, unique_id: int, model: 'FlashPointModel'):
         """
         Inicializa un nuevo agente bombero.
@@ -22,7 +47,24 @@ class FirefighterAgent(Agent):
         self.saved_ap = 0  # Puntos de acción guardados
         self.max_ap = 8  # Puntos de acción máximos permitidos
         self.carrying_victim = False  # Estado de si el agente está cargando una víctima
-        self.focus = "rescue" if self.unique_id < self.model.n_agents // 2 else "extinguish"
+        self.focus = "rescue" if self.unique_id < self.model.n_rescuers else "extinguish"
+
+    def fork(self, model: 'FlashPointModel') -> 'FirefighterAgent':
+        """
+        Crea una copia del bombero para una copia del modelo (ver FlashPointModel.fork),
+        sin colocarla en la cuadrícula.
+        """
+        twin = FirefighterAgent.__new__(FirefighterAgent)
+        twin.unique_id = self.unique_id
+        twin.model = model
+        twin.pos = None
+        twin.position = self.position
+        twin.ap = self.ap
+        twin.saved_ap = self.saved_ap
+        twin.max_ap = self.max_ap
+        twin.carrying_victim = self.carrying_victim
+        twin.focus = self.focus
+        return twin
 
     def get_position(self) -> Tuple[int, int]:
         """
@@ -65,7 +107,7 @@ class FirefighterAgent(Agent):
             return False
 
         # Verifica si la celda de destino está vacía
-        if not self.model.grid.is_cell_empty(new_pos):
+        if not self.model.board.is_free(new_pos):
             return False
 
         # Calcula el costo de puntos de acción para moverse a la nueva posición
@@ -78,12 +120,15 @@ class FirefighterAgent(Agent):
         # Verifica si el bombero tiene suficientes puntos de acción
         if self.ap >= ap_cost:
             self.ap -= ap_cost  # Reduce los puntos de acción
+            self.model.board.move_occupant(self.pos, new_pos)  # Actualiza la ocupación del tablero
+            self.model.agents.move(self, self.position, new_pos)  # Actualiza el índice de bomberos por celda
             self.model.grid.move_agent(self, new_pos)  # Mueve al bombero en el grid
             self.position = new_pos  # Actualiza la posición del bombero
-            print(f"Bombero {self.unique_id} se movió a {new_pos} con {self.ap} AP")
+            if not self.model.quiet:
+                print(f"Bombero {self.unique_id} se movió a {new_pos} con {self.ap} AP")
             
             # Revela un punto de interés (POI) si se encuentra en uno
-            if new_pos in self.model.pois and not self.model.pois[new_pos]["revealed"]:
+            if self.model.pois.is_hidden(new_pos):
                 is_victim = self.model.reveal_poi(new_pos)
                 if is_victim and not self.carrying_victim and self.focus == "rescue":
                     self.carrying_victim = True
@@ -120,11 +165,13 @@ class FirefighterAgent(Agent):
         Retorna:
         - Verdadero si la acción fue exitosa, falso en caso contrario.
         """
-        for door in self.model.doors:
-            if self.position in (door.cell1, door.cell2):
+        edges = self.model.edges
+        cid = self.model.board.cell_id(self.position)
+        for eid in edges.incident(cid):
+            if edges.kind[eid] == EDGE_DOOR and edges.state[eid] != DOOR_DESTROYED:
                 if self.ap >= 1:
                     self.ap -= 1  # Reduce un punto de acción por abrir/cerrar una puerta
-                    door.toggle()  # Alterna el estado de la puerta
+                    self.model.toggle_door(eid)  # Alterna el estado de la puerta
                     return True
         return False
 
@@ -141,12 +188,14 @@ class FirefighterAgent(Agent):
         if target_pos in self.model.fire and self.ap >= 2:
             self.ap -= 2  # Extinguir fuego cuesta 2 puntos de acción
             self.model.fire.remove(target_pos)  # Remueve el fuego de la posición
-            print(f"Bombero {self.unique_id} extinguió fuego en {target_pos} con {self.ap} AP")
+            if not self.model.quiet:
+                print(f"Bombero {self.unique_id} extinguió fuego en {target_pos} con {self.ap} AP")
             return True
         elif target_pos in self.model.smoke and self.ap >= 1:
             self.ap -= 1  # Extinguir humo cuesta 1 punto de acción
             self.model.smoke.remove(target_pos)  # Remueve el humo de la posición
-            print(f"Bombero {self.unique_id} extinguió humo en {target_pos} con {self.ap} AP")
+            if not self.model.quiet:
+                print(f"Bombero {self.unique_id} extinguió humo en {target_pos} con {self.ap} AP")
             return True
         return False
 
@@ -157,12 +206,14 @@ class FirefighterAgent(Agent):
         Retorna:
         - Verdadero si la acción fue exitosa, falso en caso contrario.
         """
-        for wall in self.model.walls:
-            if self.position in (wall.cell1, wall.cell2):
+        edges = self.model.edges
+        cid = self.model.board.cell_id(self.position)
+        for eid in edges.incident(cid):
+            if edges.is_wall(eid):
                 if self.ap >= 2:
                     self.ap -= 2  # Reducir dos puntos de acción por romper una pared
-                    wall.damage_wall()  # Daño a la pared
-                    self.model.damage_markers += 1  # Aumenta el contador de marcadores de daño
+                    # Daño a la pared (damage_wall aumenta el contador de marcadores de daño)
+                    self.model.damage_wall(self.position, self.model.board.positions[edges.other(eid, cid)])
                     return True
         return False
     
@@ -170,66 +221,120 @@ class FirefighterAgent(Agent):
         self.ap += self.saved_ap
         self.saved_ap = 0
 
+        # Con un planificador, la acción se elige simulando jugadas; si no, con las reglas fijas
+        planner = self.model.planner
+        action = planner.choose(self) if planner is not None else (ACTION_RULES, None)
+        if self.perform(action):
+            return
+
+        self.saved_ap = min(self.ap, 4)
+        self.ap = 0
+
+    def perform(self, action: Tuple[str, object]) -> bool:
+        """
+        Ejecuta una acción del bombero.
+
+        Parámetros:
+        - action: Tupla (tipo, argumento) con un tipo ACTION_* de lookahead.
+
+        Retorna:
+        - Verdadero si la acción se realizó, falso si el bombero debe guardar sus puntos de acción.
+        """
+        kind, arg = action
+        if kind == ACTION_RULES:
+            return self.rule_action()
+        if kind == ACTION_MOVE:
+            return self.move(arg)
+        if kind == ACTION_EXTINGUISH:
+            return self.extinguish(arg)
+        if kind == ACTION_DOOR:
+            return self.open_close_door()
+        if kind == ACTION_CHOP:
+            return self.chop()
+        return False  # ACTION_WAIT
+
+    def rule_action(self) -> bool:
+        """
+        Elige y ejecuta una acción con las reglas fijas según el enfoque del bombero.
+
+        Retorna:
+        - Verdadero si alguna acción se realizó, falso en caso contrario.
+        """
         if self.focus == "rescue":
             if self.carrying_victim and self.move_action():
-                return
+                return True
             if self.reveal_poi_action():
-                return
+                return True
             if self.move_action():  
-                return
+                return True
             if self.extinguish_action():  
-                return
+                return True
         else:  
             if self.extinguish_action():
-                return
+                return True
             if self.move_action():
-                return
-
-        if self.random_move():
-            return
+                return True
 
-        self.saved_ap = min(self.ap, 4)
-        self.ap = 0
+        return self.random_move()
     
     def move_action(self) -> bool:
         """
         Acción de movimiento hacia una salida si el bombero lleva una víctima.
-        Intenta moverse en dirección a una salida si el bombero está cargando una víctima.
+        Sigue el campo de distancias compartido hacia la salida más barata, considerando paredes,
+        puertas y fuego.
 
         Retorna:
         - Verdadero si el movimiento fue exitoso, falso en caso contrario.
         """
         if self.carrying_victim:
-            # Selecciona una dirección de movimiento hacia una salida
-            for exit_pos in self.model.exits:
-                dx = exit_pos[0] - self.position[0]
-                dy = exit_pos[1] - self.position[1]
-                new_pos = (
-                    self.position[0] + (1 if dx > 0 else -1 if dx < 0 else 0),
-                    self.position[1] + (1 if dy > 0 else -1 if dy < 0 else 0)
-                )
-                if self.is_valid_position(new_pos):
-                    return self.move(new_pos)
-        
+            return self.navigate(FIELD_EXITS)
+
         return False
 
+    def navigate(self, field: str) -> bool:
+        """
+        Avanza un paso hacia el objetivo de un campo de navegación.
+        Con la planificación cooperativa activa sigue el camino reservado del bombero (que puede
+        indicar esperar en su celda); si no, sigue el campo de distancias compartido.
+
+        Parámetros:
+        - field: FIELD_EXITS, FIELD_FIRE o FIELD_POIS.
+
+        Retorna:
+        - Verdadero si el bombero se movió o esperó según su plan, falso en caso contrario.
+        """
+        if self.model.pathing is not None:
+            new_pos = self.model.pathing.next_move(self, field)
+        else:
+            new_pos = self.model.navigation.next_step(field, self.position)
+        if new_pos is None or not self.is_valid_position(new_pos):
+            return False
+        if new_pos == self.position:
+            return True  # Espera planificada: otro bombero tiene reservada la celda siguiente
+        return self.move(new_pos)
+
     def reveal_poi_action(self) -> bool:
         """
         Acción de revelar un punto de interés (POI) adyacente.
-        Intenta revelar un POI en una celda adyacente si está vacía.
+        Intenta revelar un POI en una celda adyacente si está vacía; si no hay ninguno, un bombero
+        de rescate sin víctima avanza hacia el POI sin revelar más cercano.
 
         Retorna:
         - Verdadero si se reveló un POI con éxito, falso en caso contrario.
         """
         adjacent_cells = self.model.grid.get_neighborhood(self.position, moore=False, include_center=True)
         for cell in adjacent_cells:
-            if cell in self.model.pois and not self.model.pois[cell]["revealed"]:
-                if self.model.grid.is_cell_empty(cell):
+            if self.model.pois.is_hidden(cell):
+                if self.model.board.is_free(cell):
                     if self.move(cell):
                         is_victim = self.model.reveal_poi(cell)
                         if is_victim and not self.carrying_victim and self.focus == "rescue":
                             self.carrying_victim = True
                         return True
+
+        # Si no hay un POI al lado, avanza hacia el POI sin revelar más cercano
+        if self.focus == "rescue" and not self.carrying_victim:
+            return self.navigate(FIELD_POIS)
         return False
 
     def random_move(self) -> bool:
@@ -242,12 +347,12 @@ class FirefighterAgent(Agent):
         - Verdadero si el movimiento fue exitoso, falso en caso contrario.
         """
         directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Direcciones posibles: derecha, izquierda, abajo, arriba
-        random.shuffle(directions)  # Baraja las direcciones aleatoriamente
+        self.model.rng.shuffle(directions)  # Baraja las direcciones aleatoriamente
 
         for dx, dy in directions:
             new_pos = (self.position[0] + dx, self.position[1] + dy)
             # Verifica si la nueva posición es válida y está vacía
-            if self.is_valid_position(new_pos) and self.model.grid.is_cell_empty(new_pos):
+            if self.is_valid_position(new_pos) and self.model.board.is_free(new_pos):
                 return self.move(new_pos)  # Intenta mover al bombero a la nueva posición
         
         return False  # No se pudo mover a ninguna dirección
@@ -267,7 +372,8 @@ class FirefighterAgent(Agent):
     def extinguish_action(self) -> bool:
         """
         Acción de extinguir fuego o humo en las celdas adyacentes.
-        Revisa las celdas adyacentes y, si hay fuego o humo, intenta extinguirlo.
+        Revisa las celdas adyacentes y, si hay fuego o humo, intenta extinguirlo; si no hay y el
+        bombero se enfoca en extinguir, avanza hacia el fuego más cercano.
 
         Retorna:
         - Verdadero si se extinguió con éxito fuego o humo, falso en caso contrario.
@@ -277,12 +383,16 @@ class FirefighterAgent(Agent):
             if cell in self.model.fire or cell in self.model.smoke:
                 if self.focus == "extinguish" or (self.focus == "rescue" and self.carrying_victim):
                     return self.extinguish(cell)
+
+        # Si no hay fuego al lado, avanza hacia el fuego más cercano
+        if self.focus == "extinguish":
+            return self.navigate(FIELD_FIRE)
         return False # No se pudo extinguir fuego o humo en ninguna celda adyacente
 
 class FlashPointModel(Model):
 
     '''Configuración e inicialización'''
-    def __init__(self, width: int, height: int, wall_matrix, victims, fire, doors: List[Tuple[Tuple[int, int], Tuple[int, int]]], exits, n_agents: int = 6):
+    def __init__(self, width: int, height: int, wall_matrix, victims, fire, doors: List[Tuple[Tuple[int, int], Tuple[int, int]]], exits, n_agents: int = 6, cooperative_pathing: bool = False, planner=None, backend: str = BACKEND_BUILTIN, topology: BoardTopology = None, seed=None, n_rescuers: int = None, max_pois: int = 3, max_damage: int = 24, max_lost: int = 4, rescue_goal: int = 7, streams: Dict[str, object] = None, step_log=None, game_id: int = 0, metrics=None, quiet: bool = False):
         """
         Inicializa una nueva instancia del juego con los parámetros dados.
 
@@ -295,69 +405,106 @@ class FlashPointModel(Model):
         - doors: Lista de puertas entre celdas.
         - exits: Lista de posiciones de salida.
         - n_agents: Número de agentes bomberos a inicializar (por defecto es 6).
-        """
+        - cooperative_pathing: Si es verdadero, los bomberos reservan sus caminos en una tabla
+          espacio-tiempo y planean alrededor de los caminos de los demás.
+        - planner: Planificador con choose(agent) (por ejemplo lookahead.RolloutPlanner) que elige
+          las acciones de los bomberos en lugar de las reglas fijas; None usa las reglas.
+        - backend: Implementación de la cuadrícula y el scheduler: simcore.BACKEND_BUILTIN (por
+          defecto, sin Mesa) o simcore.BACKEND_MESA (MultiGrid y RandomActivation de Mesa).
+        - topology: Topología ya compilada del escenario (board_topology.BoardTopology), para no
+          compilarla de nuevo en cada juego; si se da, se usan sus dimensiones, paredes, puertas
+          y salidas, y wall_matrix, doors y exits pueden ser None.
+        - seed: Semilla del juego. Si se da, todas las tiradas usan el generador propio del
+          modelo (self.random, sembrado con seed como en Mesa) en lugar del módulo random, y
+          el juego es reproducible sin tocar el estado global.
+        - n_rescuers: Bomberos con enfoque de rescate (los de id menor); el resto extingue. Por
+          defecto la mitad de n_agents.
+        - max_pois: Puntos de interés que se mantienen en el tablero.
+        - max_damage, max_lost, rescue_goal: Marcadores de daño, víctimas perdidas y víctimas
+          rescatadas con los que termina el juego (ver check_game_over).
+        - metrics: Métricas de tiempos y eventos (metrics.GameMetrics); None no mide nada.
+        - quiet: Si es verdadero, el juego no imprime sus mensajes (ni los formatea).
+        """
+        self.quiet = quiet  # Sin mensajes en la salida estándar
+        if topology is None:
+            topology = BoardTopology(width, height, wall_matrix, doors, exits, quiet)
+        self.topology = topology  # Topología compartida (no se modifica)
+
         # Inicializar la cuadrícula y el schedule
-        self.grid = MultiGrid(height+1, width+1, torus=False)  # Crear una cuadrícula sin torus
-        self.schedule = RandomActivation(self)  # Crear un scheduler para la activación aleatoria de agentes
+        self.backend = backend  # Implementación de la cuadrícula y el scheduler
+        self.grid = make_grid(backend, topology.height+1, topology.width+1)  # Crear una cuadrícula sin torus
+        self.schedule = make_scheduler(backend, self)  # Crear un scheduler para la activación aleatoria de agentes
 
         # Configurar parámetros del juego
-        self.doors = set(doors) if doors else set()  # Inicializar puertas
+        self.doors = set(topology.doors)  # Inicializar puertas
         self.damage_markers = 0  # Contador de marcadores de daño
         self.rescued_victims = 0  # Contador de víctimas rescatadas
         self.lost_victims = 0  # Contador de víctimas perdidas
         self.victims = [True, True, True, True, True, True, True, True, True, True, False, False, False, False]  # Lista de estados de las víctimas
-        self.max_pois_onBoard = 3  # Número máximo de puntos de interés en el tablero
+        self.max_pois_onBoard = max_pois  # Número máximo de puntos de interés en el tablero
         self.running = True  # Indicador de si el juego está en ejecución
-        self.building_cells = frozenset((x, y) for x in range(1, width + 1) for y in range(1, height + 1))  # Celdas de construcción
+        self.building_cells = topology.building_cells  # Celdas de construcción
         self.n_agents = n_agents  # Número de agentes bomberos
+        self.n_rescuers = n_agents // 2 if n_rescuers is None else n_rescuers  # Bomberos con enfoque de rescate
+        self.max_damage = max_damage  # Marcadores de daño con los que colapsa el edificio
+        self.max_lost = max_lost  # Víctimas perdidas con las que se pierde el juego
+        self.rescue_goal = rescue_goal  # Víctimas rescatadas con las que se gana el juego
         self.ff_ids = []  # Lista de IDs de bomberos disponibles
 
         self.current_step = 0  # Paso actual de la simulación
+        self.rng = random if seed is None else self.random  # Generador de las tiradas del juego (fuego, POIs, reaparición, movimientos al azar)
+        streams = streams or {}
+        unknown = set(streams) - set(RNG_STREAMS)
+        if unknown:
+            raise ValueError(f"Flujos de azar desconocidos: {', '.join(sorted(unknown))}")
+        # Flujos de azar propios (ver streams); los que no se dan comparten self.rng
+        self.fire_rng = random.Random(streams["fire"]) if "fire" in streams else self.rng  # Tiradas de fuego
+        self.poi_rng = random.Random(streams["poi"]) if "poi" in streams else self.rng  # Posiciones de POIs nuevos
+        self.respawn_rng = random.Random(streams["respawn"]) if "respawn" in streams else self.rng  # Reaparición de bomberos
+        self.planner = planner  # Política de decisión de los bomberos (None = reglas fijas)
+        self.step_log = step_log  # Registro de pasos (None = sin registro)
+        self.game_id = game_id  # Identificador del juego en el registro de pasos
+        self.metrics = metrics  # Métricas de tiempos y eventos (None = sin métricas)
 
         # Configurar elementos del juego
-        self.exits = exits  # Posiciones de salida
-        self.fire: Set[Tuple[int, int]] = set()  # Conjunto de posiciones de fuego
-        self.smoke: Set[Tuple[int, int]] = set()  # Conjunto de posiciones de humo
-        self.pois: Dict[Tuple[int, int], Dict[str, bool]] = {}  # Puntos de interés (víctimas potenciales)
+        self.exits = list(topology.exits)  # Posiciones de salida
+        # Estado compacto del tablero indexado por id de celda y registro de paredes y puertas,
+        # que comparten la topología y solo copian lo que cambia durante el juego
+        self.board, self.edges = topology.new_board()
+        self.fire = self.board.fire  # Posiciones de fuego (se usa como un conjunto)
+        self.smoke = self.board.smoke  # Posiciones de humo (se usa como un conjunto)
+        self.pois = self.board.pois  # Puntos de interés (víctimas potenciales, se usa como un diccionario)
+        self.frontier = FireFrontier(self.board)  # Conteo incremental de vecinas con fuego por celda
+        self.rays = ShockwaveRays(self.board)  # Índice de rayos para las ondas de choque
+        self.free_cells = FreeCellIndex(self.board)  # Celdas libres para colocar bomberos y POIs
+        self.navigation = NavigationFields(self.board, self.exits)  # Campos de distancia compartidos por los bomberos
+        self.pathing = CooperativePathing(self, self.navigation) if cooperative_pathing else None  # Reservaciones de caminos
         self.poi_count = 0  # Contador de puntos de interés
 
-        # Inicializar estructuras de la cuadrícula
-        self.grid_structure = {}  # Estructura de la cuadrícula
-        self.ouf_of_bounds_grid_structure = {}  # Estructura de la cuadrícula fuera de los límites
-        self.wall_health = {}  # Salud de las paredes
+        # Estructuras de la cuadrícula: las listas se comparten con la topología hasta que cambian
+        self.grid_structure = dict(topology.grid_structure)  # Estructura de la cuadrícula
+        self.ouf_of_bounds_grid_structure = topology.out_of_bounds  # Estructura de la cuadrícula fuera de los límites
 
         # Almacenar el estado inicial del juego
         self.initial_victims = victims  # Víctimas iniciales
         self.initial_fire = fire  # Fuego inicial
-        self.width = width  # Ancho de la cuadrícula
-        self.height = height  # Altura de la cuadrícula
+        self.width = topology.width  # Ancho de la cuadrícula
+        self.height = topology.height  # Altura de la cuadrícula
 
-        self.agents = []  # Lista de agentes en el juego
+        self.agents = AgentRegistry(self.board)  # Bomberos activos por id y por celda
 
         # Configurar el tablero de juego
-        self.setup_board(wall_matrix, victims, fire)
+        self.setup_board(victims, fire)
 
-    def setup_board(self, wall_matrix: List[str], victims, fire) -> None:
+    def setup_board(self, victims, fire) -> None:
         """
-        Configura el tablero del juego según la matriz de paredes, víctimas y fuego inicial.
+        Coloca en el tablero el fuego inicial, las víctimas y los bomberos (las paredes y puertas
+        ya vienen de la topología).
 
         Parámetros:
-        - wall_matrix: Matriz que describe las paredes en el grid.
         - victims: Lista de víctimas iniciales.
         - fire: Lista de posiciones iniciales de fuego.
         """
-        # Generar la estructura de la cuadrícula
-        self.grid_structure, self.ouf_of_bounds_grid_structure = self.generate_grid(self.width, self.height, wall_matrix, self.exits)
-
-        # Inicializar la salud de las paredes
-        for pos, connections in self.grid_structure.items():
-            for adj, cost in connections:
-                if cost == 5:  # Si es una pared
-                    self.wall_health[(pos, adj)] = 2  # Salud inicial de la pared
-
-        # Procesar las puertas
-        self.update_walls_to_doors(self.grid_structure, self.doors)
-
         # Añadir el fuego inicial
         for i in range(len(fire)):
             self.fire.add(fire[i])  # Añadir posiciones de fuego al conjunto de fuego
@@ -369,14 +516,13 @@ class FlashPointModel(Model):
         for i in range(self.n_agents):
             firefighter = FirefighterAgent(i, self)  # Crear un nuevo agente bombero
             self.schedule.add(firefighter)  # Añadir el bombero al scheduler
-            while True:
-                x, y = self.random.randrange(1, self.grid.width), self.random.randrange(1,self.grid.height)  # Generar una posición aleatoria
-                if self.grid.is_cell_empty((x, y)) and (x, y) not in self.fire and (x, y) not in self.pois:
-                    break  # Salir del ciclo si la celda es válida
+            # Elegir una celda al azar sin bomberos, fuego ni puntos de interés
+            x, y = self.free_cells.sample(self.random, EXCLUDE_OCCUPIED | EXCLUDE_FIRE | EXCLUDE_POI)
 
             self.grid.place_agent(firefighter, (x, y))  # Colocar el bombero en la cuadrícula
+            self.board.place_occupant((x, y))
             firefighter.position = (x, y)  # Establecer la posición del bombero
-            self.agents.append(firefighter)  # Añadir el bombero a la lista de agentes
+            self.agents.add(firefighter)  # Registrar el bombero
 
         # Añadir víctimas iniciales
 
@@ -399,8 +545,6 @@ class FlashPointModel(Model):
                 else:
                     # Establecer paredes con costo 5
                     self.grid_structure[(x, y)].append(((new_x, new_y), 5))
-                    # Inicializar la salud de la pared
-                    self.wall_health[((x, y), (new_x, new_y))] = 2
 
     def update_grid_for_door(self, cell1: Tuple[int, int], cell2: Tuple[int, int]) -> None:
         """
@@ -412,7 +556,8 @@ class FlashPointModel(Model):
         """
         # Verificar si las celdas están en la estructura de la cuadrícula
         if cell1 not in self.grid_structure or cell2 not in self.grid_structure:
-            print(f"Advertencia: La puerta entre {cell1} y {cell2} está fuera de la cuadrícula. Omitiendo.")
+            if not self.quiet:
+                print(f"Advertencia: La puerta entre {cell1} y {cell2} está fuera de la cuadrícula. Omitiendo.")
             return
 
         # Actualizar la estructura de la cuadrícula para reflejar una puerta (costo 2) entre cell1 y cell2
@@ -460,60 +605,68 @@ class FlashPointModel(Model):
         Parámetros:
         - actual_step: el paso actual de la simulación.
         """
-        print("Checking firefighters and victims")
-        agents_to_remove = []  # Lista para almacenar agentes a ser removidos.
-
-        # Recolecta agentes que deben ser removidos del grid.
-        for agent in self.agents:
-            if isinstance(agent, FirefighterAgent) and agent.position in self.fire:
-                self.ff_ids.append(agent.unique_id)
+        if not self.quiet:
+            print("Checking firefighters and victims")
+        # Bomberos en celdas con fuego, detectados por el registro a partir de los cambios del fuego
+        agents_to_remove = self.agents.pop_knocked_down()
+        for agent in agents_to_remove:
+            self.ff_ids.append(agent.unique_id)
+            if not self.quiet:
                 print(f"Firefighter in fire in {agent.position}")
-                agents_to_remove.append(agent)
 
         # Remueve agentes recolectados del grid y del planificador.
         for agent in agents_to_remove:
+            self.board.remove_occupant(agent.pos)
+            if self.pathing is not None:
+                self.pathing.forget(agent.unique_id)
             self.grid.remove_agent(agent)
             self.schedule.remove(agent)
             self.agents.remove(agent)
 
         # Si es un paso par, intentamos agregar todos los bomberos eliminados
         if actual_step % 2 == 0:
-            print(f"Even step {actual_step}, attempting to add all knocked-down firefighters")
-            for ff_id in list(self.ff_ids):  # Use a copy of the list to iterate
-                attempt_counter = 0
-                while attempt_counter < 20:  # Limit attempts to 20 per firefighter
-                    x, y = random.randint(1, 6), random.randint(1, 8)  # Genera una posición aleatoria.
-                    if self.grid.is_cell_empty((x, y)):
-                        new_agent = FirefighterAgent(ff_id, self)
-                        self.schedule.add(new_agent)
-                        self.grid.place_agent(new_agent, (x, y))
-                        self.agents.append(new_agent)
-                        
-                        # If placed in fire, extinguish it
-                        if (x, y) in self.fire:
-                            self.fire.remove((x, y))
-                            print(f"Fire extinguished at {x}, {y} due to firefighter placement")
-                        
-                        # If placed on a POI, reveal it
-                        if (x, y) in self.pois and not self.pois[(x, y)]["revealed"]:
-                            self.reveal_poi((x, y))
-                            print(f"POI revealed at {x}, {y} due to firefighter placement")
-                        
-                        self.ff_ids.remove(ff_id)
-                        print(f"Firefighter {ff_id} added at {x}, {y}")
-                        break
-                    attempt_counter += 1
-                
-                if attempt_counter >= 20:
-                    print(f"Unable to place firefighter {ff_id} after 20 attempts.")
+            if not self.quiet:
+                print(f"Even step {actual_step}, attempting to add all knocked-down firefighters")
+            waiting = []  # Bomberos que no se pudieron colocar
+            for ff_id in self.ff_ids:
+                pos = self.sample_cell(self.respawn_rng, EXCLUDE_OCCUPIED)  # Celda al azar sin bomberos
+                if pos is None:
+                    if not self.quiet:
+                        print(f"Unable to place firefighter {ff_id}: no free cells.")
+                    waiting.append(ff_id)
+                    continue
+                x, y = pos
+                new_agent = FirefighterAgent(ff_id, self)
+                self.schedule.add(new_agent)
+                self.grid.place_agent(new_agent, (x, y))
+                self.board.place_occupant((x, y))
+                new_agent.position = (x, y)
+                self.agents.add(new_agent)
+
+                # If placed in fire, extinguish it
+                if (x, y) in self.fire:
+                    self.fire.remove((x, y))
+                    if not self.quiet:
+                        print(f"Fire extinguished at {x}, {y} due to firefighter placement")
+
+                # If placed on a POI, reveal it
+                if self.pois.is_hidden((x, y)):
+                    self.reveal_poi((x, y))
+                    if not self.quiet:
+                        print(f"POI revealed at {x}, {y} due to firefighter placement")
+
+                if not self.quiet:
+                    print(f"Firefighter {ff_id} added at {x}, {y}")
+            self.ff_ids = waiting
 
         # Verifica si alguna posición en los puntos de interés (pois) tiene fuego.
-        for pos in list(self.pois.keys()):
-            if pos in self.fire:
-                self.lose_victim(pos)
+        for cid in list(self.pois.iter_ids()):
+            if self.fire.has(cid):
+                self.lose_victim(self.board.positions[cid])
 
-        print(f"Remaining knocked-down firefighters: {self.ff_ids}")
-        print(f"Current number of active firefighters: {len([agent for agent in self.agents if isinstance(agent, FirefighterAgent)])}")
+        if not self.quiet:
+            print(f"Remaining knocked-down firefighters: {self.ff_ids}")
+            print(f"Current number of active firefighters: {len(self.agents)}")
         
     def is_valid_position(self, pos: Tuple[int, int]) -> bool:
         """
@@ -538,8 +691,11 @@ class FlashPointModel(Model):
         Retorna:
         - True si las posiciones son adyacentes, False en caso contrario.
         """
-        aux = abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1]) == 1
-        return aux and not self.wall_in_direction(pos1, pos2) and not self.door_in_direction(pos1, pos2)
+        edge = self.board.edge_between(pos1, pos2)
+        if edge < 0:
+            return False
+        cost = self.board.edge_cost[edge]
+        return cost != 5 and cost != 2  # Ni pared ni puerta cerrada
 
 
 
@@ -550,136 +706,17 @@ class FlashPointModel(Model):
         Parámetros:
         - pos: Una tupla que representa la posición (x, y).
         """
-        if pos in self.pois:
+        cid = self.board.cell_id(pos)
+        flags = self.pois.cells[cid] if cid >= 0 else 0
+        if flags:
             # Incrementa el contador de víctimas perdidas si hay una víctima en la posición que no ha sido revelada.
-            if self.pois[pos]["is_victim"] and not self.pois[pos]["revealed"]:
+            if flags & POI_VICTIM and not flags & POI_REVEALED:
                 self.lost_victims += 1
             # Elimina la víctima de los puntos de interés (pois).
-            del self.pois[pos]
+            self.pois.discard_id(cid)
 
     '''walls and doors'''
 
-    # nueva generacion de grid y actualizacion de paredes a puertas
-
-    def generate_grid(self, grid_width, grid_height, cell_walls, exits):
-        """
-        Genera la estructura de la cuadrícula del juego basada en las paredes y salidas especificadas.
-
-        Parámetros:
-        - grid_width: Ancho de la cuadrícula.
-        - grid_height: Altura de la cuadrícula.
-        - cell_walls: Matriz que representa las paredes de cada celda en el grid.
-        - exits: Lista de posiciones de salida.
-
-        Retorna:
-        - Una lista con dos diccionarios:
-            1. grid_dict: Estructura de la cuadrícula con costos de movimiento.
-            2. out_of_bounds_dict: Estructura de celdas fuera de los límites con costos de movimiento.
-        """
-        grid_dict = {}  # Diccionario para almacenar la estructura de la cuadrícula
-        out_of_bounds_dict = {}  # Diccionario para almacenar las celdas fuera de los límites
-
-        # Iterar sobre cada celda en la cuadrícula
-        for i in range(grid_height):
-            for j in range(grid_width):
-                cell_key = (i+1, j+1)  # Clave de la celda actual
-                walls = cell_walls[i][j]  # Paredes de la celda actual
-                neighbors = []  # Lista para almacenar los vecinos y costos
-                out_of_bounds_neighbor_list = []  # Lista para vecinos fuera de los límites
-
-                # Verificar si hay un vecino arriba
-                if i > 0:  # No es la primera fila
-                    neighbors.append([(i, j+1), 5 if walls[0] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
-                else:
-                    out_of_bounds_neighbor = (i, j+1)
-                    if cell_key in exits:
-                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (UP)")
-                        out_of_bounds_neighbor_list.append([(i, j+1), 2])  # Costo de 2 para salidas
-                    else:
-                        out_of_bounds_neighbor_list.append([(i, j+1), 5 if walls[0] == '1' else 1])  # Costo de pared
-
-                # Verificar si hay un vecino a la izquierda
-                if j > 0:  # No es la primera columna
-                    neighbors.append([(i+1, j), 5 if walls[1] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
-                else:
-                    out_of_bounds_neighbor = (i+1, j)
-                    if cell_key in exits:
-                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (LEFT)")
-                        out_of_bounds_neighbor_list.append([(i+1, j), 2])  # Costo de 2 para salidas
-                    else:
-                        out_of_bounds_neighbor_list.append([(i, j), 5 if walls[1] == '1' else 1])  # Costo de pared
-
-                # Verificar si hay un vecino abajo
-                if i < grid_height - 1:  # No es la última fila
-                    neighbors.append([(i+2, j+1), 5 if walls[2] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
-                else:
-                    out_of_bounds_neighbor = (i+2, j+1)
-                    if cell_key in exits:
-                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (DOWN)")
-                        out_of_bounds_neighbor_list.append([(i+2, j+1), 2])  # Costo de 2 para salidas
-                    else:
-                        out_of_bounds_neighbor_list.append([(i+2, j+1), 5 if walls[2] == '1' else 1])  # Costo de pared
-
-                # Verificar si hay un vecino a la derecha
-                if j < grid_width - 1:  # No es la última columna
-                    neighbors.append([(i+1, j+2), 5 if walls[3] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
-                else:
-                    out_of_bounds_neighbor = (i+1, j+2)
-                    if cell_key in exits:
-                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (RIGHT)")
-                        out_of_bounds_neighbor_list.append([(i+1, j+2), 2])  # Costo de 2 para salidas
-                    else:
-                        out_of_bounds_neighbor_list.append([(i+1, j+2), 5 if walls[3] == '1' else 1])  # Costo de pared
-
-                grid_dict[cell_key] = neighbors  # Guardar los vecinos y costos en el diccionario
-                out_of_bounds_dict[cell_key] = out_of_bounds_neighbor_list  # Guardar los vecinos fuera de límites en el diccionario
-
-        return [grid_dict, out_of_bounds_dict]  # Retornar los diccionarios
-
-    def update_walls_to_doors(self, grid_dict, door_pairs):
-        """
-        Actualiza las paredes en la estructura de la cuadrícula para reflejar las puertas.
-
-        Parámetros:
-        - grid_dict: Estructura de la cuadrícula con los costos actuales de las paredes.
-        - door_pairs: Lista de pares de celdas que representan puertas.
-        """
-        for (cell1, cell2) in door_pairs:
-            # Extraer coordenadas
-            x1, y1 = cell1
-            x2, y2 = cell2
-
-            # Determinar la dirección de la pared y actualizarla a una puerta (valor 2)
-            if x1 == x2:  # Misma fila, pared horizontal (izquierda-derecha)
-                if y1 < y2:  # cell1 está a la izquierda de cell2
-                    self.update_wall_value(grid_dict, (x1, y1), (x2, y2), 3, 1)  # Pared derecha de cell1, pared izquierda de cell2
-                else:  # cell1 está a la derecha de cell2
-                    self.update_wall_value(grid_dict, (x2, y2), (x1, y1), 3, 1)  # Pared derecha de cell2, pared izquierda de cell1
-            elif y1 == y2:  # Misma columna, pared vertical (arriba-abajo)
-                if x1 < x2:  # cell1 está arriba de cell2
-                    self.update_wall_value(grid_dict, (x1, y1), (x2, y2), 2, 0)  # Pared inferior de cell1, pared superior de cell2
-                else:  # cell1 está abajo de cell2
-                    self.update_wall_value(grid_dict, (x2, y2), (x1, y1), 2, 0)  # Pared inferior de cell2, pared superior de cell1
-
-    def update_wall_value(self, grid_dict, cell1, cell2, wall_index1, wall_index2):
-        """
-        Actualiza el valor de la pared a puerta entre dos celdas especificadas.
-
-        Parámetros:
-        - grid_dict: Estructura de la cuadrícula con los costos actuales de las paredes.
-        - cell1: La primera celda.
-        - cell2: La segunda celda.
-        - wall_index1: Índice de la pared en cell1.
-        - wall_index2: Índice de la pared en cell2.
-        """
-        # Convertir los valores actuales de la pared de 5 (pared) a 2 (puerta) entre cell1 y cell2
-        for i, neighbor in enumerate(grid_dict[cell1]):
-            if neighbor[0] == cell2 and neighbor[1] == 5:
-                grid_dict[cell1][i][1] = 2  # Actualizar a puerta
-        for i, neighbor in enumerate(grid_dict[cell2]):
-            if neighbor[0] == cell1 and neighbor[1] == 5:
-                grid_dict[cell2][i][1] = 2  # Actualizar a puerta
-
     def wall_in_direction(self, pos: Tuple[int, int], new_pos: Tuple[int, int]) -> bool:
         """
         Verifica si hay una pared en la dirección especificada entre dos posiciones.
@@ -691,11 +728,12 @@ class FlashPointModel(Model):
         Retorna:
         - True si hay una pared, False de lo contrario.
         """
-        if pos not in self.grid_structure:
-            print(f"Warning: Wall Position {pos} not found in grid_structure")
+        if not self.board.in_building(pos):
+            if not self.quiet:
+                print(f"Warning: Wall Position {pos} not found in grid_structure")
             return False
 
-        return any(adj == new_pos and cost == 5 for adj, cost in self.grid_structure[pos])
+        return self.edges.is_wall(self.edge_id(pos, new_pos))
 
     def door_in_direction(self, pos: Tuple[int, int], new_pos: Tuple[int, int]) -> bool:
         """
@@ -708,12 +746,13 @@ class FlashPointModel(Model):
         Retorna:
         - True si hay una puerta entre las posiciones, False de lo contrario.
         """
-        if pos not in self.grid_structure:
-            print(f"Warning: Door Position {pos} not found in grid_structure")
+        if not self.board.in_building(pos):
+            if not self.quiet:
+                print(f"Warning: Door Position {pos} not found in grid_structure")
             return False
 
-        # Verifica si el vecino en la posición new_pos tiene un costo de 2 (puerta)
-        return any(adj == new_pos and cost == 2 for adj, cost in self.grid_structure[pos])
+        # Verifica si entre pos y new_pos hay una puerta cerrada (costo 2)
+        return self.edges.is_closed_door(self.edge_id(pos, new_pos))
 
     def damage_wall(self, pos: Tuple[int, int], new_pos: Tuple[int, int]) -> None:
         """
@@ -723,23 +762,22 @@ class FlashPointModel(Model):
         - pos: Posición inicial.
         - new_pos: Posición final.
         """
-        if self.wall_in_direction(pos, new_pos):
-            # Determina la clave de la pared en la estructura de salud de paredes
-            wall_key = (pos, new_pos) if (pos, new_pos) in self.wall_health else (new_pos, pos)
-            self.wall_health[wall_key] -= 1  # Disminuye la salud de la pared
+        eid = self.edge_id(pos, new_pos)
+        if self.edges.is_wall(eid):
             self.damage_markers += 1  # Incrementa el contador de daños
 
-            # Verifica si la pared se ha destruido completamente
-            if self.wall_health[wall_key] == 0:
+            # Disminuye la salud de la pared y verifica si se ha destruido completamente
+            if self.edges.damage(eid):
                 # La pared está destruida, actualiza la estructura para que sea un camino abierto
-                self.update_connection_cost(pos, new_pos, 1)
-                self.update_connection_cost(new_pos, pos, 1)
-                del self.wall_health[wall_key]  # Elimina la pared de la estructura de salud
-                print(f"Wall between {pos} and {new_pos} has been destroyed.")
+                self.update_connection_cost(pos, new_pos, COST_OPEN)
+                self.update_connection_cost(new_pos, pos, COST_OPEN)
+                if not self.quiet:
+                    print(f"Wall between {pos} and {new_pos} has been destroyed.")
             # else:
             #     print(f"Wall between {pos} and {new_pos} has been damaged. Health: {self.wall_health[wall_key]}")
         else:
-            print(f"No wall found between {pos} and {new_pos}")
+            if not self.quiet:
+                print(f"No wall found between {pos} and {new_pos}")
 
     def damage_door(self, pos: Tuple[int, int], new_pos: Tuple[int, int]) -> None:
         """
@@ -749,12 +787,45 @@ class FlashPointModel(Model):
         - pos: Posición inicial.
         - new_pos: Posición final.
         """
-        if self.door_in_direction(pos, new_pos):
-            # Actualiza la puerta para que sea un camino abierto (costo 1)
-            self.update_connection_cost(pos, new_pos, 1)
-            self.update_connection_cost(new_pos, pos, 1)
+        eid = self.edge_id(pos, new_pos)
+        if self.edges.is_closed_door(eid):
+            # Destruye la puerta y actualiza la estructura para que sea un camino abierto (costo 1)
+            self.edges.state[eid] = DOOR_DESTROYED
+            self.update_connection_cost(pos, new_pos, COST_OPEN)
+            self.update_connection_cost(new_pos, pos, COST_OPEN)
         else:
-            print(f"No door found between {pos} and {new_pos}")
+            if not self.quiet:
+                print(f"No door found between {pos} and {new_pos}")
+
+    def toggle_door(self, eid: int) -> None:
+        """
+        Abre una puerta cerrada o cierra una puerta abierta.
+
+        Parámetros:
+        - eid: Id de la puerta en el registro de aristas.
+        """
+        if self.edges.kind[eid] != EDGE_DOOR or self.edges.state[eid] == DOOR_DESTROYED:
+            return
+        self.edges.state[eid] = DOOR_OPEN if self.edges.state[eid] == DOOR_CLOSED else DOOR_CLOSED
+        cost = self.edges.cost(eid)
+        pos1 = self.board.positions[self.edges.cell1[eid]]
+        pos2 = self.board.positions[self.edges.cell2[eid]]
+        self.update_connection_cost(pos1, pos2, cost)
+        self.update_connection_cost(pos2, pos1, cost)
+
+    def edge_id(self, pos: Tuple[int, int], new_pos: Tuple[int, int]) -> int:
+        """
+        Localiza la pared o puerta entre dos posiciones vecinas.
+
+        Parámetros:
+        - pos: Posición inicial.
+        - new_pos: Posición final.
+
+        Retorna:
+        - El id de la arista en el registro, o -1 si no hay pared ni puerta entre ellas.
+        """
+        half = self.board.edge_between(pos, new_pos)
+        return self.edges.edge_at[half] if half >= 0 else -1
 
     def update_connection_cost(self, pos: Tuple[int, int], neighbor: Tuple[int, int], new_cost: int) -> None:
         """
@@ -765,11 +836,24 @@ class FlashPointModel(Model):
         - neighbor: Posición del vecino.
         - new_cost: Nuevo costo de conexión a asignar.
         """
-        # Encuentra el vecino en la celda actual y actualiza el costo de conexión
-        for i, (adj, cost) in enumerate(self.grid_structure[pos]):
-            if adj == neighbor:
-                self.grid_structure[pos][i] = (adj, new_cost)
-                break
+        # Localiza la arista en el arreglo del tablero y su entrada en grid_structure
+        edge = self.board.edge_between(pos, neighbor)
+        if edge < 0:
+            return
+        slot = self.board.structure_slot[edge]
+        if slot >= 0:
+            self.board.set_edge_cost(edge, new_cost)
+            # Se reemplaza la lista en lugar de modificarla para que las copias de fork la compartan
+            connections = list(self.grid_structure[pos])
+            connections[slot] = (neighbor, new_cost)
+            self.grid_structure[pos] = connections
+
+    @property
+    def wall_health(self) -> Dict[Tuple[Tuple[int, int], Tuple[int, int]], int]:
+        """
+        Salud de las paredes en pie como {(celda1, celda2): salud}, calculada desde el registro de aristas.
+        """
+        return self.edges.walls_health(self.board.positions)
 
     '''Rerrolling, steps, and checking game over'''
 
@@ -778,24 +862,28 @@ class FlashPointModel(Model):
         Verifica las condiciones de fin del juego y actualiza el estado del juego si se cumple alguna condición.
 
         Condiciones de fin del juego:
-        - El número de marcadores de daño llega a 24.
-        - Se pierden 4 víctimas.
-        - Se rescatan 7 víctimas.
+        - El número de marcadores de daño llega a max_damage (24 por defecto).
+        - Se pierden max_lost víctimas (4 por defecto).
+        - Se rescatan rescue_goal víctimas (7 por defecto).
         - No quedan bomberos disponibles.
 
         Cambia el estado del juego a no en ejecución si alguna de las condiciones se cumple.
         """
-        if self.damage_markers == 24:
-            print("Game Over: Building has collapsed!")  # El edificio ha colapsado debido a daños excesivos
+        if self.damage_markers == self.max_damage:
+            if not self.quiet:
+                print("Game Over: Building has collapsed!")  # El edificio ha colapsado debido a daños excesivos
             self.running = False
-        elif self.lost_victims == 4:
-            print("Game Over: Too many victims lost!")  # Demasiadas víctimas han sido perdidas
+        elif self.lost_victims == self.max_lost:
+            if not self.quiet:
+                print("Game Over: Too many victims lost!")  # Demasiadas víctimas han sido perdidas
             self.running = False
-        elif self.rescued_victims == 7:
-            print("Game Over: All victims accounted for!")  # Todas las víctimas han sido rescatadas
+        elif self.rescued_victims == self.rescue_goal:
+            if not self.quiet:
+                print("Game Over: All victims accounted for!")  # Todas las víctimas han sido rescatadas
             self.running = False
         elif len(self.agents) == 0:
-            print("Game Over: No more firefighters left!")  # No quedan bomberos para continuar
+            if not self.quiet:
+                print("Game Over: No more firefighters left!")  # No quedan bomberos para continuar
             self.running = False
 
     def step(self):
@@ -813,15 +901,254 @@ class FlashPointModel(Model):
         - El estado actual del juego después de realizar el paso.
         """
         if self.running:
-            self.schedule.step()  # Avanza el planificador de agentes
-            self.advance_fire()  # Avanza el estado del fuego
-            self.check_firefighters_and_victims(self.current_step)  # Verifica el estado de bomberos y víctimas
-            self.reroll_pois()  # Re-rola los puntos de interés
-            self.check_game_over()  # Verifica las condiciones de fin del juego
-            self.current_step += 1  # Incrementa el contador de pasos del juego
+            self.play_round()
             # print(self.grid_structure)
         return self.get_game_state()  # Retorna el estado del juego
 
+    def play_round(self) -> None:
+        """
+        Avanza el juego un paso (bomberos y fin de ronda) sin armar el estado del juego. Si hay
+        registro de pasos o métricas, cronometra cada fase y anota el paso.
+        """
+        if self.step_log is None and self.metrics is None:
+            self.schedule.step()  # Avanza el planificador de agentes
+            self.end_round()
+            return
+        marks = [perf_counter()]
+        self.schedule.step()
+        marks.append(perf_counter())
+        self.end_round(marks)
+        if self.step_log is not None:
+            self.step_log.record(self, marks)
+        if self.metrics is not None:
+            self.metrics.record(self, marks)
+
+    def end_round(self, marks: List[float] = None) -> None:
+        """
+        Termina un paso después de que actuaron los bomberos: fuego, bomberos y víctimas, POIs y
+        condiciones de fin del juego. También lo usan las simulaciones del planificador.
+
+        Parámetros:
+        - marks: Si se da, se le agrega el instante (perf_counter) en que termina cada fase
+          (fuego, bomberos y víctimas, POIs y fin del juego; ver step_log.PHASES).
+        """
+        self.advance_fire()  # Avanza el estado del fuego
+        if marks is not None:
+            marks.append(perf_counter())
+        self.check_firefighters_and_victims(self.current_step)  # Verifica el estado de bomberos y víctimas
+        if marks is not None:
+            marks.append(perf_counter())
+        self.reroll_pois()  # Re-rola los puntos de interés
+        if marks is not None:
+            marks.append(perf_counter())
+        self.check_game_over()  # Verifica las condiciones de fin del juego
+        if marks is not None:
+            marks.append(perf_counter())
+        self.current_step += 1  # Incrementa el contador de pasos del juego
+        if self.pathing is not None:
+            self.pathing.release_expired(self.current_step)  # Libera reservaciones de pasos pasados
+
+    def fork(self, rng: random.Random = None) -> 'FlashPointModel':
+        """
+        Crea una copia barata del juego para simular jugadas sin modificar el original.
+
+        Se comparte todo lo que no cambia durante el juego (topología del tablero y de las
+        aristas, grid_structure fuera de los límites, puertas, campos de distancia ya
+        calculados) y las listas de grid_structure, que nunca se modifican en su lugar. Se
+        copian solo los arreglos del tablero, el estado de paredes y puertas, los contadores
+        y los bomberos. La copia usa su propio generador, no tiene planificador,
+        reservaciones, registro de pasos ni métricas, no imprime mensajes y sus bomberos siguen
+        las reglas fijas.
+
+        Parámetros:
+        - rng: Generador de la copia (para todas las tiradas y el orden de los bomberos); por
+          defecto uno nuevo.
+          Un planificador que simula una copia a la vez puede pasar siempre el mismo.
+
+        Retorna:
+        - Un FlashPointModel independiente en el mismo estado.
+        """
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.random = rng if rng is not None else random.Random()
+        clone.rng = clone.random
+        clone.fire_rng = clone.poi_rng = clone.respawn_rng = clone.random
+        clone.planner = None
+        clone.pathing = None
+        clone.step_log = None
+        clone.metrics = None
+        clone.quiet = True
+
+        clone.board = self.board.fork()
+        clone.fire = clone.board.fire
+        clone.smoke = clone.board.smoke
+        clone.pois = clone.board.pois
+        clone.frontier = self.frontier.fork(clone.board)
+        clone.rays = self.rays.fork(clone.board)
+        clone.free_cells = FreeCellIndex(clone.board)
+        clone.navigation = self.navigation.fork(clone.board)
+        clone.edges = self.edges.fork()
+        clone.grid_structure = dict(self.grid_structure)
+        clone.victims = list(self.victims)
+        clone.ff_ids = list(self.ff_ids)
+
+        # Cuadrícula vacía con las mismas dimensiones y scheduler nuevo, de la misma implementación
+        clone.grid = empty_grid_like(self.grid)
+        clone.schedule = make_scheduler(self.backend, clone)
+
+        # Copia de los bomberos en el mismo orden del scheduler
+        clone.schedule.steps = self.schedule.steps
+        clone.schedule.time = self.schedule.time
+        copies = {}
+        for agent in self.schedule.agents:
+            twin = agent.fork(clone)
+            clone.grid.place_agent(twin, agent.pos)
+            clone.schedule.add(twin)
+            copies[agent.unique_id] = twin
+        clone.agents = AgentRegistry(clone.board)
+        for agent in self.agents:
+            clone.agents.add(copies[agent.unique_id])
+        clone.agents.burning = set(self.agents.burning)
+        return clone
+
+    def streams(self) -> List[random.Random]:
+        """
+        Generadores de los flujos de azar, en el orden de RNG_STREAMS (pueden ser el mismo objeto).
+        """
+        return [self.fire_rng, self.poi_rng, self.respawn_rng]
+
+    def sample_cell(self, stream: random.Random, exclude: int) -> Optional[Tuple[int, int]]:
+        """
+        Elige al azar una celda del edificio libre según exclude (ver free_cells).
+
+        Parámetros:
+        - stream: Flujo de azar de la tirada (poi_rng o respawn_rng).
+        - exclude: Combinación de condiciones EXCLUDE_*.
+
+        Retorna:
+        - La posición (x, y) elegida, o None si no hay celdas que cumplan.
+
+        Comportamiento:
+        - Un flujo separado (ver streams) usa el muestreo emparejado, para que dos juegos con
+          la misma semilla elijan la misma celda; el flujo compartido usa el muestreo del grupo,
+          que cuesta una sola tirada.
+        """
+        if stream is self.rng:
+            return self.free_cells.sample(stream, exclude)
+        return self.free_cells.sample_paired(stream, exclude)
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Reporta los bytes que ocupa el juego por subsistema (ver memory_report.py).
+
+        Retorna:
+        - Un diccionario subsistema -> bytes con el total del juego en "total" y, aparte, las
+          tablas compartidas con otros juegos del proceso en "shared".
+        """
+        return model_memory_report(self)
+
+    def save_checkpoint(self) -> bytes:
+        """
+        Guarda el estado completo del juego en un checkpoint binario compacto (ver checkpoint.py).
+
+        Retorna:
+        - Los bytes del checkpoint, que se pueden cargar con load_checkpoint en otro proceso.
+        """
+        return encode_checkpoint(self)
+
+    def load_checkpoint(self, data: bytes) -> None:
+        """
+        Restaura un checkpoint sobre este modelo, que debe haberse construido con el mismo escenario
+        (dimensiones, paredes, puertas y salidas).
+
+        Comportamiento:
+        - Reemplaza contadores, reglas del juego, bolsa de víctimas, bomberos, fuego, humo, POIs, paredes y puertas,
+          y el estado de los generadores.
+        - Reconstruye grid_structure y los índices derivados del tablero (frente del fuego, rayos,
+          celdas libres, campos de distancia y reservaciones).
+
+        Parámetros:
+        - data: Bytes generados por save_checkpoint.
+
+        Lanza:
+        - ValueError si el checkpoint no es válido, es de otro escenario o separa otros flujos
+          de azar que este modelo (ver streams).
+        """
+        ckpt = decode_checkpoint(data)
+        board, edges = self.board, self.edges
+        if (ckpt.width, ckpt.height) != (self.width, self.height) or ckpt.topology != self.topology.fingerprint:
+            raise ValueError("El checkpoint es de otro escenario")
+        if ckpt.stream_mask != stream_mask(self):
+            raise ValueError("El checkpoint separa otros flujos de azar que este modelo")
+
+        # Contadores
+        self.current_step = ckpt.current_step
+        self.damage_markers = ckpt.damage_markers
+        self.rescued_victims = ckpt.rescued_victims
+        self.lost_victims = ckpt.lost_victims
+        self.poi_count = ckpt.poi_count
+        self.max_pois_onBoard = ckpt.max_pois_onBoard
+        self.running = ckpt.running
+        self.n_agents = len(ckpt.agents) + len(ckpt.ff_ids)  # En el tablero más los derribados
+        self.n_rescuers = ckpt.n_rescuers
+        self.max_damage = ckpt.max_damage
+        self.max_lost = ckpt.max_lost
+        self.rescue_goal = ckpt.rescue_goal
+        self.victims = ckpt.victims
+        self.ff_ids = ckpt.ff_ids
+
+        # Tablero, paredes y puertas (sin avisar a los observadores; se reconstruyen abajo)
+        self.fire.load(ckpt.fire)
+        self.smoke.load(ckpt.smoke)
+        self.pois.load(ckpt.pois)
+        board.edge_cost[:] = ckpt.edge_cost
+        board.edge_version += 1
+        edges.state[:] = ckpt.edge_state
+        edges.health[:] = ckpt.edge_health
+        # Solo las paredes y puertas cambian de costo: se sincronizan sus entradas de grid_structure
+        for eid in range(len(edges)):
+            cid1, cid2, d = edges.cell1[eid], edges.cell2[eid], edges.direction[eid]
+            for cid, half in ((cid1, cid1 * 4 + d), (cid2, cid2 * 4 + OPPOSITE[d])):
+                slot = board.structure_slot[half]
+                pos = board.positions[cid]
+                if slot >= 0 and self.grid_structure[pos][slot][1] != board.edge_cost[half]:
+                    connections = list(self.grid_structure[pos])
+                    connections[slot] = (connections[slot][0], board.edge_cost[half])
+                    self.grid_structure[pos] = connections
+
+        # Bomberos, en el orden del scheduler
+        for agent in self.schedule.agents:
+            self.grid.remove_agent(agent)
+            self.schedule.remove(agent)
+        self.agents.clear()
+        board.occupancy[:] = bytes(board.n_cells)
+        self.frontier.rebuild()
+        self.rays.reset()
+        self.free_cells.restore(ckpt.free_pools)
+        self.navigation.reset()
+        if self.pathing is not None:
+            self.pathing = CooperativePathing(self, self.navigation, self.pathing.horizon)
+        for unique_id, pos, ap, saved_ap, carrying, focus in ckpt.agents:
+            agent = FirefighterAgent(unique_id, self)
+            agent.ap = ap
+            agent.saved_ap = saved_ap
+            agent.carrying_victim = carrying
+            agent.focus = focus
+            agent.position = pos
+            self.schedule.add(agent)
+            self.grid.place_agent(agent, pos)
+            board.place_occupant(pos)
+            self.agents.add(agent)
+        self.schedule.steps = ckpt.schedule_steps
+        self.schedule.time = ckpt.schedule_time
+
+        # Generadores
+        self.rng.setstate(ckpt.rng_state)
+        self.random.setstate(ckpt.model_random_state)
+        separate = [stream for stream in self.streams() if stream is not self.rng]
+        for stream, state in zip(separate, ckpt.stream_states):
+            stream.setstate(state)
+
     def advance_fire(self) -> None:
         """
         Avanza el estado del fuego en el juego.
@@ -829,7 +1156,7 @@ class FlashPointModel(Model):
         - Rola para determinar la posición del nuevo humo.
         - Maneja la propagación del fuego (flashover).
         """
-        fire_roll = (random.randint(1, 6), random.randint(1, 8))  # Genera una nueva posición para el humo
+        fire_roll = (self.fire_rng.randint(1, self.height), self.fire_rng.randint(1, self.width))  # Genera una nueva posición para el humo
         self.place_smoke(fire_roll)  # Coloca humo en la nueva posición
         self.handle_flashover()  # Maneja la propagación del fuego
 
@@ -840,16 +1167,16 @@ class FlashPointModel(Model):
         - Añade nuevos POIs si hay menos de max_pois_onBoard.
         - Elimina fuego y humo de las posiciones de los nuevos POIs.
         """
-        revealed_pois = sum(1 for poi in self.pois.values() if poi["revealed"])  # Cuenta los POIs revelados
+        revealed_pois = self.pois.revealed_count()  # Cuenta los POIs revelados
 
         # Añade nuevos POIs si es necesario
         while len(self.pois) < self.max_pois_onBoard:
-            poi_roll = (random.randint(1, 6), random.randint(1, 8))  # Genera una nueva posición para un POI
-            poi_pos = poi_roll
-            if poi_pos not in self.pois:
-                self.add_victim(poi_pos)  # Añade una víctima en la nueva posición
-                # Elimina fuego y humo de la posición del POI
-                self.remove_fire_and_smoke(poi_pos)
+            poi_pos = self.sample_cell(self.poi_rng, EXCLUDE_POI)  # Genera una nueva posición sin POI
+            if poi_pos is None:
+                break  # No quedan celdas sin POI
+            self.add_victim(poi_pos)  # Añade una víctima en la nueva posición
+            # Elimina fuego y humo de la posición del POI
+            self.remove_fire_and_smoke(poi_pos)
 
     def reveal_poi(self, pos: Tuple[int, int]) -> bool:
         """
@@ -861,15 +1188,15 @@ class FlashPointModel(Model):
         Retorna:
         - True si el POI revelado es una víctima, False en caso contrario.
         """
-        if pos in self.pois:
-            poi_info = self.pois[pos]
-            if not poi_info["revealed"]:
-                poi_info["revealed"] = True  # Marca el POI como revelado
-                if poi_info["is_victim"]:
+        cid = self.board.cell_id(pos)
+        flags = self.pois.cells[cid] if cid >= 0 else 0
+        if flags and not flags & POI_REVEALED:
+            if flags & POI_VICTIM:
+                self.pois.reveal_id(cid)  # Marca el POI como revelado
+                if not self.quiet:
                     print(f"A victim has been found at {pos}")  # Se ha encontrado una víctima en la posición
-                else:
-                    self.pois.pop(pos)  # Elimina el POI si no es una víctima
-                return poi_info["is_victim"]
+                return True
+            self.pois.discard_id(cid)  # Elimina el POI si no es una víctima
         return False
 
     '''Handling explosions smoke and fire'''
@@ -892,7 +1219,7 @@ class FlashPointModel(Model):
         elif pos in self.smoke:
             self.convert_smoke_to_fire(pos)  # Convierte el humo en fuego si ya hay humo en la posición
         else:
-            adjacent_fire = any(self.is_adjacent(pos, fire_pos) for fire_pos in self.fire)
+            adjacent_fire = self.frontier.touches_fire(self.board.cell_id(pos))
             if adjacent_fire:
                 self.fire.add(pos)  # Coloca fuego si está adyacente a fuego existente
             else:
@@ -927,11 +1254,14 @@ class FlashPointModel(Model):
         - Propaga el efecto de la explosión en las cuatro direcciones (arriba, abajo, izquierda, derecha).
         - Maneja daños a paredes, puertas, y coloca fuego o convierte humo según corresponda.
         """
-        print(f"Explosion at {pos}")  # Mensaje de explosión
+        if not self.quiet:
+            print(f"Explosion at {pos}")  # Mensaje de explosión
+        if self.metrics is not None:
+            self.metrics.explosions.inc()
         directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Direcciones de propagación
         for dx, dy in directions:
             new_pos = (pos[0] + dx, pos[1] + dy)
-            if new_pos in self.grid_structure:  # Verifica si la nueva posición es válida
+            if self.board.in_building(new_pos):  # Verifica si la nueva posición es válida
                 if self.wall_in_direction(pos, new_pos):
                     self.damage_wall(pos, new_pos)  # Daño a la pared si hay una
                 elif self.door_in_direction(pos, new_pos):
@@ -950,29 +1280,36 @@ class FlashPointModel(Model):
         - direction: Dirección en la que se propaga la onda de choque.
 
         Comportamiento:
-        - Propaga el efecto de la onda de choque en la dirección especificada hasta que encuentre un límite.
+        - Propaga el efecto de la onda de choque en la dirección especificada a través de las celdas con fuego
+          hasta que encuentre un límite (consultando el índice de rayos en lugar de avanzar celda por celda).
         - Conviertiendo humo en fuego, dañando paredes o puertas según corresponda.
         """
-        current_pos = start_pos
+        if self.metrics is not None:
+            self.metrics.shockwaves.inc()
+        d = direction_index((0, 0), direction)
+        cid = self.board.cell_id(start_pos)
         while True:
-            next_pos = (current_pos[0] + direction[0], current_pos[1] + direction[1])
-            if not self.is_valid_position(next_pos):
+            last = self.rays.find(cid, d)  # Última celda con fuego antes de la parada
+            next_cid = self.board.neighbors[last * 4 + d]
+            if next_cid < 0:
                 break  # Sale del bucle si la posición no es válida
-            
-            if next_pos not in self.fire:
-                if next_pos in self.smoke:
-                    self.convert_smoke_to_fire(next_pos)  # Convierte el humo en fuego
-                elif self.wall_in_direction(current_pos, next_pos):
-                    self.damage_wall(current_pos, next_pos)  # Daño a la pared
-                    break
-                elif self.door_in_direction(current_pos, next_pos):
-                    self.damage_door(current_pos, next_pos)  # Daño a la puerta
-                    break
-                else:
-                    self.place_fire_or_flip_smoke(next_pos)  # Coloca fuego o convierte humo
-                    break
-            
-            current_pos = next_pos  # Continúa con la siguiente posición
+
+            current_pos, next_pos = self.board.positions[last], self.board.positions[next_cid]
+            eid = self.edges.edge_at[last * 4 + d]
+            if self.smoke.has(next_cid):
+                # Como en la versión original, el humo se convierte aunque haya pared o puerta
+                # de por medio, y la onda continúa
+                self.convert_smoke_to_fire(next_pos)
+                cid = next_cid
+            elif self.edges.is_wall(eid):
+                self.damage_wall(current_pos, next_pos)  # Daño a la pared
+                break
+            elif self.edges.is_closed_door(eid):
+                self.damage_door(current_pos, next_pos)  # Daño a la puerta
+                break
+            else:
+                self.place_fire_or_flip_smoke(next_pos)  # Coloca fuego o convierte humo
+                break
 
     def place_fire_or_flip_smoke(self, pos: Tuple[int, int]) -> None:
         """
@@ -999,16 +1336,15 @@ class FlashPointModel(Model):
         Maneja el fenómeno de flashover, donde el fuego se propaga de manera explosiva a todas las posiciones adyacentes al humo.
 
         Comportamiento:
-        - Itera sobre las posiciones de humo y convierte el humo en fuego si alguna posición adyacente tiene fuego.
-        - Continúa el proceso hasta que no haya cambios adicionales.
+        - Toma del frente del fuego las posiciones de humo adyacentes a alguna posición con fuego y las convierte en fuego.
+        - Cada conversión agrega al frente el humo vecino que ahora toca el fuego, hasta que no queden pendientes.
         """
-        changed = True
-        while changed:
-            changed = False
-            for smoke_pos in list(self.smoke):
-                if any(self.is_adjacent(smoke_pos, fire_pos) for fire_pos in self.fire):
-                    self.convert_smoke_to_fire(smoke_pos)  # Convierte humo a fuego
-                    changed = True  # Marca que hubo un cambio
+        conversions = 0
+        for cid in self.frontier.pop_ignitions():
+            self.convert_smoke_to_fire(self.board.positions[cid])  # Convierte humo a fuego
+            conversions += 1
+        if conversions and self.metrics is not None:
+            self.metrics.flashovers.inc(conversions)
 
     def remove_fire_and_smoke(self, pos: Tuple[int, int]) -> None:
         """
@@ -1030,6 +1366,8 @@ class FlashPointModel(Model):
     '''Funcion para genera el json'''
     
     def return_json(self):
+        if self.quiet:
+            return
         # print(f"Grid actual {self.grid_structure}")
         print("\n")
         # print(f"Grid out of bounds {self.ouf_of_bounds_grid_structure}")
@@ -1039,8 +1377,8 @@ class FlashPointModel(Model):
         print(f"Ubicacion del humo: {self.smoke}")
         print(f"Ubicacion de los pois: {self.pois}")
         print(f"Victimas rescatadas: {self.rescued_victims}")
-        for agent in range(len(self.agents)):
-            print(f"Ubicacion de los agentes: {self.agents[agent].position}, esta cargando vicima: {self.agents[agent].carrying_victim}")
+        for agent in self.agents:
+            print(f"Ubicacion de los agentes: {agent.position}, esta cargando vicima: {agent.carrying_victim}")
 
     def get_game_state(self):
         return {
@@ -1053,62 +1391,27 @@ class FlashPointModel(Model):
             "running": self.running, # bool
             "agent_count": len(self.agents),  # int
             "fire_locations": list(self.fire), # list(iterable: Iterable[_T@list],/)
-            "smoke_locations": self.smoke, # Set[Tuple[int, int]]
-            "poi_locations": [{"position": pos, "revealed": info["revealed"]} for pos, info in self.pois.items()], # List[Dict[str, Union[Tuple[int, int], bool]]]
+            "smoke_locations": set(self.smoke), # Set[Tuple[int, int]]
+            "poi_locations": [{"position": self.board.positions[cid], "revealed": bool(self.pois.cells[cid] & POI_REVEALED)} for cid in self.pois.iter_ids()], # List[Dict[str, Union[Tuple[int, int], bool]]]
             "firefighter_positions": [{"id": agent.unique_id, "position": agent.position, "carrying_victim": agent.carrying_victim} for agent in self.agents if isinstance(agent, FirefighterAgent)] # List[Dict[str, Union[int, Tuple[int, int], bool]]]
         }
 
-GRID_WIDTH,GRID_HEIGHT = 8, 6
-wall_matrix = []
-victims = []
-fuego= []
-puertas=[]
-entrada=[]
-
-#esto va a entrar en el codigo
-with open("input.txt", 'r') as file:
-    lines = file.readlines()
-
 def chunks(lst, n):
     """Yield successive n-sized chunks from lst."""
     for i in range(0, len(lst), n):
         yield lst[i:i + n]
 
-for line in lines[:6]:
-    row = line.strip().split()
-    wall_matrix.append(row)
-
-for line in lines[6:9]:
-    parts = line.split()
-    if len(parts) == 3:
-        x, y = int(parts[0]), int(parts[1])
-        entity_type = parts[2]
-        if entity_type == 'v':
-            victims.append(((x, y), True))
-        else:
-            victims.append(((x, y), False))
-
-for line in lines[9:19]:
-    # Split the line into x and y
-    parts = line.split()
-    if len(parts) == 2:
-        x, y = int(parts[0]), int(parts[1])
-        fuego.append((x, y))
-
-for line in lines[19:27]:
-    parts = line.split()
-    if len(parts) == 4:
-        x1, y1, x2, y2 = map(int, parts)
-        puertas.append(((x1, y1), (x2, y2)))
-
-for line in lines[27:31]:
-    parts = line.split()
-    if len(parts) == 2:
-        x, y = int(parts[0]), int(parts[1])
-        entrada.append((x, y))
-
 # Example usage
 if __name__ == "__main__":
+    # El escenario se lee solo al ejecutar este archivo; importarlo no depende de input.txt
+    _config = parse_game_config("input.txt")
+    GRID_WIDTH, GRID_HEIGHT = board_size(_config)
+    wall_matrix = _config['wall_matrix']
+    victims = _config['victims']
+    fuego = _config['fire']
+    puertas = _config['doors']
+    entrada = _config['exits']
+
     model = FlashPointModel(GRID_WIDTH,GRID_HEIGHT,wall_matrix,victims,fuego,puertas,entrada)
     i =0
 
@@ -0,0 +1,307 @@
+import argparse
+import math
+import os
+import sys
+import time
+from multiprocessing import get_context
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from batch_engine import END_RESCUED
+from file_parser import parse_game_config
+from monte_carlo import OUTCOMES, GameRunner, OutcomeStats, RunningStat
+from sweep import SWEEP_PARAMETERS
+
+# Resultados que se pueden estimar: la tasa de victoria y los de monte_carlo.OUTCOMES
+WIN_RATE = "win_rate"
+METRICS = (WIN_RATE,) + tuple(name for _, name in OUTCOMES)
+
+# Motivos por los que se detiene una estimación
+STOP_PRECISION = "precision"  # Todos los intervalos alcanzaron la precisión pedida
+STOP_DECISION = "decision"  # El intervalo de la diferencia entre configuraciones excluye el umbral
+STOP_MAX_GAMES = "max_games"  # Se llegó al máximo de juegos
+
+# Contexto de cada proceso del pool, creado una sola vez por proceso
+_worker = None
+
+
+def metric_value(metric: str, reason: int, outcome: Dict[str, int]) -> float:
+    if metric == WIN_RATE:
+        return 1.0 if reason == END_RESCUED else 0.0
+    return float(outcome[metric])
+
+
+def interval(stats: OutcomeStats, metric: str, z: float) -> Tuple[float, float, float]:
+    """
+    Intervalo de confianza de un resultado de una configuración.
+
+    Parámetros:
+    - stats: Resumen de los juegos de la configuración.
+    - metric: Nombre en METRICS.
+    - z: Cuantil de la normal del nivel de confianza.
+
+    Retorna:
+    - (estimación, límite inferior, límite superior). La tasa de victoria usa el intervalo de
+      Wilson, que no colapsa cuando la tasa es 0 o 1; las medias usan la aproximación normal.
+    """
+    n = stats.games
+    if n == 0:
+        return math.nan, -math.inf, math.inf
+    if metric == WIN_RATE:
+        p = stats.reasons[END_RESCUED] / n
+        denominator = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denominator
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        return p, center - half, center + half
+    stat = stats.stats[metric]
+    half = z * stat.stderr
+    return stat.mean, stat.mean - half, stat.mean + half
+
+
+def difference_interval(stat: RunningStat, z: float) -> Tuple[float, float, float]:
+    """
+    Intervalo de confianza de la media de las diferencias por semilla entre dos configuraciones.
+    """
+    if stat.n < 2:
+        return math.nan, -math.inf, math.inf
+    half = z * stat.stderr
+    return stat.mean, stat.mean - half, stat.mean + half
+
+
+def look_z(confidence: float, look: int) -> float:
+    """
+    Cuantil de la normal para la revisión número look (desde 1).
+
+    Comportamiento:
+    - Reparte el error 1 - confidence entre todas las revisiones posibles (alfa_k = alfa * 6 /
+      (pi^2 k^2), que suma alfa), así que detenerse en cualquier revisión sigue respetando el
+      nivel de confianza pedido a pesar de mirar los resultados muchas veces.
+    """
+    alpha = (1.0 - confidence) * 6.0 / (math.pi ** 2 * look * look)
+    return NormalDist().inv_cdf(1.0 - alpha / 2.0)
+
+
+class AdaptiveResult:
+    """
+    Resultado de run_adaptive: resúmenes de cada configuración, intervalos finales, diferencia
+    entre configuraciones (si son dos) y por qué se detuvo.
+    """
+
+    def __init__(self, configs: List[Dict], metrics: Sequence[str]):
+        self.configs = configs
+        self.metrics = list(metrics)
+        self.stats = [OutcomeStats() for _ in configs]
+        self.differences = {metric: RunningStat() for metric in self.metrics}  # Por semilla, primera menos segunda
+        self.looks = 0  # Revisiones hechas
+        self.z = math.inf  # Cuantil de la última revisión
+        self.stopped: Optional[str] = None  # STOP_*
+        self.decision: Optional[int] = None  # Índice de la configuración mejor, si se decidió
+
+    @property
+    def games(self) -> int:
+        return self.stats[0].games
+
+    def intervals(self) -> List[Dict[str, Tuple[float, float, float]]]:
+        return [{metric: interval(stats, metric, self.z) for metric in self.metrics} for stats in self.stats]
+
+    def difference(self, metric: str) -> Tuple[float, float, float]:
+        return difference_interval(self.differences[metric], self.z)
+
+    def variance_ratio(self, metric: str) -> float:
+        """
+        Varianza de la diferencia entre juegos independientes sobre la de la diferencia por
+        semilla: cuántas veces menos juegos necesita la comparación pareada para la misma precisión.
+        """
+        unpaired = 0.0
+        for stats in self.stats:
+            if metric == WIN_RATE:
+                p = stats.reasons[END_RESCUED] / stats.games if stats.games else 0.0
+                unpaired += p * (1 - p)
+            else:
+                unpaired += stats.stats[metric].variance
+        paired = self.differences[metric].variance
+        return unpaired / paired if paired > 0 else math.inf
+
+    def format(self) -> str:
+        lines = [f"stopped: {self.stopped} after {self.games} games per configuration ({self.looks} looks)"]
+        for index, (params, intervals) in enumerate(zip(self.configs, self.intervals())):
+            lines.append(f"[{index}] {params or 'default'}")
+            for metric, (estimate, low, high) in intervals.items():
+                lines.append(f"    {metric}: {estimate:.4f} [{low:.4f}, {high:.4f}]")
+        if len(self.configs) == 2:
+            for metric in self.metrics:
+                estimate, low, high = self.difference(metric)
+                lines.append(f"difference {metric} [0] - [1]: {estimate:.4f} [{low:.4f}, {high:.4f}] "
+                             f"(paired variance ratio {self.variance_ratio(metric):.1f})")
+            if self.decision is not None:
+                lines.append(f"decision: [{self.decision}] is higher on {self.metrics[0]}")
+        return "\n".join(lines)
+
+
+def _init_worker(*args) -> None:
+    global _worker
+    _worker = GameRunner(*args)
+
+
+def _play_job(job: Tuple[List[Dict], Sequence[str], range]) -> Tuple[List[OutcomeStats], Dict[str, RunningStat]]:
+    """
+    Juega las semillas de una tarea con cada configuración y devuelve sus resúmenes y las
+    diferencias por semilla entre la primera y la segunda.
+    """
+    configs, metrics, seeds = job
+    stats = [OutcomeStats() for _ in configs]
+    differences = {metric: RunningStat() for metric in metrics}
+    for seed in seeds:
+        values = []
+        for params, summary in zip(configs, stats):
+            reason, outcome = _worker.play_game(seed, params)
+            summary.add(reason, outcome)
+            values.append([metric_value(metric, reason, outcome) for metric in metrics])
+        if len(values) == 2:
+            for metric, a, b in zip(metrics, values[0], values[1]):
+                differences[metric].add(a - b)
+    return stats, differences
+
+
+def run_adaptive(scenario: Dict, configs: List[Dict] = None, metrics: Sequence[str] = (WIN_RATE, "rescued"),
+                 precision: Optional[float] = 0.05, threshold: Optional[float] = None, confidence: float = 0.95,
+                 batch_size: int = 256, min_games: int = 256, max_games: int = 100000, seed: int = 0,
+                 workers: Optional[int] = None, chunk_size: int = 32, width: int = None, height: int = None,
+                 max_steps: int = 1000, split_streams: bool = True, on_look: Callable[[AdaptiveResult], None] = None) -> AdaptiveResult:
+    """
+    Juega por tandas hasta que las estimaciones alcanzan la precisión pedida o, con dos
+    configuraciones, hasta que se puede decidir cuál es mejor.
+
+    Parámetros:
+    - scenario: Escenario como lo devuelve file_parser.parse_game_config.
+    - configs: Una o dos configuraciones (argumentos de FlashPointModel, ver
+      sweep.SWEEP_PARAMETERS); por defecto la configuración base.
+    - metrics: Resultados que se siguen (nombres de METRICS); con dos configuraciones el
+      primero es el que decide.
+    - precision: Media anchura máxima de los intervalos (en las unidades de cada resultado);
+      None para detenerse solo por decisión o por max_games.
+    - threshold: Con dos configuraciones, diferencia (primera menos segunda) contra la que se
+      decide; None no decide y solo estima.
+    - confidence: Nivel de confianza de los intervalos.
+    - batch_size: Juegos por configuración entre revisiones.
+    - min_games, max_games: Juegos por configuración antes de la primera revisión y como máximo.
+    - seed: El juego i usa la semilla seed + i en todas las configuraciones, así que las
+      diferencias se miden juego a juego con el mismo azar inicial.
+    - workers, chunk_size, width, height, max_steps: Como en monte_carlo.run_monte_carlo.
+    - split_streams: Separa las tiradas de fuego, POIs y reaparición de cada juego en flujos
+      propios (ver monte_carlo.GameRunner), para que las configuraciones vean las mismas tiradas
+      paso a paso y la diferencia por semilla tenga mucha menos varianza.
+    - on_look: Se llama con el resultado parcial en cada revisión.
+
+    Retorna:
+    - Un AdaptiveResult.
+
+    Lanza:
+    - ValueError si hay más de dos configuraciones o un resultado desconocido.
+    """
+    configs = [dict(params) for params in (configs or [{}])]
+    if len(configs) > 2:
+        raise ValueError("Se pueden comparar a lo más dos configuraciones")
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Resultados desconocidos: {', '.join(sorted(unknown))}")
+    result = AdaptiveResult(configs, metrics)
+    args = (scenario, width, height, 6, max_steps, None, split_streams)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = get_context().Pool(workers, initializer=_init_worker, initargs=args) if workers > 0 else None
+    if pool is None:
+        _init_worker(*args)
+    try:
+        next_look = min_games
+        while result.games < max_games:
+            target = min(next_look, max_games)
+            jobs = [(configs, result.metrics, range(seed + start, seed + min(start + chunk_size, target)))
+                    for start in range(result.games, target, chunk_size)]
+            partials = pool.imap_unordered(_play_job, jobs) if pool is not None else map(_play_job, jobs)
+            for stats, differences in partials:
+                for summary, partial in zip(result.stats, stats):
+                    summary.merge(partial)
+                for metric, stat in differences.items():
+                    result.differences[metric].merge(stat)
+            next_look = result.games + batch_size
+
+            result.looks += 1
+            result.z = look_z(confidence, result.looks)
+            if on_look is not None:
+                on_look(result)
+            if len(configs) == 2 and threshold is not None:
+                _, low, high = result.difference(result.metrics[0])
+                if low > threshold or high < threshold:
+                    result.stopped = STOP_DECISION
+                    result.decision = 0 if low > threshold else 1
+                    return result
+            if precision is not None and _precise(result, precision):
+                result.stopped = STOP_PRECISION
+                return result
+        result.stopped = STOP_MAX_GAMES
+        return result
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def _precise(result: AdaptiveResult, precision: float) -> bool:
+    halves = [(high - low) / 2 for intervals in result.intervals() for _, low, high in intervals.values()]
+    if len(result.configs) == 2:
+        halves.extend((high - low) / 2 for _, low, high in map(result.difference, result.metrics))
+    return all(half <= precision for half in halves)
+
+
+def _parse_config(text: str) -> Dict[str, int]:
+    params = {}
+    for pair in filter(None, text.split(",")):
+        name, _, value = pair.partition("=")
+        if name not in SWEEP_PARAMETERS or not value:
+            raise argparse.ArgumentTypeError(f"Se esperaba nombre=valor con nombre en {', '.join(SWEEP_PARAMETERS)}: {pair}")
+        params[name] = int(value)
+    return params
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Estima resultados de Flash Point jugando hasta alcanzar la precisión pedida.")
+    parser.add_argument("scenario", nargs="?", default="input.txt", help="Archivo del escenario (por defecto input.txt)")
+    parser.add_argument("-c", "--config", type=_parse_config, action="append", default=[],
+                        help="Configuración nombre=valor,... (hasta dos; con dos se comparan)")
+    parser.add_argument("-m", "--metric", action="append", choices=METRICS,
+                        help="Resultado que se sigue (se puede repetir; por defecto win_rate y rescued)")
+    parser.add_argument("--precision", type=float, default=0.05, help="Media anchura máxima de los intervalos (0 = sin límite)")
+    parser.add_argument("--threshold", type=float, default=None, help="Con dos configuraciones, diferencia contra la que se decide")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Nivel de confianza")
+    parser.add_argument("--batch-size", type=int, default=256, help="Juegos por configuración entre revisiones")
+    parser.add_argument("--min-games", type=int, default=256, help="Juegos antes de la primera revisión")
+    parser.add_argument("--max-games", type=int, default=100000, help="Juegos máximos por configuración")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Semilla del primer juego")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos (por defecto uno por CPU; 0 = sin pool)")
+    parser.add_argument("--max-steps", type=int, default=1000, help="Pasos máximos por juego")
+    parser.add_argument("--width", type=int, default=None, help="Ancho del edificio (por defecto el de la matriz de paredes)")
+    parser.add_argument("--height", type=int, default=None, help="Altura del edificio (por defecto la de la matriz de paredes)")
+    parser.add_argument("--shared-streams", action="store_true",
+                        help="Usa un solo generador por juego en lugar de flujos separados de fuego, POIs y reaparición")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Muestra cada revisión en stderr")
+    args = parser.parse_args(argv)
+    if len(args.config) > 2:
+        parser.error("Se pueden comparar a lo más dos configuraciones")
+
+    def look(result: AdaptiveResult) -> None:
+        if args.verbose:
+            print(f"--- look {result.looks} ---\n{result.format()}", file=sys.stderr)
+
+    start = time.perf_counter()
+    result = run_adaptive(parse_game_config(args.scenario), args.config, args.metric or (WIN_RATE, "rescued"),
+                          args.precision or None, args.threshold, args.confidence, args.batch_size, args.min_games,
+                          args.max_games, args.seed, args.workers, width=args.width, height=args.height,
+                          max_steps=args.max_steps, split_streams=not args.shared_streams, on_look=look)
+    print(result.format())
+    print(f"elapsed: {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+from typing import Dict, Iterator, List, Optional, Set
+
+from board_state import BoardState
+
+
+class AgentRegistry:
+    """
+    Registro de los bomberos activos de un juego.
+
+    Guarda los agentes por id (en orden de llegada, como la antigua lista del modelo), un
+    índice celda -> agentes y el conjunto de celdas donde un bombero pudo quedar en el fuego:
+    las que se incendiaron estando ocupadas y aquellas a las que un bombero entró con fuego.
+    Así los bomberos derribados se detectan en O(celdas cambiadas) en lugar de revisar a
+    todos los agentes, y agregar o quitar un agente cuesta O(1).
+    """
+
+    def __init__(self, board: BoardState):
+        """
+        Parámetros:
+        - board: Tablero cuya capa de fuego se observa.
+        """
+        self.board = board
+        self.by_id: Dict[int, object] = {}  # Id -> agente, en orden de llegada
+        self.order: Dict[int, int] = {}  # Id -> número de llegada (para ordenar a los derribados)
+        self.at_cell: Dict[int, List[object]] = {}  # Id de celda -> agentes en la celda
+        self.burning: Set[int] = set()  # Celdas ocupadas que pudieron quedar en el fuego
+        self.arrivals = 0  # Contador de llegadas
+        board.fire.watchers.append(self)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.by_id.values())
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, agent) -> bool:
+        return self.by_id.get(agent.unique_id) is agent
+
+    def get(self, unique_id: int) -> Optional[object]:
+        return self.by_id.get(unique_id)
+
+    def agents_at(self, pos) -> List:
+        """
+        Devuelve los agentes en una posición.
+        """
+        return list(self.at_cell.get(self.board.cell_id(pos), ()))
+
+    def add(self, agent) -> None:
+        """
+        Registra un agente en su posición actual (agent.position).
+        """
+        self.by_id[agent.unique_id] = agent
+        self.order[agent.unique_id] = self.arrivals
+        self.arrivals += 1
+        cid = self.board.cell_id(agent.position)
+        self.at_cell.setdefault(cid, []).append(agent)
+        if self.board.fire.cells[cid]:
+            self.burning.add(cid)
+
+    def remove(self, agent) -> None:
+        """
+        Quita un agente del registro.
+        """
+        del self.by_id[agent.unique_id]
+        del self.order[agent.unique_id]
+        self._leave(agent, self.board.cell_id(agent.position))
+
+    def move(self, agent, old_pos, new_pos) -> None:
+        """
+        Actualiza el índice cuando un agente cambia de celda.
+        """
+        self._leave(agent, self.board.cell_id(old_pos))
+        cid = self.board.cell_id(new_pos)
+        self.at_cell.setdefault(cid, []).append(agent)
+        if self.board.fire.cells[cid]:
+            self.burning.add(cid)
+
+    def clear(self) -> None:
+        self.by_id = {}
+        self.order = {}
+        self.at_cell = {}
+        self.burning = set()
+
+    def pop_knocked_down(self) -> List:
+        """
+        Extrae los agentes que están en una celda con fuego.
+
+        Retorna:
+        - Los agentes derribados en orden de llegada (el mismo orden en que los encontraba el
+          recorrido de la lista de agentes).
+        """
+        fire = self.board.fire.cells
+        knocked = []
+        for cid in self.burning:
+            if fire[cid]:
+                knocked.extend(self.at_cell.get(cid, ()))
+        self.burning = set()
+        knocked.sort(key=lambda agent: self.order[agent.unique_id])
+        return knocked
+
+    def _leave(self, agent, cid: int) -> None:
+        agents = self.at_cell[cid]
+        agents.remove(agent)
+        if not agents:
+            del self.at_cell[cid]
+
+    def cell_added(self, layer, cid: int) -> None:
+        if cid in self.at_cell:
+            self.burning.add(cid)
+
+    def cell_removed(self, layer, cid: int) -> None:
+        return
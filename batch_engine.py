@@ -0,0 +1,659 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from board_state import OPPOSITE, POI_PRESENT, POI_REVEALED, POI_VICTIM
+from board_topology import BoardTopology
+from edge_store import DOOR_CLOSED, DOOR_DESTROYED, EDGE_DOOR, EDGE_WALL, WALL_DAMAGED, WALL_DESTROYED
+
+# Motivos de fin de un juego del lote
+END_RUNNING = 0  # El juego sigue en curso
+END_COLLAPSE = 1  # Llegó a 24 marcadores de daño
+END_LOST = 2  # Se perdieron 4 víctimas
+END_RESCUED = 3  # Se rescataron 7 víctimas
+END_NO_FIREFIGHTERS = 4  # No quedan bomberos en el tablero
+END_POOL_EMPTY = 5  # Se agotó la bolsa de víctimas (el modelo escalar lanza IndexError)
+# Nombre de cada motivo de fin, indexado por END_*
+END_NAMES = ("running", "collapse", "lost", "rescued", "no_firefighters", "pool_empty")
+
+# Vecindad de von Neumann con centro en el orden de la cuadrícula: arriba, izquierda, centro, derecha, abajo
+_NEIGHBORHOOD = (0, 1, -1, 3, 2)
+# Direcciones de la explosión en el orden de FlashPointModel.handle_explosion: derecha, izquierda, abajo, arriba
+_EXPLOSION = (3, 1, 2, 0)
+
+_INF = 1 << 20  # Distancia infinita (la suma de dos sigue cabiendo en int32)
+_FIELD_EXITS, _FIELD_FIRE, _FIELD_POIS = 0, 1, 2
+
+
+class BatchEngine:
+    """
+    Motor que simula B juegos independientes del mismo escenario en paso sincronizado.
+
+    El estado de todos los juegos vive en arreglos de NumPy apilados (fuego, humo, POIs,
+    costos de aristas, estado y salud de paredes y puertas, bomberos y contadores), y cada
+    fase del paso (acciones de los bomberos con las reglas fijas, humo, explosión, onda de
+    choque, flashover, bomberos derribados, reaparición, POIs y fin del juego) se aplica a
+    todo el lote con operaciones vectorizadas. Las reglas son las de FlashPointModel,
+    incluidas sus particularidades (los puntos de acción no se recargan, los movimientos al
+    azar no miran las paredes, el fin del juego compara con igualdad), así que los
+    resultados son estadísticamente equivalentes a los del modelo escalar, aunque no
+    reproducen sus tiradas una por una: el lote usa su propio numpy.random.Generator.
+
+    Diferencias deliberadas:
+    - Si la bolsa de víctimas se agota, el juego termina con END_POOL_EMPTY en lugar de
+      lanzar IndexError.
+    - Cuando dos caminos igual de baratos llevan al objetivo, los bomberos eligen la
+      primera dirección (arriba, izquierda, abajo, derecha) en lugar del orden del heap.
+    """
+
+    def __init__(self, topology: BoardTopology, victims, fire, batch_size: int, n_agents: int = 6, seed=None):
+        """
+        Parámetros:
+        - topology: Topología compilada del escenario (board_topology.BoardTopology).
+        - victims: Lista de POIs iniciales ((x, y), es_víctima).
+        - fire: Lista de posiciones iniciales de fuego.
+        - batch_size: Número de juegos del lote.
+        - n_agents: Bomberos por juego.
+        - seed: Semilla del generador del lote.
+        """
+        self.topology = topology
+        self.batch_size = batch_size
+        self.n_agents = n_agents
+        self.rng = np.random.default_rng(seed)
+        self.max_pois_onBoard = 3
+
+        board, edges = topology.board, topology.edges
+        self.width, self.height = board.width, board.height
+        self.cols = board.cols
+        n_cells = board.n_cells
+        self.sentinel = n_cells  # Celda extra, siempre vacía, para los vecinos fuera del tablero
+        n = n_cells + 1
+
+        # Tablas de topología (compartidas por todo el lote)
+        neighbors = np.asarray(board.neighbors, dtype=np.intp).reshape(n_cells, 4)
+        self.nb = np.full((n, 4), self.sentinel, dtype=np.intp)
+        self.nb[:n_cells] = np.where(neighbors >= 0, neighbors, self.sentinel)
+        self.building = np.zeros(n, dtype=bool)
+        self.building[:n_cells] = np.asarray(board.building, dtype=bool)
+        # Movimientos entre dos celdas del edificio (los únicos que consideran los campos de distancia)
+        self.inner = self.building[:, None] & self.building[self.nb]
+        self.exits = np.zeros(n, dtype=bool)
+        for pos in topology.exits:
+            cid = board.cell_id(pos)
+            if cid >= 0 and board.building[cid]:
+                self.exits[cid] = True
+        edge_at = np.asarray(edges.edge_at, dtype=np.intp).reshape(n_cells, 4)
+        self.edge_at = np.full((n, 4), -1, dtype=np.intp)
+        self.edge_at[:n_cells] = edge_at
+        self.kind = np.asarray(edges.kind, dtype=np.uint8)
+        self.cell1 = np.asarray(edges.cell1, dtype=np.intp)
+        self.cell2 = np.asarray(edges.cell2, dtype=np.intp)
+        self.dir1 = np.asarray(edges.direction, dtype=np.intp)
+        self.dir2 = np.asarray(OPPOSITE, dtype=np.intp)[self.dir1]
+        self.rescuer = np.arange(n_agents) < n_agents // 2  # Enfoque de cada id: rescate o extinción
+
+        # Estado inicial de un juego
+        base_cost = np.zeros((n, 4), dtype=np.uint8)
+        base_cost[:n_cells] = np.frombuffer(bytes(board.edge_cost), dtype=np.uint8).reshape(n_cells, 4)
+        self._base = (base_cost, np.asarray(edges.state, dtype=np.uint8), np.asarray(edges.health, dtype=np.uint8))
+        self.initial_fire = [board.cell_id(pos) for pos in fire]
+        self.initial_pois = [(board.cell_id(pos), is_victim) for pos, is_victim in victims]
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Reinicia todos los juegos del lote al estado inicial del escenario, con bomberos
+        colocados al azar en celdas sin fuego ni POIs.
+        """
+        B, n, A = self.batch_size, self.sentinel + 1, self.n_agents
+        base_cost, base_state, base_health = self._base
+        self.fire = np.zeros((B, n), dtype=bool)
+        self.smoke = np.zeros((B, n), dtype=bool)
+        self.poi = np.zeros((B, n), dtype=np.uint8)
+        self.occupancy = np.zeros((B, n), dtype=np.uint8)
+        self.cost = np.repeat(base_cost[None], B, axis=0)
+        self.edge_state = np.repeat(base_state[None], B, axis=0)
+        self.edge_health = np.repeat(base_health[None], B, axis=0)
+        for cid in self.initial_fire:
+            self.fire[:, cid] = True
+        for cid, is_victim in self.initial_pois:
+            self.poi[:, cid] = POI_PRESENT | (POI_VICTIM if is_victim else 0)
+
+        self.position = np.full((B, A), self.sentinel, dtype=np.intp)
+        self.ap = np.full((B, A), 4, dtype=np.int16)
+        self.saved_ap = np.zeros((B, A), dtype=np.int16)
+        self.alive = np.zeros((B, A), dtype=bool)
+        self.waiting = np.zeros((B, A), dtype=bool)  # Derribados que esperan reaparecer
+        self.carrying = np.zeros((B, A), dtype=bool)
+
+        self.current_step = 0
+        self.damage_markers = np.zeros(B, dtype=np.int32)
+        self.rescued_victims = np.zeros(B, dtype=np.int32)
+        self.lost_victims = np.zeros(B, dtype=np.int32)
+        self.victim_pool = np.full(B, 14, dtype=np.int32)  # 10 víctimas y 4 falsas alarmas, se sacan del final
+        self.running = np.ones(B, dtype=bool)
+        self.end_reason = np.zeros(B, dtype=np.uint8)
+        self.steps = np.zeros(B, dtype=np.int32)  # Pasos jugados por cada juego
+        # Campos de distancias por juego (salidas, fuego, POIs) y si siguen vigentes; como en
+        # NavigationFields, un campo se recalcula solo cuando cambió el fuego, las aristas o los POIs
+        self.fields = np.zeros((3, B, n), dtype=np.int32)
+        self.fresh = np.zeros((3, B), dtype=bool)
+
+        games = np.arange(B)
+        for slot in range(A):
+            eligible = self.building & (self.occupancy == 0) & ~self.fire & (self.poi == 0)
+            cells, found = self._sample(eligible)
+            self._place(games[found], slot, cells[found])
+
+    '''Paso del lote'''
+
+    def step(self) -> None:
+        """
+        Avanza un paso todos los juegos en curso: acciones de los bomberos y luego el fin de ronda.
+        """
+        if not self.running.any():
+            return
+        self.act()
+        self.end_round()
+
+    def run(self, max_steps: int = 1000) -> Dict[str, np.ndarray]:
+        """
+        Avanza el lote hasta que terminen todos los juegos o se llegue a max_steps.
+
+        Retorna:
+        - El resumen por juego (ver summary).
+        """
+        while self.running.any() and self.current_step < max_steps:
+            self.step()
+        return self.summary()
+
+    def summary(self) -> Dict[str, np.ndarray]:
+        """
+        Devuelve los resultados por juego: pasos, marcadores de daño, víctimas rescatadas y
+        perdidas, motivo de fin (END_*) y si sigue en curso.
+        """
+        return {
+            "steps": self.steps.copy(),
+            "damage_markers": self.damage_markers.copy(),
+            "rescued_victims": self.rescued_victims.copy(),
+            "lost_victims": self.lost_victims.copy(),
+            "end_reason": self.end_reason.copy(),
+            "running": self.running.copy(),
+        }
+
+    def game_state(self, index: int) -> Dict:
+        """
+        Devuelve el estado de un juego del lote con las claves de FlashPointModel.get_game_state
+        (sin grid_structure).
+        """
+        positions = self.topology.board.positions
+        pois = self.poi[index, :self.sentinel]
+        return {
+            "step": int(self.steps[index]),
+            "damage_markers": int(self.damage_markers[index]),
+            "rescued_victims": int(self.rescued_victims[index]),
+            "lost_victims": int(self.lost_victims[index]),
+            "running": bool(self.running[index]),
+            "agent_count": int(self.alive[index].sum()),
+            "fire_locations": [positions[cid] for cid in np.flatnonzero(self.fire[index, :self.sentinel])],
+            "smoke_locations": {positions[cid] for cid in np.flatnonzero(self.smoke[index, :self.sentinel])},
+            "poi_locations": [{"position": positions[cid], "revealed": bool(pois[cid] & POI_REVEALED)}
+                              for cid in np.flatnonzero(pois)],
+            "firefighter_positions": [{"id": slot, "position": positions[self.position[index, slot]],
+                                       "carrying_victim": bool(self.carrying[index, slot])}
+                                      for slot in range(self.n_agents) if self.alive[index, slot]],
+        }
+
+    def end_round(self) -> None:
+        """
+        Fin de ronda de los juegos en curso, en el orden de FlashPointModel.end_round.
+        """
+        games = np.flatnonzero(self.running)
+        self.advance_fire(games)
+        self.check_firefighters_and_victims(games)
+        self.reroll_pois(games)
+        self.check_game_over(games)
+        self.steps[games] += 1
+        self.current_step += 1
+        self.fresh[:, games] = False  # El fuego, las aristas y los POIs cambiaron en el fin de ronda
+
+    '''Bomberos'''
+
+    def act(self) -> None:
+        """
+        Turno de los bomberos: en cada juego actúan en un orden aleatorio, uno por sub-paso, y
+        los sub-pasos se ejecutan a la vez en todo el lote.
+        """
+        B, A = self.batch_size, self.n_agents
+        order = np.argsort(self.rng.random((B, A)), axis=1)
+        for k in range(A):
+            slot = order[:, k]
+            games = np.flatnonzero(self.running & self.alive[np.arange(B), slot])
+            if games.size == 0:
+                continue
+            slot = slot[games]
+            self.ap[games, slot] += self.saved_ap[games, slot]
+            self.saved_ap[games, slot] = 0
+            # Sin puntos de acción todas las acciones fallan y no hay nada que guardar
+            active = self.ap[games, slot] > 0
+            games, slot = games[active], slot[active]
+            if games.size:
+                self._rule_action(games, slot)
+
+    def _rule_action(self, games: np.ndarray, slot: np.ndarray) -> None:
+        """
+        Ejecuta FirefighterAgent.rule_action para un bombero por juego.
+        """
+        done = np.zeros(games.size, dtype=bool)
+        rescuer = self.rescuer[slot]
+
+        # Rescate: llevar la víctima a una salida, revelar POIs o acercarse a ellos, extinguir si carga
+        carrying = self.carrying[games, slot] & rescuer
+        idx = np.flatnonzero(carrying)
+        done[idx] = self._navigate(games[idx], slot[idx], _FIELD_EXITS)
+        idx = np.flatnonzero(rescuer & ~done)
+        done[idx] = self._reveal_poi_action(games[idx], slot[idx])
+        idx = np.flatnonzero(rescuer & ~done & self.carrying[games, slot])
+        done[idx] = self._extinguish_action(games[idx], slot[idx], navigate=False)
+
+        # Extinción: extinguir alrededor o acercarse al fuego
+        idx = np.flatnonzero(~rescuer)
+        done[idx] = self._extinguish_action(games[idx], slot[idx], navigate=True)
+
+        idx = np.flatnonzero(~done)
+        done[idx] = self._random_move(games[idx], slot[idx])
+
+        # Si ninguna acción se realizó, el bombero guarda sus puntos de acción
+        games, slot = games[~done], slot[~done]
+        self.saved_ap[games, slot] = np.minimum(self.ap[games, slot], 4)
+        self.ap[games, slot] = 0
+
+    def _move(self, games: np.ndarray, slot: np.ndarray, target: np.ndarray) -> np.ndarray:
+        """
+        FirefighterAgent.move para un bombero por juego.
+
+        Retorna:
+        - Máscara de los movimientos realizados.
+        """
+        on_fire = self.fire[games, target]
+        carrying = self.carrying[games, slot]
+        cost = np.where(carrying | on_fire, 2, 1)
+        ok = (self.building[target] & (self.occupancy[games, target] == 0) & ~(carrying & on_fire)
+              & (self.ap[games, slot] >= cost))
+        games, slot, target = games[ok], slot[ok], target[ok]
+        self.ap[games, slot] -= cost[ok].astype(np.int16)
+        self.occupancy[games, self.position[games, slot]] -= 1
+        self.occupancy[games, target] += 1
+        self.position[games, slot] = target
+
+        # Revelar el POI de la celda; un bombero de rescate sin víctima la carga
+        flags = self.poi[games, target]
+        hidden = flags & (POI_PRESENT | POI_REVEALED) == POI_PRESENT
+        victim = hidden & (flags & POI_VICTIM != 0)
+        self.poi[games[victim], target[victim]] |= POI_REVEALED
+        false_alarm = hidden & ~victim
+        self.poi[games[false_alarm], target[false_alarm]] = 0
+        self.fresh[_FIELD_POIS, games[hidden]] = False
+        picks = victim & self.rescuer[slot] & ~self.carrying[games, slot]
+        self.carrying[games[picks], slot[picks]] = True
+
+        # Rescatar a la víctima en una salida
+        rescued = self.carrying[games, slot] & self.exits[target]
+        self.rescued_victims[games[rescued]] += 1
+        self.carrying[games[rescued], slot[rescued]] = False
+        return ok
+
+    def _navigate(self, games: np.ndarray, slot: np.ndarray, field: int) -> np.ndarray:
+        """
+        FirefighterAgent.navigate sin planificación cooperativa: un paso por el camino más
+        barato del campo de distancias.
+        """
+        if games.size == 0:
+            return np.zeros(0, dtype=bool)
+        target = self._next_step(games, self.position[games, slot], field)
+        ok = np.zeros(games.size, dtype=bool)
+        idx = np.flatnonzero(target != self.sentinel)
+        ok[idx] = self._move(games[idx], slot[idx], target[idx])
+        return ok
+
+    def _reveal_poi_action(self, games: np.ndarray, slot: np.ndarray) -> np.ndarray:
+        done = np.zeros(games.size, dtype=bool)
+        position = self.position[games, slot]
+        for d in _NEIGHBORHOOD:
+            cell = position if d < 0 else self.nb[position, d]
+            flags = self.poi[games, cell]
+            idx = np.flatnonzero(~done & (flags & (POI_PRESENT | POI_REVEALED) == POI_PRESENT)
+                                 & (self.occupancy[games, cell] == 0) & self.building[cell])
+            done[idx] = self._move(games[idx], slot[idx], cell[idx])
+        idx = np.flatnonzero(~done & ~self.carrying[games, slot])
+        done[idx] = self._navigate(games[idx], slot[idx], _FIELD_POIS)
+        return done
+
+    def _extinguish_action(self, games: np.ndarray, slot: np.ndarray, navigate: bool) -> np.ndarray:
+        """
+        FirefighterAgent.extinguish_action: extingue la primera celda vecina (o la propia) con
+        fuego o humo; con navigate, si no hay ninguna se acerca al fuego.
+        """
+        done = np.zeros(games.size, dtype=bool)
+        if games.size == 0:
+            return done
+        position = self.position[games, slot]
+        target = np.full(games.size, self.sentinel, dtype=np.intp)
+        for d in reversed(_NEIGHBORHOOD):
+            cell = position if d < 0 else self.nb[position, d]
+            burning = self.fire[games, cell] | self.smoke[games, cell]
+            target = np.where(burning, cell, target)
+        found = target != self.sentinel
+
+        fire = found & self.fire[games, target] & (self.ap[games, slot] >= 2)
+        smoke = found & ~fire & self.smoke[games, target] & (self.ap[games, slot] >= 1)
+        self.fire[games[fire], target[fire]] = False
+        self.fresh[:, games[fire]] = False
+        self.ap[games[fire], slot[fire]] -= 2
+        self.smoke[games[smoke], target[smoke]] = False
+        self.ap[games[smoke], slot[smoke]] -= 1
+        done = fire | smoke
+        if navigate:
+            idx = np.flatnonzero(~found)
+            done[idx] = self._navigate(games[idx], slot[idx], _FIELD_FIRE)
+        return done
+
+    def _random_move(self, games: np.ndarray, slot: np.ndarray) -> np.ndarray:
+        """
+        FirefighterAgent.random_move: intenta moverse a la primera vecina libre del edificio en
+        un orden de direcciones al azar (sin mirar paredes).
+        """
+        if games.size == 0:
+            return np.zeros(0, dtype=bool)
+        position = self.position[games, slot]
+        order = np.argsort(self.rng.random((games.size, 4)), axis=1)
+        target = np.full(games.size, self.sentinel, dtype=np.intp)
+        for j in range(3, -1, -1):
+            cell = self.nb[position, order[:, j]]
+            free = self.building[cell] & (self.occupancy[games, cell] == 0)
+            target = np.where(free, cell, target)
+        ok = np.zeros(games.size, dtype=bool)
+        idx = np.flatnonzero(target != self.sentinel)
+        ok[idx] = self._move(games[idx], slot[idx], target[idx])
+        return ok
+
+    def _next_step(self, games: np.ndarray, position: np.ndarray, field: int) -> np.ndarray:
+        """
+        Devuelve, para cada juego, la celda siguiente del camino más barato desde position en
+        el campo dado, o el centinela si no hay paso (ya en una fuente o sin camino).
+        """
+        dist = self._field(games, field)
+        rows = np.arange(games.size)[:, None]
+        neighbor = self.nb[position]  # (g, 4)
+        fire = self.fire[games[:, None], neighbor]
+        reach = dist[rows, neighbor]
+        if field == _FIELD_EXITS:
+            reach = np.where(fire & (reach > 0), _INF, reach)  # Con víctima no se cruza el fuego
+        weight = np.where(self.inner[position], self.cost[games, position] + fire, _INF)
+        cand = reach + weight
+        best_d = np.argmin(cand, axis=1)
+        rows = rows[:, 0]
+        here = dist[rows, position]
+        has_step = (here > 0) & (here < _INF) & (cand[rows, best_d] < _INF)
+        return np.where(has_step, neighbor[rows, best_d], self.sentinel)
+
+    def _field(self, games: np.ndarray, field: int) -> np.ndarray:
+        """
+        Devuelve los campos de distancias de los juegos dados, recalculando los que ya no están
+        vigentes (como NavigationFields.build).
+        """
+        stale = games[~self.fresh[field, games]]
+        if stale.size:
+            fire = self.fire[stale]
+            if field == _FIELD_EXITS:
+                sources = np.broadcast_to(self.exits, fire.shape)
+            elif field == _FIELD_FIRE:
+                sources = fire & self.building
+            else:
+                sources = self.poi[stale] & (POI_PRESENT | POI_REVEALED) == POI_PRESENT
+            # Peso de cada movimiento (celda, dirección): costo de la arista más el recargo por
+            # entrar al fuego; los movimientos que salen del edificio no existen
+            cost = self.cost[stale].astype(np.int32)
+            weight = [np.where(self.inner[:, d], cost[:, :, d] + fire[:, self.nb[:, d]], _INF) for d in range(4)]
+            dist = np.where(sources, 0, _INF).astype(np.int32)
+            # Con víctima no se cruza el fuego: las celdas con fuego que no son fuente no propagan
+            blocked = fire & ~sources if field == _FIELD_EXITS else None
+
+            # Bellman-Ford vectorizado: cada iteración relaja las cuatro direcciones de todas las celdas
+            while True:
+                reach = dist if blocked is None else np.where(blocked, _INF, dist)
+                best = dist.copy()
+                for d in range(4):
+                    np.minimum(best, reach[:, self.nb[:, d]] + weight[d], out=best)
+                if not (best < dist).any():
+                    break
+                dist = best
+            self.fields[field, stale] = dist
+            self.fresh[field, stale] = True
+        return self.fields[field, games]
+
+    '''Fuego'''
+
+    def advance_fire(self, games: np.ndarray) -> None:
+        """
+        Tirada de humo, explosión y onda de choque, y flashover (FlashPointModel.advance_fire).
+        """
+        rows = self.rng.integers(1, self.height + 1, games.size)
+        cols = self.rng.integers(1, self.width + 1, games.size)
+        cell = rows * self.cols + cols
+
+        on_fire = self.fire[games, cell]
+        smoke = ~on_fire & self.smoke[games, cell]
+        self._explosion(games[on_fire], cell[on_fire])
+        self._ignite(games[smoke], cell[smoke])
+
+        rest = ~on_fire & ~smoke
+        g, c = games[rest], cell[rest]
+        neighbor = self.nb[c]
+        touches = (self.fire[g[:, None], neighbor] & self._open(self.cost[g, c])).any(axis=1)
+        self.fire[g[touches], c[touches]] = True
+        self.smoke[g[~touches], c[~touches]] = True
+
+        self._flashover(games)
+
+    def _explosion(self, games: np.ndarray, cell: np.ndarray) -> None:
+        for d in _EXPLOSION:
+            target = self.nb[cell, d]
+            inside = self.building[target]
+            g, c, t = games[inside], cell[inside], target[inside]
+            barrier = self._resolve_barrier(g, c, d)
+            g, t = g[~barrier], t[~barrier]
+            burning = self.fire[g, t]
+            self._shockwave(g[burning], t[burning], d)
+            self._ignite(g[~burning], t[~burning])
+
+    def _shockwave(self, games: np.ndarray, cell: np.ndarray, d: int) -> None:
+        """
+        Onda de choque en la dirección d desde celdas con fuego (FlashPointModel.handle_shockwave).
+        """
+        while games.size:
+            target = self.nb[cell, d]
+            passes = (self.fire[games, target] & self._open(self.cost[games, cell, d]))
+            # Las que siguen ardiendo avanzan una celda; las demás resuelven su parada
+            moving = games[passes], target[passes]
+            g, c = games[~passes], cell[~passes]
+            t = self.nb[c, d]
+            inside = t != self.sentinel
+            g, c, t = g[inside], c[inside], t[inside]
+            # El humo se convierte aunque haya pared o puerta de por medio, y la onda sigue
+            smoke = self.smoke[g, t]
+            flipped = g[smoke], t[smoke]
+            self._ignite(*flipped)
+            g, c, t = g[~smoke], c[~smoke], t[~smoke]
+            barrier = self._resolve_barrier(g, c, d)
+            g, t = g[~barrier], t[~barrier]
+            self._ignite(g, t)  # Fuego nuevo; la onda termina
+            games = np.concatenate((moving[0], flipped[0]))
+            cell = np.concatenate((moving[1], flipped[1]))
+
+    def _resolve_barrier(self, games: np.ndarray, cell: np.ndarray, d: int) -> np.ndarray:
+        """
+        Daña la pared en pie o destruye la puerta cerrada entre cell y su vecina en d.
+
+        Retorna:
+        - Máscara de los juegos que tenían una pared o puerta cerrada ahí.
+        """
+        eid = self.edge_at[cell, d]
+        has = eid >= 0
+        if not has.any():
+            return has
+        safe = np.where(has, eid, 0)
+        kind = self.kind[safe]
+        state = self.edge_state[games, safe]
+        wall = has & (kind == EDGE_WALL) & (state != WALL_DESTROYED)
+        door = has & (kind == EDGE_DOOR) & (state == DOOR_CLOSED)
+
+        g, e = games[wall], eid[wall]
+        self.damage_markers += np.bincount(g, minlength=self.batch_size).astype(np.int32)
+        self.edge_health[g, e] -= 1
+        destroyed = self.edge_health[g, e] == 0
+        self.edge_state[g, e] = np.where(destroyed, WALL_DESTROYED, WALL_DAMAGED)
+        self._open_edges(g[destroyed], e[destroyed])
+
+        g, e = games[door], eid[door]
+        self.edge_state[g, e] = DOOR_DESTROYED
+        self._open_edges(g, e)
+        return wall | door
+
+    def _open_edges(self, games: np.ndarray, eid: np.ndarray) -> None:
+        self.cost[games, self.cell1[eid], self.dir1[eid]] = 1
+        self.cost[games, self.cell2[eid], self.dir2[eid]] = 1
+
+    def _flashover(self, games: np.ndarray) -> None:
+        """
+        Convierte en fuego todo el humo conectado al fuego sin pared ni puerta cerrada.
+        """
+        while games.size:
+            fire = self.fire[games]
+            touches = np.zeros(fire.shape, dtype=bool)
+            for d in range(4):
+                touches |= fire[:, self.nb[:, d]] & self._open(self.cost[games, :, d])
+            g, c = np.nonzero(self.smoke[games] & touches)
+            if g.size == 0:
+                break
+            self._ignite(games[g], c)
+            games = np.unique(games[g])
+
+    def _ignite(self, games: np.ndarray, cell: np.ndarray) -> None:
+        """
+        Coloca fuego (convirtiendo el humo) y pierde el POI de la celda si lo había.
+        """
+        self.smoke[games, cell] = False
+        self.fire[games, cell] = True
+        self._lose_pois(games, cell)
+
+    def _lose_pois(self, games: np.ndarray, cell: np.ndarray) -> None:
+        flags = self.poi[games, cell]
+        lost = (flags & POI_VICTIM != 0) & (flags & POI_REVEALED == 0)
+        self.lost_victims += np.bincount(games[lost], minlength=self.batch_size).astype(np.int32)
+        self.poi[games, cell] = 0
+
+    @staticmethod
+    def _open(cost: np.ndarray) -> np.ndarray:
+        return (cost != 5) & (cost != 2)
+
+    '''Bomberos derribados, POIs y fin del juego'''
+
+    def check_firefighters_and_victims(self, games: np.ndarray) -> None:
+        """
+        Retira a los bomberos en el fuego, hace reaparecer a los derribados en pasos pares y
+        pierde los POIs con fuego (FlashPointModel.check_firefighters_and_victims).
+        """
+        A = self.n_agents
+        rows = games[:, None]
+        knocked = self.alive[games] & self.fire[rows, self.position[games]]
+        g, slot = np.nonzero(knocked)
+        g = games[g]
+        np.subtract.at(self.occupancy, (g, self.position[g, slot]), 1)
+        self.alive[g, slot] = False
+        self.carrying[g, slot] = False
+        self.waiting[g, slot] = True
+        self.position[g, slot] = self.sentinel
+
+        if self.current_step % 2 == 0:
+            for slot in range(A):
+                g = games[self.waiting[games, slot]]
+                if g.size == 0:
+                    continue
+                cells, found = self._sample(self.building & (self.occupancy[g] == 0))
+                g, cells = g[found], cells[found]
+                self._place(g, slot, cells)
+                self.waiting[g, slot] = False
+                self.fire[g, cells] = False
+                flags = self.poi[g, cells]
+                hidden = flags & (POI_PRESENT | POI_REVEALED) == POI_PRESENT
+                victim = hidden & (flags & POI_VICTIM != 0)
+                self.poi[g[victim], cells[victim]] |= POI_REVEALED
+                self.poi[g[hidden & ~victim], cells[hidden & ~victim]] = 0
+
+        g, c = np.nonzero(self.fire[games] & (self.poi[games] != 0))
+        self._lose_pois(games[g], c)
+
+    def reroll_pois(self, games: np.ndarray) -> None:
+        """
+        Repone POIs hasta tener max_pois_onBoard, sacándolos de la bolsa de víctimas.
+        """
+        for _ in range(self.max_pois_onBoard):
+            g = games[self.running[games] & ((self.poi[games] != 0).sum(axis=1) < self.max_pois_onBoard)]
+            if g.size == 0:
+                return
+            cells, found = self._sample(self.building & (self.poi[g] == 0))
+            g, cells = g[found], cells[found]
+            empty = self.victim_pool[g] == 0
+            self.running[g[empty]] = False
+            self.end_reason[g[empty]] = END_POOL_EMPTY
+            g, cells = g[~empty], cells[~empty]
+            is_victim = self.victim_pool[g] <= 10
+            self.victim_pool[g] -= 1
+            self.poi[g, cells] = POI_PRESENT | np.where(is_victim, POI_VICTIM, 0).astype(np.uint8)
+            self.fire[g, cells] = False
+            self.smoke[g, cells] = False
+
+    def check_game_over(self, games: np.ndarray) -> None:
+        """
+        Termina los juegos que cumplen una condición de fin (FlashPointModel.check_game_over).
+        """
+        games = games[self.running[games]]
+        reason = np.select(
+            [self.damage_markers[games] == 24, self.lost_victims[games] == 4, self.rescued_victims[games] == 7,
+             ~self.alive[games].any(axis=1)],
+            [END_COLLAPSE, END_LOST, END_RESCUED, END_NO_FIREFIGHTERS], END_RUNNING)
+        over = reason != END_RUNNING
+        self.running[games[over]] = False
+        self.end_reason[games[over]] = reason[over]
+
+    '''Utilidades'''
+
+    def _sample(self, eligible: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Elige, por fila, una celda uniforme entre las elegibles.
+
+        Retorna:
+        - (celdas, hay_alguna); la celda es el centinela en las filas sin elegibles.
+        """
+        counts = eligible.sum(axis=1)
+        pick = (self.rng.random(eligible.shape[0]) * counts).astype(np.intp)
+        cells = (np.cumsum(eligible, axis=1) <= pick[:, None]).sum(axis=1)
+        found = counts > 0
+        return np.where(found, cells, self.sentinel), found
+
+    def _place(self, games: np.ndarray, slot: int, cells: np.ndarray) -> None:
+        self.position[games, slot] = cells
+        self.occupancy[games, cells] += 1
+        self.alive[games, slot] = True
+        self.ap[games, slot] = 4
+        self.saved_ap[games, slot] = 0
+        self.carrying[games, slot] = False
+
+
+def end_reason_counts(summary: Dict[str, np.ndarray]) -> Dict[str, int]:
+    """
+    Cuenta los juegos de un resumen por motivo de fin.
+    """
+    counts = np.bincount(summary["end_reason"], minlength=len(END_NAMES))
+    return {name: int(count) for name, count in zip(END_NAMES, counts)}
@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from board_topology import BoardTopology
+from file_parser import board_size, parse_game_config
+from FlashPoint_Backend import FlashPointModel
+from map_generator import generate_scenario
+from step_log import PHASES
+
+# Tamaños y bomberos por defecto; "input" es el tablero de input.txt
+DEFAULT_SIZES = ("input", "20x15", "50x50")
+DEFAULT_AGENTS = (6, 12)
+
+# Regresión: cuánto más lenta (en fracción) puede ser una medición antes de marcarla
+DEFAULT_THRESHOLD = 0.15
+
+# Un benchmark prepara su estado y devuelve una función que hace una operación y regresa los
+# segundos que tardó (para excluir la preparación de cada operación, como copiar el juego). Si
+# la función tiene un método close, se llama al terminar de medirla.
+Operation = Callable[[], float]
+
+
+class Board:
+    """
+    Escenario de un benchmark con su topología compilada.
+    """
+
+    def __init__(self, name: str, scenario_file: str = "input.txt"):
+        """
+        Parámetros:
+        - name: "input" (el escenario de scenario_file) o "ANCHOxALTO" (generado con semilla 0).
+        """
+        if name == "input":
+            self.scenario = parse_game_config(scenario_file)
+        else:
+            width, height = (int(value) for value in name.lower().split("x"))
+            self.scenario = generate_scenario(width, height, seed=0)
+        self.name = name
+        self.width, self.height = board_size(self.scenario)
+        self.topology = self.compile()
+
+    def compile(self) -> BoardTopology:
+        scenario = self.scenario
+        return BoardTopology(self.width, self.height, scenario["wall_matrix"], scenario["doors"], scenario["exits"],
+                             quiet=True)
+
+    def new_game(self, n_agents: int, seed: int, **kwargs) -> FlashPointModel:
+        return FlashPointModel(self.width, self.height, None, self.scenario["victims"], self.scenario["fire"], None,
+                               None, n_agents=n_agents, topology=self.topology, seed=seed, quiet=True, **kwargs)
+
+
+class _PhaseTimer:
+    """
+    Registro de pasos (ver FlashPointModel.play_round) que solo suma el tiempo de cada fase.
+    """
+
+    def __init__(self):
+        self.totals = [0.0] * len(PHASES)
+        self.steps = 0
+
+    def record(self, model, marks: List[float]) -> None:
+        for phase in range(len(PHASES)):
+            self.totals[phase] += marks[phase + 1] - marks[phase]
+        self.steps += 1
+
+
+def _played(board: Board, n_agents: int, seed: int, steps: int) -> FlashPointModel:
+    """
+    Juego avanzado algunos pasos, para medir estados de media partida.
+    """
+    model = board.new_game(n_agents, seed)
+    while model.running and model.current_step < steps:
+        model.play_round()
+    return model
+
+
+def bench_construct(board: Board, n_agents: int) -> Operation:
+    # Construcción completa desde el escenario, compilando la topología como server.new_game
+    scenario = board.scenario
+    seeds = iter(range(1 << 30))
+
+    def run() -> float:
+        start = time.perf_counter()
+        FlashPointModel(board.width, board.height, scenario["wall_matrix"], scenario["victims"], scenario["fire"],
+                        scenario["doors"], scenario["exits"], n_agents=n_agents, seed=next(seeds), quiet=True)
+        return time.perf_counter() - start
+    return run
+
+
+def bench_construct_shared(board: Board, n_agents: int) -> Operation:
+    # Construcción con la topología ya compilada, como los runners por lotes
+    seeds = iter(range(1 << 30))
+
+    def run() -> float:
+        start = time.perf_counter()
+        board.new_game(n_agents, next(seeds))
+        return time.perf_counter() - start
+    return run
+
+
+def _bench_phase(phase: int) -> Callable[[Board, int], Operation]:
+    def bench(board: Board, n_agents: int) -> Operation:
+        seeds = iter(range(1 << 30))
+        timer = _PhaseTimer()
+        model = board.new_game(n_agents, next(seeds), step_log=timer)
+
+        def run() -> float:
+            nonlocal model
+            if not model.running:
+                model = board.new_game(n_agents, next(seeds), step_log=timer)
+            before = timer.totals[phase]
+            try:
+                model.play_round()
+            except IndexError:
+                model.running = False  # Se agotó la bolsa de víctimas (ver FlashPointModel.add_victim)
+            return timer.totals[phase] - before
+        return run
+    return bench
+
+
+def bench_advance_fire_heavy(board: Board, n_agents: int) -> Operation:
+    # advance_fire con la mitad del edificio en humo y un cuarto en fuego (sin celdas con las dos)
+    model = board.new_game(n_agents, 0)
+    cells = sorted(model.building_cells)
+    for pos in cells[::2]:
+        model.fire.discard(pos)
+        model.smoke.add(pos)
+    for pos in cells[1::4]:
+        model.smoke.discard(pos)
+        model.fire.add(pos)
+    return _forked(model, lambda clone: clone.advance_fire())
+
+
+def bench_flashover_worst(board: Board, n_agents: int) -> Operation:
+    # handle_flashover con todo el edificio en humo salvo una celda de cada siete en fuego, para
+    # que casi cada cuarto tenga un frente que convierte todo su humo
+    model = board.new_game(n_agents, 0)
+    cells = sorted(model.building_cells)
+    for index, pos in enumerate(cells):
+        if index % 7:
+            model.fire.discard(pos)
+            model.smoke.add(pos)
+        else:
+            model.smoke.discard(pos)
+            model.fire.add(pos)
+    return _forked(model, lambda clone: clone.handle_flashover())
+
+
+def _forked(model: FlashPointModel, operation: Callable[[FlashPointModel], None]) -> Operation:
+    # Cada operación corre sobre una copia nueva del mismo estado; la copia no se mide
+    def run() -> float:
+        clone = model.fork()
+        start = time.perf_counter()
+        try:
+            operation(clone)
+        except IndexError:
+            pass  # Se agotó la bolsa de víctimas: el tiempo hasta ahí cuenta igual
+        return time.perf_counter() - start
+    return run
+
+
+def bench_game_state_json(board: Board, n_agents: int) -> Operation:
+    # get_game_state más convert_to_json_compatible, como /game_state sin Flask
+    from server import convert_to_json_compatible
+
+    model = _played(board, n_agents, 0, 10)
+
+    def run() -> float:
+        start = time.perf_counter()
+        convert_to_json_compatible(model.get_game_state())
+        return time.perf_counter() - start
+    return run
+
+
+class _HttpRoundTrip:
+    """
+    POST /step más GET /game_state con el cliente de pruebas de Flask, checkpoints incluidos.
+    Los checkpoints van a un directorio temporal; close lo borra y devuelve al servidor su
+    ruta de checkpoint y su juego.
+    """
+
+    def __init__(self, board: Board, n_agents: int):
+        import server
+
+        self.server = server
+        self.board = board
+        self.n_agents = n_agents
+        self.seeds = iter(range(1 << 30))
+        self.saved = (server.CHECKPOINT_PATH, server.current_game)
+        self.directory = tempfile.mkdtemp(prefix="flashpoint-bench-")
+        server.CHECKPOINT_PATH = os.path.join(self.directory, "game.ckpt")
+        server.current_game = None
+        self.client = server.app.test_client()
+
+    def __call__(self) -> float:
+        server = self.server
+        game = server.current_game
+        if game is None or not game.running:
+            server.current_game = self.board.new_game(self.n_agents, next(self.seeds))
+        start = time.perf_counter()
+        self.client.post("/step")
+        self.client.get("/game_state")
+        return time.perf_counter() - start
+
+    def close(self) -> None:
+        self.server.CHECKPOINT_PATH, self.server.current_game = self.saved
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# Benchmarks por nombre, en el orden del reporte
+BENCHMARKS: Dict[str, Callable[[Board, int], Operation]] = {
+    "construct": bench_construct,
+    "construct_shared": bench_construct_shared,
+    **{f"step_{phase}": _bench_phase(index) for index, phase in enumerate(PHASES)},
+    "advance_fire_heavy": bench_advance_fire_heavy,
+    "flashover_worst": bench_flashover_worst,
+    "game_state_json": bench_game_state_json,
+    "http_round_trip": _HttpRoundTrip,
+}
+
+
+def measure(operation: Operation, repeat: int = 5, min_time: float = 0.2, max_ops: int = 10000) -> Dict[str, float]:
+    """
+    Mide una operación.
+
+    Parámetros:
+    - operation: Función que hace una operación y devuelve los segundos que tardó.
+    - repeat: Repeticiones; cada una hace operaciones hasta sumar min_time segundos medidos
+      (o max_ops operaciones).
+
+    Retorna:
+    - Segundos por operación: mediana y mínimo de las repeticiones, y operaciones por repetición.
+    """
+    operation()  # Calentamiento
+    per_op = []
+    ops = 0
+    for _ in range(repeat):
+        total, ops = 0.0, 0
+        while total < min_time and ops < max_ops:
+            total += operation()
+            ops += 1
+        per_op.append(total / ops)
+    return {"median": statistics.median(per_op), "min": min(per_op), "ops": ops}
+
+
+def run_suite(sizes=DEFAULT_SIZES, agents=DEFAULT_AGENTS, names: List[str] = None, repeat: int = 5,
+              min_time: float = 0.2, on_result: Callable[[str, Dict], None] = None) -> Dict:
+    """
+    Corre los benchmarks en cada tamaño de tablero y número de bomberos.
+
+    Parámetros:
+    - sizes: Tableros (ver Board).
+    - agents: Números de bomberos.
+    - names: Benchmarks de BENCHMARKS que se corren; por defecto todos.
+    - repeat, min_time: Como en measure.
+    - on_result: Se llama con (clave, resultado) al terminar cada medición.
+
+    Retorna:
+    - {"meta": entorno de la medición, "results": {"benchmark[tablero,aN]": resultado}}.
+
+    Lanza:
+    - ValueError si un benchmark no existe.
+    """
+    names = list(names or BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Benchmarks desconocidos: {', '.join(sorted(unknown))}")
+    results = {}
+    boards = [Board(size) for size in sizes]
+    for board in boards:
+        for n_agents in agents:
+            for name in names:
+                operation = BENCHMARKS[name](board, n_agents)
+                try:
+                    result = measure(operation, repeat, min_time)
+                finally:
+                    close = getattr(operation, "close", None)
+                    if close is not None:
+                        close()
+                key = f"{name}[{board.name},a{n_agents}]"
+                results[key] = result
+                if on_result is not None:
+                    on_result(key, result)
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": repeat, "min_time": min_time}
+    return {"meta": meta, "results": results}
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float, float, str]]:
+    """
+    Compara dos corridas de run_suite por la mediana de cada medición.
+
+    Retorna:
+    - (clave, segundos de la base, segundos actuales, estado) por medición que está en las dos,
+      con estado "regression" si la actual es más lenta que la base por más de threshold,
+      "improvement" si es más rápida por más de threshold y "ok" si no.
+    """
+    rows = []
+    for key, result in current["results"].items():
+        if key not in baseline["results"]:
+            continue
+        before, after = baseline["results"][key]["median"], result["median"]
+        ratio = after / before if before > 0 else 1.0
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "ok"
+        rows.append((key, before, after, status))
+    return rows
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de rendimiento de Flash Point con línea base y comparación.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_suite_arguments(command: argparse.ArgumentParser) -> None:
+        command.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                             help="Tableros separados por comas: input o ANCHOxALTO")
+        command.add_argument("--agents", default=",".join(map(str, DEFAULT_AGENTS)), help="Bomberos, separados por comas")
+        command.add_argument("-b", "--bench", action="append", choices=list(BENCHMARKS), help="Benchmark (se puede repetir)")
+        command.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición")
+        command.add_argument("--min-time", type=float, default=0.2, help="Segundos medidos por repetición")
+
+    run = commands.add_parser("run", help="Corre los benchmarks")
+    add_suite_arguments(run)
+    run.add_argument("-o", "--output", default=None, help="Guarda los resultados (por ejemplo como línea base)")
+
+    comparison = commands.add_parser("compare", help="Compara con una línea base; termina con 1 si hay regresiones")
+    comparison.add_argument("baseline", help="Resultados guardados con run -o")
+    comparison.add_argument("current", nargs="?", default=None, help="Resultados a comparar (por defecto se corren ahora)")
+    comparison.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="Fracción de lentitud que cuenta como regresión")
+    add_suite_arguments(comparison)
+    args = parser.parse_args(argv)
+
+    def suite() -> Dict:
+        def report(key: str, result: Dict) -> None:
+            print(f"{key}: {_format_seconds(result['median'])} (min {_format_seconds(result['min'])}, "
+                  f"{result['ops']} ops)", file=sys.stderr)
+
+        sizes = [size for size in args.sizes.split(",") if size]
+        agents = [int(n) for n in args.agents.split(",") if n]
+        try:
+            return run_suite(sizes, agents, args.bench, args.repeat, args.min_time, report)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.command == "run":
+        results = suite()
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"saved {len(results['results'])} results to {args.output}")
+        return 0
+
+    baseline = _load(args.baseline)
+    current = _load(args.current) if args.current else suite()
+    rows = compare(baseline, current, args.threshold)
+    width = max((len(key) for key, _, _, _ in rows), default=0)
+    for key, before, after, status in rows:
+        marker = {"regression": "  <-- REGRESSION", "improvement": "  (faster)"}.get(status, "")
+        print(f"{key:<{width}}  {_format_seconds(before):>10} -> {_format_seconds(after):>10}  "
+              f"{100.0 * (after / before - 1) if before else 0.0:+6.1f}%{marker}")
+    regressions = sum(1 for *_, status in rows if status == "regression")
+    print(f"{len(rows)} compared, {regressions} regressions (threshold {100.0 * args.threshold:.0f}%)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,445 @@
+from collections.abc import MutableMapping, MutableSet
+from typing import Dict, Iterator, List, Tuple
+
+# Direcciones en el mismo orden que las cadenas de paredes del archivo de entrada:
+# arriba, izquierda, abajo, derecha
+DIRECTIONS: List[Tuple[int, int]] = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+OPPOSITE: List[int] = [2, 3, 0, 1]
+
+# Banderas de los puntos de interés (un byte por celda)
+POI_PRESENT = 1
+POI_VICTIM = 2
+POI_REVEALED = 4
+
+
+def direction_index(pos1: Tuple[int, int], pos2: Tuple[int, int]) -> int:
+    """
+    Devuelve el índice de dirección (0-3) para ir de pos1 a pos2.
+
+    Retorna:
+    - El índice en DIRECTIONS, o -1 si las posiciones no son vecinas ortogonales.
+    """
+    dx = pos2[0] - pos1[0]
+    dy = pos2[1] - pos1[1]
+    if dy == 0:
+        return 0 if dx == -1 else 2 if dx == 1 else -1
+    if dx == 0:
+        return 1 if dy == -1 else 3 if dy == 1 else -1
+    return -1
+
+
+class CellLayer(MutableSet):
+    """
+    Capa booleana del tablero (fuego, humo) guardada como un arreglo plano indexado por id de celda.
+
+    Se comporta como un conjunto de tuplas (x, y) para mantener compatible el código existente,
+    pero las consultas solo calculan un índice en lugar de hashear la tupla.
+    """
+
+    __slots__ = ("_board", "cells", "count", "version", "watchers")
+
+    def __init__(self, board: 'BoardState'):
+        self._board = board
+        self.cells = bytearray(board.n_cells)  # 1 si la celda pertenece a la capa
+        self.count = 0  # Número de celdas activas
+        self.version = 0  # Aumenta con cada cambio de la capa
+        self.watchers = []  # Objetos con cell_added(layer, cid) / cell_removed(layer, cid)
+
+    def __contains__(self, pos) -> bool:
+        cid = self._board.cell_id(pos)
+        return cid >= 0 and self.cells[cid] == 1
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        positions = self._board.positions
+        for cid in self.iter_ids():
+            yield positions[cid]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return "{" + ", ".join(repr(pos) for pos in self) + "}" if self.count else "set()"
+
+    def iter_ids(self) -> Iterator[int]:
+        """
+        Itera los ids de las celdas activas en orden creciente.
+        """
+        cells = self.cells
+        cid = cells.find(1)
+        while cid != -1:
+            yield cid
+            cid = cells.find(1, cid + 1)
+
+    def has(self, cid: int) -> bool:
+        return self.cells[cid] == 1
+
+    def add_id(self, cid: int) -> bool:
+        """
+        Activa una celda por id.
+
+        Retorna:
+        - True si la celda cambió de estado, False si ya estaba activa.
+        """
+        if self.cells[cid]:
+            return False
+        self.cells[cid] = 1
+        self.count += 1
+        self.version += 1
+        for watcher in self.watchers:
+            watcher.cell_added(self, cid)
+        return True
+
+    def discard_id(self, cid: int) -> bool:
+        """
+        Desactiva una celda por id.
+
+        Retorna:
+        - True si la celda cambió de estado, False si no estaba activa.
+        """
+        if not self.cells[cid]:
+            return False
+        self.cells[cid] = 0
+        self.count -= 1
+        self.version += 1
+        for watcher in self.watchers:
+            watcher.cell_removed(self, cid)
+        return True
+
+    def add(self, pos) -> None:
+        cid = self._board.cell_id(pos)
+        if cid < 0:
+            raise ValueError(f"La posición {pos} está fuera del tablero")
+        self.add_id(cid)
+
+    def discard(self, pos) -> None:
+        cid = self._board.cell_id(pos)
+        if cid >= 0:
+            self.discard_id(cid)
+
+    def remove(self, pos) -> None:
+        cid = self._board.cell_id(pos)
+        if cid < 0 or not self.discard_id(cid):
+            raise KeyError(pos)
+
+    def clear(self) -> None:
+        for cid in list(self.iter_ids()):
+            self.discard_id(cid)
+
+    def load(self, cells) -> None:
+        """
+        Reemplaza el contenido de la capa sin avisar a los observadores (al restaurar un
+        tablero completo; los observadores se reconstruyen después).
+        """
+        self.cells[:] = cells
+        self.count = len(self.cells) - self.cells.count(0)
+        self.version += 1
+
+    def fork(self, board: 'BoardState') -> 'CellLayer':
+        """
+        Copia la capa para otro tablero, sin observadores.
+        """
+        layer = CellLayer.__new__(CellLayer)
+        layer._board = board
+        layer.cells = self.cells[:]
+        layer.count = self.count
+        layer.version = self.version
+        layer.watchers = []
+        return layer
+
+
+class PoiLayer(MutableMapping):
+    """
+    Puntos de interés guardados como banderas en un arreglo plano indexado por id de celda.
+
+    Conserva la interfaz de diccionario {pos: {"is_victim": ..., "revealed": ...}}; los valores
+    devueltos son copias, por lo que los cambios deben hacerse con los métodos de la capa.
+    """
+
+    __slots__ = ("_board", "cells", "_ids", "version", "watchers")
+
+    def __init__(self, board: 'BoardState'):
+        self._board = board
+        self.cells = bytearray(board.n_cells)  # Banderas POI_* por celda
+        self._ids = set()  # Ids ocupados, para iterar sin recorrer todo el tablero
+        self.version = 0  # Aumenta con cada cambio de la capa
+        self.watchers = []  # Objetos con cell_added(layer, cid) / cell_removed(layer, cid)
+
+    def __getitem__(self, pos) -> Dict[str, bool]:
+        cid = self._board.cell_id(pos)
+        flags = self.cells[cid] if cid >= 0 else 0
+        if not flags:
+            raise KeyError(pos)
+        return {"is_victim": bool(flags & POI_VICTIM), "revealed": bool(flags & POI_REVEALED)}
+
+    def __setitem__(self, pos, info: Dict[str, bool]) -> None:
+        cid = self._board.cell_id(pos)
+        if cid < 0:
+            raise ValueError(f"La posición {pos} está fuera del tablero")
+        self.set_id(cid, info["is_victim"], info["revealed"])
+
+    def __delitem__(self, pos) -> None:
+        cid = self._board.cell_id(pos)
+        if cid < 0 or not self.discard_id(cid):
+            raise KeyError(pos)
+
+    def __contains__(self, pos) -> bool:
+        cid = self._board.cell_id(pos)
+        return cid >= 0 and self.cells[cid] != 0
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        positions = self._board.positions
+        for cid in self.iter_ids():
+            yield positions[cid]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def iter_ids(self) -> Iterator[int]:
+        """
+        Itera los ids de las celdas con un punto de interés en orden creciente.
+        """
+        return iter(sorted(self._ids))
+
+    def set_id(self, cid: int, is_victim: bool, revealed: bool = False) -> None:
+        added = not self.cells[cid]
+        self.version += 1
+        self._ids.add(cid)
+        self.cells[cid] = POI_PRESENT | (POI_VICTIM if is_victim else 0) | (POI_REVEALED if revealed else 0)
+        if added:
+            for watcher in self.watchers:
+                watcher.cell_added(self, cid)
+
+    def discard_id(self, cid: int) -> bool:
+        if not self.cells[cid]:
+            return False
+        self.cells[cid] = 0
+        self._ids.discard(cid)
+        self.version += 1
+        for watcher in self.watchers:
+            watcher.cell_removed(self, cid)
+        return True
+
+    def reveal_id(self, cid: int) -> None:
+        """
+        Marca como revelado el punto de interés de una celda.
+        """
+        self.cells[cid] |= POI_REVEALED
+        self.version += 1
+
+    def is_hidden(self, pos) -> bool:
+        """
+        Indica si hay un punto de interés sin revelar en la posición.
+        """
+        cid = self._board.cell_id(pos)
+        return cid >= 0 and self.cells[cid] & (POI_PRESENT | POI_REVEALED) == POI_PRESENT
+
+    def revealed_count(self) -> int:
+        return sum(1 for cid in self.iter_ids() if self.cells[cid] & POI_REVEALED)
+
+    def load(self, cells) -> None:
+        """
+        Reemplaza las banderas de la capa sin avisar a los observadores.
+        """
+        self.cells[:] = cells
+        self._ids = {cid for cid, flags in enumerate(self.cells) if flags}
+        self.version += 1
+
+    def fork(self, board: 'BoardState') -> 'PoiLayer':
+        """
+        Copia la capa para otro tablero, sin observadores.
+        """
+        layer = PoiLayer.__new__(PoiLayer)
+        layer._board = board
+        layer.cells = self.cells[:]
+        layer._ids = set(self._ids)
+        layer.version = self.version
+        layer.watchers = []
+        return layer
+
+
+class BoardState:
+    """
+    Estado compacto del tablero indexado por id de celda.
+
+    Las celdas cubren el edificio y su anillo exterior (filas 0..height, columnas 0..width),
+    igual que la MultiGrid del modelo, y su id es x * cols + y. Las capas de fuego, humo,
+    puntos de interés y ocupación son arreglos planos; los costos de paredes y puertas se
+    guardan en un arreglo de aristas con cuatro entradas por celda (ver DIRECTIONS).
+    """
+
+    def __init__(self, width: int, height: int):
+        """
+        Parámetros:
+        - width: Ancho del edificio (número de columnas).
+        - height: Altura del edificio (número de filas).
+        """
+        self.width = width
+        self.height = height
+        self.rows = height + 1
+        self.cols = width + 1
+        self.n_cells = self.rows * self.cols
+
+        # Tablas precalculadas por celda
+        self.positions: List[Tuple[int, int]] = [(x, y) for x in range(self.rows) for y in range(self.cols)]
+        self.building = bytearray(self.n_cells)  # 1 si la celda pertenece al edificio
+        self.neighbors: List[int] = [-1] * (self.n_cells * 4)  # Id de la celda vecina por dirección
+        for cid, (x, y) in enumerate(self.positions):
+            if 1 <= x <= height and 1 <= y <= width:
+                self.building[cid] = 1
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.rows and 0 <= ny < self.cols:
+                    self.neighbors[cid * 4 + d] = nx * self.cols + ny
+
+        # Costo de cada arista (0 = sin conexión, 1 = camino, 2 = puerta, 5 = pared)
+        self.edge_cost = bytearray(self.n_cells * 4)
+        # Índice de la arista dentro de la lista de grid_structure de su celda
+        self.structure_slot: List[int] = [-1] * (self.n_cells * 4)
+        self._init_layers()
+
+    @classmethod
+    def from_tables(cls, width: int, height: int, building, neighbors, structure_slot, edge_cost) -> 'BoardState':
+        """
+        Crea un tablero vacío a partir de tablas ya calculadas (ver board_topology.BoardTopology),
+        sin recorrer las celdas.
+
+        Parámetros:
+        - width, height: Dimensiones del edificio.
+        - building, neighbors, structure_slot: Tablas de topología; se comparten, no se copian.
+        - edge_cost: Costos iniciales de las aristas; se copian.
+        """
+        board = cls.__new__(cls)
+        board.width = width
+        board.height = height
+        board.rows = height + 1
+        board.cols = width + 1
+        board.n_cells = board.rows * board.cols
+        board.positions = [(x, y) for x in range(board.rows) for y in range(board.cols)]
+        board.building = building
+        board.neighbors = neighbors
+        board.structure_slot = structure_slot
+        board.edge_cost = bytearray(edge_cost)
+        board._init_layers()
+        return board
+
+    def _init_layers(self) -> None:
+        self.edge_watchers = []  # Objetos con edge_changed(half, old_cost, new_cost)
+        self.edge_version = 0  # Aumenta con cada cambio de costo de una arista
+
+        # Capas del tablero
+        self.fire = CellLayer(self)
+        self.smoke = CellLayer(self)
+        self.pois = PoiLayer(self)
+        self.occupancy = bytearray(self.n_cells)  # Número de bomberos en cada celda
+        self.occupancy_watchers = []  # Avisados cuando una celda se ocupa o se vacía
+
+    def fork(self) -> 'BoardState':
+        """
+        Crea una copia independiente del tablero, para simular jugadas sin tocar el original o
+        para empezar un juego nuevo desde el tablero base de una BoardTopology.
+
+        La topología (posiciones, vecinas, celdas del edificio, índices de grid_structure) no
+        cambia durante el juego y se comparte; solo se copian los arreglos que sí cambian
+        (costos de aristas, capas y ocupación). Las copias no tienen observadores.
+        """
+        board = BoardState.__new__(BoardState)
+        board.__dict__.update(self.__dict__)
+        board.edge_cost = self.edge_cost[:]
+        board.edge_watchers = []
+        board.fire = self.fire.fork(board)
+        board.smoke = self.smoke.fork(board)
+        board.pois = self.pois.fork(board)
+        board.occupancy = self.occupancy[:]
+        board.occupancy_watchers = []
+        return board
+
+    def cell_id(self, pos) -> int:
+        """
+        Convierte una posición (x, y) a su id de celda.
+
+        Retorna:
+        - El id de la celda, o -1 si la posición está fuera del tablero.
+        """
+        x, y = pos
+        if 0 <= x < self.rows and 0 <= y < self.cols:
+            return x * self.cols + y
+        return -1
+
+    def in_building(self, pos) -> bool:
+        cid = self.cell_id(pos)
+        return cid >= 0 and self.building[cid] == 1
+
+    def load_grid_structure(self, grid_structure) -> None:
+        """
+        Copia los costos de grid_structure al arreglo de aristas.
+
+        Parámetros:
+        - grid_structure: Diccionario {celda: [[vecino, costo], ...]} generado por el modelo.
+        """
+        for pos, connections in grid_structure.items():
+            cid = self.cell_id(pos)
+            for slot, (adj, cost) in enumerate(connections):
+                d = direction_index(pos, adj)
+                self.edge_cost[cid * 4 + d] = cost
+                self.structure_slot[cid * 4 + d] = slot
+
+    def edge_between(self, pos1, pos2) -> int:
+        """
+        Devuelve el índice de la arista (cid * 4 + dirección) entre dos posiciones vecinas.
+
+        Retorna:
+        - El índice de la arista, o -1 si las posiciones no son vecinas dentro del tablero.
+        """
+        d = direction_index(pos1, pos2)
+        if d < 0:
+            return -1
+        cid = self.cell_id(pos1)
+        return cid * 4 + d if cid >= 0 else -1
+
+    def set_edge_cost(self, half: int, cost: int) -> None:
+        """
+        Cambia el costo de una media arista (celda * 4 + dirección) y avisa a los observadores.
+
+        Parámetros:
+        - half: Índice de la media arista.
+        - cost: Nuevo costo de movimiento.
+        """
+        old_cost = self.edge_cost[half]
+        if old_cost == cost:
+            return
+        self.edge_cost[half] = cost
+        self.edge_version += 1
+        for watcher in self.edge_watchers:
+            watcher.edge_changed(half, old_cost, cost)
+
+    def cost_between(self, pos1, pos2) -> int:
+        edge = self.edge_between(pos1, pos2)
+        return self.edge_cost[edge] if edge >= 0 else 0
+
+    def is_free(self, pos) -> bool:
+        """
+        Indica si no hay bomberos en la posición.
+        """
+        cid = self.cell_id(pos)
+        return cid >= 0 and self.occupancy[cid] == 0
+
+    def place_occupant(self, pos) -> None:
+        cid = self.cell_id(pos)
+        self.occupancy[cid] += 1
+        if self.occupancy[cid] == 1:
+            for watcher in self.occupancy_watchers:
+                watcher.cell_added(self.occupancy, cid)
+
+    def remove_occupant(self, pos) -> None:
+        cid = self.cell_id(pos)
+        self.occupancy[cid] -= 1
+        if self.occupancy[cid] == 0:
+            for watcher in self.occupancy_watchers:
+                watcher.cell_removed(self.occupancy, cid)
+
+    def move_occupant(self, old_pos, new_pos) -> None:
+        self.remove_occupant(old_pos)
+        self.place_occupant(new_pos)
@@ -0,0 +1,321 @@
+import pickle
+import struct
+from array import array
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+from board_state import BoardState
+from checkpoint import topology_fingerprint
+from edge_store import EdgeStore, build_edge_store
+
+MAGIC = b"FPTP"
+FORMAT_VERSION = 1
+
+# Encabezado del formato binario: magia, versión, ancho, alto, aristas, huella, bytes del resto
+_HEADER = struct.Struct("<4sHHH2xIII")
+
+
+class _AttachedBlock(shared_memory.SharedMemory):
+    """
+    Bloque de memoria compartida adjunto a una topología. Las tablas de la topología son vistas
+    sobre el bloque, así que no se cierra al recolectarse: el mapeo se libera junto con la
+    última vista.
+    """
+
+    def __del__(self):
+        return
+
+
+class BoardTopology:
+    """
+    Topología compilada e inmutable de un escenario: estructura de la cuadrícula, paredes,
+    puertas y salidas, junto con el tablero y el registro de aristas iniciales.
+
+    Se construye una vez por escenario y se comparte entre juegos (FlashPointModel(...,
+    topology=...)): cada juego arranca con una copia del tablero base (BoardState.fork) y
+    del registro de aristas (EdgeStore.fork), que comparten las tablas de topología y solo
+    copian lo que cambia durante el juego (costos de aristas, estado y salud de paredes y
+    puertas). grid_structure se copia como diccionario y sus listas se reemplazan al cambiar,
+    así que las que no cambian siguen compartidas.
+
+    Entre procesos se comparte con share()/attach() sobre memoria compartida, o con pickle
+    (que usa el mismo formato binario); las tablas de la copia adjunta son vistas de solo
+    lectura sobre el búfer, sin copiarlo.
+    """
+
+    def __init__(self, width: int, height: int, wall_matrix, doors, exits, quiet: bool = False):
+        """
+        Compila el escenario.
+
+        Parámetros:
+        - width, height: Dimensiones del edificio.
+        - wall_matrix: Matriz que describe las paredes en el grid.
+        - doors: Lista de puertas entre celdas.
+        - exits: Lista de posiciones de salida.
+        - quiet: Si es verdadero, no imprime las salidas encontradas (ver generate_grid).
+        """
+        door_set = set(doors) if doors else set()
+        grid_structure, out_of_bounds = generate_grid(width, height, wall_matrix, exits, quiet)
+        update_walls_to_doors(grid_structure, door_set)
+
+        # Copiar los costos al arreglo de aristas del tablero y registrar paredes y puertas
+        # (cada pared empieza con salud 2)
+        board = BoardState(width, height)
+        board.load_grid_structure(grid_structure)
+        edges = build_edge_store(board, grid_structure)
+        self._setup(board, edges, tuple(exits), frozenset(door_set), grid_structure, out_of_bounds,
+                    topology_fingerprint(board, edges))
+
+    def _setup(self, board: BoardState, edges: EdgeStore, exits, doors, grid_structure, out_of_bounds,
+               fingerprint: int) -> None:
+        self.width = board.width
+        self.height = board.height
+        self.board = board  # Tablero base, sin fuego, humo, POIs ni bomberos
+        self.edges = edges  # Registro de aristas base, con todas las paredes intactas
+        self.exits: Tuple[Tuple[int, int], ...] = exits
+        self.doors = doors  # Pares de celdas con puerta
+        self.grid_structure: Dict[Tuple[int, int], List] = grid_structure  # No se modifica
+        self.out_of_bounds: Dict[Tuple[int, int], List] = out_of_bounds  # No se modifica
+        self.building_cells = frozenset(
+            (x, y) for x in range(1, self.height + 1) for y in range(1, self.width + 1))
+        self.fingerprint = fingerprint  # Huella de la topología (ver checkpoint.topology_fingerprint)
+
+    def __reduce__(self):
+        return BoardTopology.from_buffer, (self.to_bytes(),)
+
+    def new_board(self) -> Tuple[BoardState, EdgeStore]:
+        """
+        Crea el tablero y el registro de aristas de un juego nuevo.
+
+        Retorna:
+        - (tablero, aristas), que comparten la topología y tienen su propio estado.
+        """
+        return self.board.fork(), self.edges.fork()
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializa la topología: tablas en binario y las estructuras de Python al final.
+        """
+        board, edges = self.board, self.edges
+        extra = pickle.dumps((self.exits, self.doors, self.grid_structure, self.out_of_bounds),
+                             protocol=pickle.HIGHEST_PROTOCOL)
+        parts = [
+            _HEADER.pack(MAGIC, FORMAT_VERSION, self.width, self.height, len(edges), self.fingerprint, len(extra)),
+            # Primero las tablas de enteros, para que queden alineadas a 4 bytes
+            array("i", board.neighbors).tobytes(),
+            array("i", board.structure_slot).tobytes(),
+            array("i", edges.edge_at).tobytes(),
+            array("i", edges.cell1).tobytes(),
+            array("i", edges.cell2).tobytes(),
+            bytes(board.building),
+            bytes(board.edge_cost),
+            bytes(edges.kind),
+            bytes(edges.state),
+            bytes(edges.health),
+            bytes(edges.direction),
+            extra,
+        ]
+        return b"".join(parts)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'BoardTopology':
+        """
+        Reconstruye una topología serializada con to_bytes sin copiar sus tablas.
+
+        Parámetros:
+        - buffer: Objeto con protocolo de búfer (bytes, memoria compartida, mmap); debe seguir
+          vivo mientras se use la topología.
+
+        Lanza:
+        - ValueError si el búfer no contiene una topología válida de esta versión.
+        """
+        view = memoryview(buffer).toreadonly()
+        if len(view) < _HEADER.size:
+            raise ValueError("Topología incompleta")
+        magic, version, width, height, n_edges, fingerprint, extra_size = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Formato de topología desconocido")
+        n_cells = (width + 1) * (height + 1)
+        offset = _HEADER.size
+
+        def take(count: int, typecode: str):
+            nonlocal offset
+            size = count * (4 if typecode == "i" else 1)
+            if offset + size > len(view):
+                raise ValueError("Topología incompleta")
+            table = view[offset:offset + size].cast(typecode)
+            offset += size
+            return table
+
+        neighbors, structure_slot, edge_at = take(n_cells * 4, "i"), take(n_cells * 4, "i"), take(n_cells * 4, "i")
+        cell1, cell2 = take(n_edges, "i"), take(n_edges, "i")
+        building, edge_cost = take(n_cells, "B"), take(n_cells * 4, "B")
+        kind, state, health, direction = (take(n_edges, "B") for _ in range(4))
+        exits, doors, grid_structure, out_of_bounds = pickle.loads(take(extra_size, "B"))
+
+        topology = cls.__new__(cls)
+        board = BoardState.from_tables(width, height, building, neighbors, structure_slot, edge_cost)
+        edges = EdgeStore.from_arrays(kind, state, health, cell1, cell2, direction, edge_at)
+        topology._setup(board, edges, exits, doors, grid_structure, out_of_bounds, fingerprint)
+        return topology
+
+    def share(self, name: str = None) -> shared_memory.SharedMemory:
+        """
+        Copia la topología a un bloque nuevo de memoria compartida.
+
+        Parámetros:
+        - name: Nombre del bloque; por defecto uno generado.
+
+        Retorna:
+        - El bloque (con su nombre en .name). Quien lo crea debe cerrarlo con close() y
+          liberarlo con unlink() cuando ningún proceso lo use.
+        """
+        data = self.to_bytes()
+        block = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        block.buf[:len(data)] = data
+        return block
+
+    @classmethod
+    def attach(cls, name: str) -> 'BoardTopology':
+        """
+        Abre una topología publicada con share() en otro proceso, sin copiar sus tablas.
+
+        El bloque queda abierto mientras viva la topología; liberarlo le corresponde a quien
+        lo creó. Antes de Python 3.13 el proceso que adjunta debe compartir el rastreador de
+        recursos del creador (lanzarse con multiprocessing desde él), o el rastreador propio
+        liberaría el bloque al terminar.
+        """
+        try:
+            block = _AttachedBlock(name=name, track=False)  # Python 3.13+
+        except TypeError:
+            block = _AttachedBlock(name=name)
+        topology = cls.from_buffer(block.buf)
+        topology._block = block
+        return topology
+
+
+def generate_grid(grid_width, grid_height, cell_walls, exits, quiet=False):
+    """
+    Genera la estructura de la cuadrícula del juego basada en las paredes y salidas especificadas.
+
+    Parámetros:
+    - grid_width: Ancho de la cuadrícula.
+    - grid_height: Altura de la cuadrícula.
+    - cell_walls: Matriz que representa las paredes de cada celda en el grid.
+    - exits: Lista de posiciones de salida.
+    - quiet: Si es verdadero, no imprime las celdas conectadas a una salida.
+
+    Retorna:
+    - Una lista con dos diccionarios:
+        1. grid_dict: Estructura de la cuadrícula con costos de movimiento.
+        2. out_of_bounds_dict: Estructura de celdas fuera de los límites con costos de movimiento.
+    """
+    grid_dict = {}  # Diccionario para almacenar la estructura de la cuadrícula
+    out_of_bounds_dict = {}  # Diccionario para almacenar las celdas fuera de los límites
+
+    # Iterar sobre cada celda en la cuadrícula
+    for i in range(grid_height):
+        for j in range(grid_width):
+            cell_key = (i+1, j+1)  # Clave de la celda actual
+            walls = cell_walls[i][j]  # Paredes de la celda actual
+            neighbors = []  # Lista para almacenar los vecinos y costos
+            out_of_bounds_neighbor_list = []  # Lista para vecinos fuera de los límites
+
+            # Verificar si hay un vecino arriba
+            if i > 0:  # No es la primera fila
+                neighbors.append([(i, j+1), 5 if walls[0] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
+            else:
+                out_of_bounds_neighbor = (i, j+1)
+                if cell_key in exits:
+                    if not quiet:
+                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (UP)")
+                    out_of_bounds_neighbor_list.append([(i, j+1), 2])  # Costo de 2 para salidas
+                else:
+                    out_of_bounds_neighbor_list.append([(i, j+1), 5 if walls[0] == '1' else 1])  # Costo de pared
+
+            # Verificar si hay un vecino a la izquierda
+            if j > 0:  # No es la primera columna
+                neighbors.append([(i+1, j), 5 if walls[1] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
+            else:
+                out_of_bounds_neighbor = (i+1, j)
+                if cell_key in exits:
+                    if not quiet:
+                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (LEFT)")
+                    out_of_bounds_neighbor_list.append([(i+1, j), 2])  # Costo de 2 para salidas
+                else:
+                    out_of_bounds_neighbor_list.append([(i, j), 5 if walls[1] == '1' else 1])  # Costo de pared
+
+            # Verificar si hay un vecino abajo
+            if i < grid_height - 1:  # No es la última fila
+                neighbors.append([(i+2, j+1), 5 if walls[2] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
+            else:
+                out_of_bounds_neighbor = (i+2, j+1)
+                if cell_key in exits:
+                    if not quiet:
+                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (DOWN)")
+                    out_of_bounds_neighbor_list.append([(i+2, j+1), 2])  # Costo de 2 para salidas
+                else:
+                    out_of_bounds_neighbor_list.append([(i+2, j+1), 5 if walls[2] == '1' else 1])  # Costo de pared
+
+            # Verificar si hay un vecino a la derecha
+            if j < grid_width - 1:  # No es la última columna
+                neighbors.append([(i+1, j+2), 5 if walls[3] == '1' else 1])  # Pared con costo 5 si existe, de lo contrario, 1
+            else:
+                out_of_bounds_neighbor = (i+1, j+2)
+                if cell_key in exits:
+                    if not quiet:
+                        print(f"Cell {cell_key} is connected to out-of-bounds exit at {out_of_bounds_neighbor} (RIGHT)")
+                    out_of_bounds_neighbor_list.append([(i+1, j+2), 2])  # Costo de 2 para salidas
+                else:
+                    out_of_bounds_neighbor_list.append([(i+1, j+2), 5 if walls[3] == '1' else 1])  # Costo de pared
+
+            grid_dict[cell_key] = neighbors  # Guardar los vecinos y costos en el diccionario
+            out_of_bounds_dict[cell_key] = out_of_bounds_neighbor_list  # Guardar los vecinos fuera de límites en el diccionario
+
+    return [grid_dict, out_of_bounds_dict]  # Retornar los diccionarios
+
+
+def update_walls_to_doors(grid_dict, door_pairs):
+    """
+    Actualiza las paredes en la estructura de la cuadrícula para reflejar las puertas.
+
+    Parámetros:
+    - grid_dict: Estructura de la cuadrícula con los costos actuales de las paredes.
+    - door_pairs: Lista de pares de celdas que representan puertas.
+    """
+    for (cell1, cell2) in door_pairs:
+        # Extraer coordenadas
+        x1, y1 = cell1
+        x2, y2 = cell2
+
+        # Determinar la dirección de la pared y actualizarla a una puerta (valor 2)
+        if x1 == x2:  # Misma fila, pared horizontal (izquierda-derecha)
+            if y1 < y2:  # cell1 está a la izquierda de cell2
+                update_wall_value(grid_dict, (x1, y1), (x2, y2), 3, 1)  # Pared derecha de cell1, pared izquierda de cell2
+            else:  # cell1 está a la derecha de cell2
+                update_wall_value(grid_dict, (x2, y2), (x1, y1), 3, 1)  # Pared derecha de cell2, pared izquierda de cell1
+        elif y1 == y2:  # Misma columna, pared vertical (arriba-abajo)
+            if x1 < x2:  # cell1 está arriba de cell2
+                update_wall_value(grid_dict, (x1, y1), (x2, y2), 2, 0)  # Pared inferior de cell1, pared superior de cell2
+            else:  # cell1 está abajo de cell2
+                update_wall_value(grid_dict, (x2, y2), (x1, y1), 2, 0)  # Pared inferior de cell2, pared superior de cell1
+
+
+def update_wall_value(grid_dict, cell1, cell2, wall_index1, wall_index2):
+    """
+    Actualiza el valor de la pared a puerta entre dos celdas especificadas.
+
+    Parámetros:
+    - grid_dict: Estructura de la cuadrícula con los costos actuales de las paredes.
+    - cell1: La primera celda.
+    - cell2: La segunda celda.
+    - wall_index1: Índice de la pared en cell1.
+    - wall_index2: Índice de la pared en cell2.
+    """
+    # Convertir los valores actuales de la pared de 5 (pared) a 2 (puerta) entre cell1 y cell2
+    for i, neighbor in enumerate(grid_dict[cell1]):
+        if neighbor[0] == cell2 and neighbor[1] == 5:
+            grid_dict[cell1][i][1] = 2  # Actualizar a puerta
+    for i, neighbor in enumerate(grid_dict[cell2]):
+        if neighbor[0] == cell1 and neighbor[1] == 5:
+            grid_dict[cell2][i][1] = 2  # Actualizar a puerta
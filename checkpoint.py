@@ -0,0 +1,193 @@
+import struct
+import zlib
+from array import array
+from typing import List, Tuple
+
+MAGIC = b"FPCK"
+FORMAT_VERSION = 4
+
+# Formatos binarios (little-endian)
+_HEADER = struct.Struct("<4sHHHIII")  # magia, versión, ancho, alto, celdas, aristas, huella de la topología
+_COUNTERS = struct.Struct("<iiiiiiiiB")  # paso, daño, rescatadas, perdidas, POIs, máx. POIs, pasos y tiempo del scheduler, running
+_SETTINGS = struct.Struct("<Hiii")  # bomberos de rescate, daño, víctimas perdidas y rescatadas con que termina el juego
+_AGENT = struct.Struct("<HHHhhB")  # id, x, y, ap, saved_ap, banderas
+_COUNT = struct.Struct("<I")
+_RNG_TAIL = struct.Struct("<Bd")  # hay gauss_next, gauss_next
+_STREAMS = struct.Struct("<B")  # bit i: el flujo i de model.streams() tiene generador propio
+
+AGENT_CARRYING = 1  # El bombero carga una víctima
+AGENT_RESCUE = 2  # El bombero se enfoca en rescatar (si no, en extinguir)
+
+RNG_WORDS = 625  # Palabras del estado de random.Random (624 más el índice)
+
+
+class Checkpoint:
+    """
+    Estado de un juego leído de un checkpoint, listo para aplicarse con FlashPointModel.load_checkpoint.
+    """
+
+    __slots__ = ("width", "height", "topology", "current_step", "damage_markers", "rescued_victims",
+                 "lost_victims", "poi_count", "max_pois_onBoard", "schedule_steps", "schedule_time",
+                 "running", "n_rescuers", "max_damage", "max_lost", "rescue_goal", "victims", "ff_ids", "agents", "fire", "smoke", "pois", "edge_cost",
+                 "edge_state", "edge_health", "free_pools", "rng_state", "model_random_state", "stream_mask", "stream_states")
+
+    def __init__(self):
+        self.agents: List[Tuple[int, Tuple[int, int], int, int, bool, str]] = []  # (id, pos, ap, saved_ap, carga, enfoque)
+
+
+def topology_fingerprint(board, edges) -> int:
+    """
+    Huella (CRC32) de la topología fija del tablero: dimensiones y paredes y puertas.
+
+    Un checkpoint solo se puede cargar en un modelo construido con el mismo escenario.
+    """
+    crc = zlib.crc32(struct.pack("<HHI", board.width, board.height, len(edges)))
+    crc = zlib.crc32(edges.kind, crc)
+    crc = zlib.crc32(array("i", edges.cell1).tobytes(), crc)
+    return zlib.crc32(array("i", list(edges.direction)).tobytes(), crc)
+
+
+def stream_mask(model) -> int:
+    """
+    Máscara de los flujos de azar de un modelo (en el orden de model.streams()) que tienen su
+    propio generador; los demás son el mismo objeto que model.rng y no se guardan aparte.
+    """
+    return sum(1 << i for i, stream in enumerate(model.streams()) if stream is not model.rng)
+
+
+def _pack_rng(state) -> bytes:
+    version, words, gauss_next = state
+    return (bytes([version]) + array("I", words).tobytes()
+            + _RNG_TAIL.pack(gauss_next is not None, gauss_next or 0.0))
+
+
+def _unpack_rng(data, offset: int):
+    version = data[offset]
+    offset += 1
+    words = array("I")
+    words.frombytes(data[offset:offset + RNG_WORDS * 4])
+    offset += RNG_WORDS * 4
+    has_gauss, gauss_next = _RNG_TAIL.unpack_from(data, offset)
+    offset += _RNG_TAIL.size
+    return (version, tuple(words), gauss_next if has_gauss else None), offset
+
+
+def _pack_bytes(data) -> bytes:
+    return _COUNT.pack(len(data)) + bytes(data)
+
+
+def _unpack_bytes(data, offset: int):
+    (size,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    return data[offset:offset + size], offset + size
+
+
+def encode_checkpoint(model) -> bytes:
+    """
+    Serializa el estado completo de un juego en formato binario compacto.
+
+    Incluye contadores, reglas del juego (bomberos de rescate y límites de fin), bolsa de víctimas, bomberos (en el orden del scheduler), capas del
+    tablero, costos de aristas, estado y salud de paredes y puertas, el orden de los grupos de
+    celdas libres y el estado de los generadores del modelo (las tiradas del juego, el orden
+    de activación y solo los flujos de azar con generador propio), de modo que el juego
+    restaurado continúa igual que el original.
+
+    Parámetros:
+    - model: FlashPointModel a guardar.
+
+    Retorna:
+    - Los bytes del checkpoint.
+    """
+    board, edges = model.board, model.edges
+    parts = [
+        _HEADER.pack(MAGIC, FORMAT_VERSION, board.width, board.height, board.n_cells, len(edges),
+                     model.topology.fingerprint),
+        _COUNTERS.pack(model.current_step, model.damage_markers, model.rescued_victims, model.lost_victims,
+                       model.poi_count, model.max_pois_onBoard, model.schedule.steps, int(model.schedule.time),
+                       bool(model.running)),
+        _SETTINGS.pack(model.n_rescuers, model.max_damage, model.max_lost, model.rescue_goal),
+        _pack_bytes(bytes(1 if victim else 0 for victim in model.victims)),
+        _pack_bytes(array("H", model.ff_ids).tobytes()),
+        _COUNT.pack(len(model.schedule.agents)),
+    ]
+    for agent in model.schedule.agents:
+        flags = (AGENT_CARRYING if agent.carrying_victim else 0) | (AGENT_RESCUE if agent.focus == "rescue" else 0)
+        parts.append(_AGENT.pack(agent.unique_id, agent.position[0], agent.position[1], agent.ap, agent.saved_ap, flags))
+    for layer in (board.fire.cells, board.smoke.cells, board.pois.cells, board.edge_cost, edges.state, edges.health):
+        parts.append(_pack_bytes(layer))
+    parts.append(_COUNT.pack(len(model.free_cells.pools)))
+    for exclude, pool in model.free_cells.pools.items():
+        parts.append(_COUNT.pack(exclude))
+        parts.append(_pack_bytes(array("I", pool.cells).tobytes()))
+    parts.append(_pack_rng(model.rng.getstate()))
+    parts.append(_pack_rng(model.random.getstate()))
+    mask = stream_mask(model)
+    parts.append(_STREAMS.pack(mask))
+    parts.extend(_pack_rng(stream.getstate()) for i, stream in enumerate(model.streams()) if mask >> i & 1)
+    return b"".join(parts)
+
+
+def decode_checkpoint(data: bytes) -> Checkpoint:
+    """
+    Lee un checkpoint generado por encode_checkpoint.
+
+    Retorna:
+    - Un Checkpoint con el estado del juego.
+
+    Lanza:
+    - ValueError si los bytes no son un checkpoint válido de esta versión.
+    """
+    data = memoryview(data)
+    if len(data) < _HEADER.size:
+        raise ValueError("Checkpoint incompleto")
+    magic, version, width, height, n_cells, n_edges, topology = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Formato de checkpoint desconocido")
+    offset = _HEADER.size
+
+    ckpt = Checkpoint()
+    ckpt.width, ckpt.height, ckpt.topology = width, height, topology
+    (ckpt.current_step, ckpt.damage_markers, ckpt.rescued_victims, ckpt.lost_victims, ckpt.poi_count,
+     ckpt.max_pois_onBoard, ckpt.schedule_steps, ckpt.schedule_time, running) = _COUNTERS.unpack_from(data, offset)
+    ckpt.running = bool(running)
+    offset += _COUNTERS.size
+    ckpt.n_rescuers, ckpt.max_damage, ckpt.max_lost, ckpt.rescue_goal = _SETTINGS.unpack_from(data, offset)
+    offset += _SETTINGS.size
+
+    victims, offset = _unpack_bytes(data, offset)
+    ckpt.victims = [bool(victim) for victim in victims]
+    ff_ids, offset = _unpack_bytes(data, offset)
+    ckpt.ff_ids = array("H", ff_ids.tobytes()).tolist()
+
+    (n_agents,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    for _ in range(n_agents):
+        unique_id, x, y, ap, saved_ap, flags = _AGENT.unpack_from(data, offset)
+        offset += _AGENT.size
+        focus = "rescue" if flags & AGENT_RESCUE else "extinguish"
+        ckpt.agents.append((unique_id, (x, y), ap, saved_ap, bool(flags & AGENT_CARRYING), focus))
+
+    ckpt.fire, offset = _unpack_bytes(data, offset)
+    ckpt.smoke, offset = _unpack_bytes(data, offset)
+    ckpt.pois, offset = _unpack_bytes(data, offset)
+    ckpt.edge_cost, offset = _unpack_bytes(data, offset)
+    ckpt.edge_state, offset = _unpack_bytes(data, offset)
+    ckpt.edge_health, offset = _unpack_bytes(data, offset)
+    if len(ckpt.fire) != n_cells or len(ckpt.edge_cost) != n_cells * 4 or len(ckpt.edge_state) != n_edges:
+        raise ValueError("Checkpoint dañado: tamaños de capas inconsistentes")
+    (n_pools,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    ckpt.free_pools = {}
+    for _ in range(n_pools):
+        (exclude,) = _COUNT.unpack_from(data, offset)
+        cells, offset = _unpack_bytes(data, offset + _COUNT.size)
+        ckpt.free_pools[exclude] = array("I", cells.tobytes()).tolist()
+    ckpt.rng_state, offset = _unpack_rng(data, offset)
+    ckpt.model_random_state, offset = _unpack_rng(data, offset)
+    (ckpt.stream_mask,) = _STREAMS.unpack_from(data, offset)
+    offset += _STREAMS.size
+    ckpt.stream_states = []  # Solo los flujos de stream_mask, en orden
+    for _ in range(bin(ckpt.stream_mask).count("1")):
+        state, offset = _unpack_rng(data, offset)
+        ckpt.stream_states.append(state)
+    return ckpt
@@ -0,0 +1,202 @@
+from array import array
+from typing import Dict, List, Tuple
+
+from board_state import DIRECTIONS, OPPOSITE
+
+# Tipos de arista
+EDGE_WALL = 1
+EDGE_DOOR = 2
+
+# Estados de una pared
+WALL_INTACT = 0
+WALL_DAMAGED = 1
+WALL_DESTROYED = 2
+
+# Estados de una puerta
+DOOR_CLOSED = 0
+DOOR_OPEN = 1
+DOOR_DESTROYED = 2
+
+# Costos de movimiento usados en grid_structure
+COST_OPEN = 1
+COST_DOOR = 2
+COST_WALL = 5
+
+WALL_MAX_HEALTH = 2
+
+
+class EdgeStore:
+    """
+    Registro de paredes y puertas con una entrada por par de celdas.
+
+    Cada arista guarda su tipo, estado, salud y celdas en arreglos compactos paralelos
+    (bytearray y array), sin un objeto por arista. Se puede localizar en O(1) a partir de
+    (celda, dirección) con edge_at, de donde también salen las aristas de cada celda (incident).
+    """
+
+    def __init__(self, n_cells: int):
+        """
+        Parámetros:
+        - n_cells: Número de celdas del tablero (ver BoardState).
+        """
+        self.kind = bytearray()  # EDGE_WALL o EDGE_DOOR
+        self.state = bytearray()  # WALL_* o DOOR_* según el tipo
+        self.health = bytearray()  # Golpes que le quedan a una pared
+        self.cell1 = array("i")  # Celda de origen de la arista
+        self.cell2 = array("i")  # Celda vecina
+        self.direction = bytearray()  # Dirección de cell1 hacia cell2
+        self.edge_at = array("i", [-1]) * (n_cells * 4)  # Id de arista por (celda * 4 + dirección)
+
+    @classmethod
+    def from_arrays(cls, kind, state, health, cell1, cell2, direction, edge_at) -> 'EdgeStore':
+        """
+        Crea un registro a partir de arreglos ya construidos (ver board_topology.BoardTopology).
+        Los arreglos de topología se comparten; el estado y la salud se copian.
+        """
+        edges = cls.__new__(cls)
+        edges.kind = kind
+        edges.state = bytearray(state)
+        edges.health = bytearray(health)
+        edges.cell1 = cell1
+        edges.cell2 = cell2
+        edges.direction = direction
+        edges.edge_at = edge_at
+        return edges
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def fork(self) -> 'EdgeStore':
+        """
+        Copia el registro compartiendo la topología (tipos, celdas, direcciones e índices),
+        que no cambia durante el juego; solo se copian el estado y la salud de las aristas.
+        """
+        edges = EdgeStore.__new__(EdgeStore)
+        edges.__dict__.update(self.__dict__)
+        edges.state = self.state[:]
+        edges.health = self.health[:]
+        return edges
+
+    def add(self, cid: int, direction: int, neighbor: int, kind: int) -> int:
+        """
+        Registra una pared o puerta entre una celda y su vecina.
+
+        Parámetros:
+        - cid: Id de la celda de origen.
+        - direction: Dirección (índice en DIRECTIONS) hacia la vecina.
+        - neighbor: Id de la celda vecina.
+        - kind: EDGE_WALL o EDGE_DOOR.
+
+        Retorna:
+        - El id de la arista nueva.
+        """
+        eid = len(self.kind)
+        self.kind.append(kind)
+        self.state.append(WALL_INTACT if kind == EDGE_WALL else DOOR_CLOSED)
+        self.health.append(WALL_MAX_HEALTH if kind == EDGE_WALL else 0)
+        self.cell1.append(cid)
+        self.cell2.append(neighbor)
+        self.direction.append(direction)
+        self.edge_at[cid * 4 + direction] = eid
+        self.edge_at[neighbor * 4 + OPPOSITE[direction]] = eid
+        return eid
+
+    def incident(self, cid: int) -> List[int]:
+        """
+        Devuelve las aristas que tocan una celda, en el orden de DIRECTIONS.
+        """
+        edge_at = self.edge_at
+        base = cid * 4
+        return [eid for eid in (edge_at[base], edge_at[base + 1], edge_at[base + 2], edge_at[base + 3]) if eid >= 0]
+
+    def other(self, eid: int, cid: int) -> int:
+        """
+        Devuelve la celda del otro lado de la arista.
+        """
+        return self.cell2[eid] if self.cell1[eid] == cid else self.cell1[eid]
+
+    def cost(self, eid: int) -> int:
+        """
+        Calcula el costo de movimiento a través de la arista según su estado.
+        """
+        if self.kind[eid] == EDGE_WALL:
+            return COST_WALL if self.state[eid] != WALL_DESTROYED else COST_OPEN
+        return COST_DOOR if self.state[eid] == DOOR_CLOSED else COST_OPEN
+
+    def is_wall(self, eid: int) -> bool:
+        return eid >= 0 and self.kind[eid] == EDGE_WALL and self.state[eid] != WALL_DESTROYED
+
+    def is_closed_door(self, eid: int) -> bool:
+        return eid >= 0 and self.kind[eid] == EDGE_DOOR and self.state[eid] == DOOR_CLOSED
+
+    def is_barrier(self, eid: int) -> bool:
+        """
+        Indica si la arista bloquea el paso del fuego (pared en pie o puerta cerrada).
+        """
+        return self.is_wall(eid) or self.is_closed_door(eid)
+
+    def damage(self, eid: int) -> bool:
+        """
+        Resta un punto de salud a una pared.
+
+        Retorna:
+        - True si la pared quedó destruida con este golpe.
+        """
+        self.health[eid] -= 1
+        if self.health[eid] == 0:
+            self.state[eid] = WALL_DESTROYED
+            return True
+        self.state[eid] = WALL_DAMAGED
+        return False
+
+    def walls_health(self, positions: List[Tuple[int, int]]) -> Dict[Tuple[Tuple[int, int], Tuple[int, int]], int]:
+        """
+        Devuelve la salud de las paredes en pie como {(celda1, celda2): salud}.
+
+        Parámetros:
+        - positions: Tabla de posiciones por id de celda (BoardState.positions).
+        """
+        return {
+            (positions[self.cell1[eid]], positions[self.cell2[eid]]): self.health[eid]
+            for eid in range(len(self.kind))
+            if self.kind[eid] == EDGE_WALL and self.state[eid] != WALL_DESTROYED
+        }
+
+
+def build_edge_store(board, grid_structure) -> EdgeStore:
+    """
+    Construye el registro de aristas a partir de los costos ya cargados en el tablero.
+
+    Una pared o puerta declarada en cualquiera de las dos celdas se registra una sola vez
+    para el par, y el costo resultante se escribe en ambos sentidos tanto en el tablero
+    como en grid_structure.
+
+    Parámetros:
+    - board: BoardState con edge_cost y structure_slot cargados.
+    - grid_structure: Diccionario {celda: [[vecino, costo], ...]} del modelo.
+
+    Retorna:
+    - El EdgeStore del tablero.
+    """
+    edges = EdgeStore(board.n_cells)
+    for cid in range(board.n_cells):
+        if not board.building[cid]:
+            continue
+        for d in range(len(DIRECTIONS)):
+            neighbor = board.neighbors[cid * 4 + d]
+            if neighbor < cid or not board.building[neighbor]:
+                continue  # Cada par se procesa una vez, desde la celda de menor id
+            costs = (board.edge_cost[cid * 4 + d], board.edge_cost[neighbor * 4 + OPPOSITE[d]])
+            if COST_WALL in costs:
+                eid = edges.add(cid, d, neighbor, EDGE_WALL)
+            elif COST_DOOR in costs:
+                eid = edges.add(cid, d, neighbor, EDGE_DOOR)
+            else:
+                continue
+            cost = edges.cost(eid)
+            for half, origin in ((cid * 4 + d, cid), (neighbor * 4 + OPPOSITE[d], neighbor)):
+                board.edge_cost[half] = cost
+                slot = board.structure_slot[half]
+                if slot >= 0:
+                    grid_structure[board.positions[origin]][slot][1] = cost
+    return edges
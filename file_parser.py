@@ -8,39 +8,31 @@ def parse_game_config(file_path):
     puertas=[]
     entrada=[]
 
-        
-    for line in lines[:6]:
-        row = line.strip().split()
-        wall_matrix.append(row)
-
-    for line in lines[6:9]:
+    # Las secciones van en orden (paredes, POIs, fuego, puertas, salidas) y se reconocen por la
+    # forma de cada renglón, así que el tamaño del tablero y de cada sección es libre. Los
+    # renglones de dos números antes de la primera puerta son fuego y los de después, salidas.
+    for line in lines:
         parts = line.split()
-        if len(parts) == 3:
+        if not parts:
+            continue
+        if not (victims or fuego or puertas or entrada) and all(len(part) == 4 and set(part) <= {'0', '1'} for part in parts):
+            wall_matrix.append(parts)
+        elif len(parts) == 3:
             x, y = int(parts[0]), int(parts[1])
             entity_type = parts[2]
             if entity_type == 'v':
                 victims.append(((x, y), True))
             else:
                 victims.append(((x, y), False))
-
-    for line in lines[9:19]:
-        # Split the line into x and y
-        parts = line.split()
-        if len(parts) == 2:
-            x, y = int(parts[0]), int(parts[1])
-            fuego.append((x, y))
-
-    for line in lines[19:27]:
-        parts = line.split()
-        if len(parts) == 4:
+        elif len(parts) == 4:
             x1, y1, x2, y2 = map(int, parts)
             puertas.append(((x1, y1), (x2, y2)))
-
-    for line in lines[27:31]:
-        parts = line.split()
-        if len(parts) == 2:
+        elif len(parts) == 2:
             x, y = int(parts[0]), int(parts[1])
-            entrada.append((x, y))
+            (entrada if puertas else fuego).append((x, y))
+
+    if not wall_matrix or any(len(row) != len(wall_matrix[0]) for row in wall_matrix):
+        raise ValueError(f"Matriz de paredes inválida en {file_path}")
     
     #C:/Users/die_g/OneDrive/desktop/Multiagentes/FlashPoint-Fire-Rescue/input.txt
 
@@ -64,3 +56,35 @@ def parse_game_config(file_path):
     }
 
 
+
+
+def board_size(scenario):
+    """
+    Dimensiones del edificio de un escenario, según su matriz de paredes.
+
+    Retorna:
+    - (ancho, alto).
+    """
+    wall_matrix = scenario['wall_matrix']
+    return len(wall_matrix[0]), len(wall_matrix)
+
+
+def format_game_config(scenario):
+    """
+    Escribe un escenario en el formato de texto que lee parse_game_config.
+
+    Comportamiento:
+    - El fuego se distingue de las salidas por ir antes de las puertas, así que un escenario
+      sin puertas no se puede escribir sin ambigüedad.
+
+    Lanza:
+    - ValueError si el escenario tiene salidas pero no puertas.
+    """
+    if scenario['exits'] and not scenario['doors']:
+        raise ValueError("Un escenario con salidas necesita al menos una puerta")
+    lines = [' '.join(row) for row in scenario['wall_matrix']]
+    lines += [f"{x} {y} {'v' if is_victim else 'f'}" for (x, y), is_victim in scenario['victims']]
+    lines += [f"{x} {y}" for x, y in scenario['fire']]
+    lines += [f"{x1} {y1} {x2} {y2}" for (x1, y1), (x2, y2) in scenario['doors']]
+    lines += [f"{x} {y}" for x, y in scenario['exits']]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,117 @@
+from typing import List
+
+from board_state import OPPOSITE, BoardState
+
+
+def is_open(cost: int) -> bool:
+    """
+    Indica si el fuego cruza una media arista con el costo dado (ni pared ni puerta cerrada).
+    """
+    return cost != 5 and cost != 2
+
+
+class FireFrontier:
+    """
+    Frente del fuego mantenido de forma incremental.
+
+    Para cada celda guarda cuántas vecinas con fuego tiene a través de una arista abierta,
+    que es justo lo que consulta FlashPointModel.is_adjacent. Los conteos se actualizan cuando
+    cambia el fuego o el costo de una arista, y las celdas con humo que quedan tocando el fuego
+    se apilan en pending para que el flashover solo procese esas celdas.
+    """
+
+    def __init__(self, board: BoardState):
+        """
+        Parámetros:
+        - board: Tablero cuyas capas de fuego y humo y cuyas aristas se observan.
+        """
+        self.board = board
+        self.counts = bytearray(board.n_cells)  # Vecinas con fuego a través de aristas abiertas
+        self.pending: List[int] = []  # Celdas con humo que tocan el fuego (pueden estar repetidas u obsoletas)
+        board.fire.watchers.append(self)
+        board.smoke.watchers.append(self)
+        board.edge_watchers.append(self)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Recalcula los conteos desde cero (al crear el frente o al restaurar un tablero completo).
+        """
+        board = self.board
+        self.counts = bytearray(board.n_cells)
+        self.pending = []
+        for cid in board.fire.iter_ids():
+            self.cell_added(board.fire, cid)
+
+    def fork(self, board: BoardState) -> 'FireFrontier':
+        """
+        Copia el frente para un tablero copiado con BoardState.fork, sin recalcularlo.
+        """
+        frontier = FireFrontier.__new__(FireFrontier)
+        frontier.board = board
+        frontier.counts = self.counts[:]
+        frontier.pending = list(self.pending)
+        board.fire.watchers.append(frontier)
+        board.smoke.watchers.append(frontier)
+        board.edge_watchers.append(frontier)
+        return frontier
+
+    def touches_fire(self, cid: int) -> bool:
+        """
+        Indica si la celda es adyacente (sin pared ni puerta cerrada) a alguna celda con fuego.
+        """
+        return self.counts[cid] > 0
+
+    def pop_ignitions(self):
+        """
+        Extrae las celdas con humo que tocan el fuego, validando cada entrada al sacarla.
+
+        Retorna:
+        - Un generador de ids de celda; las celdas que se convierten en fuego mientras se
+          recorre pueden agregar nuevas entradas.
+        """
+        pending, smoke, counts = self.pending, self.board.smoke.cells, self.counts
+        while pending:
+            cid = pending.pop()
+            if smoke[cid] and counts[cid]:
+                yield cid
+
+    def cell_added(self, layer, cid: int) -> None:
+        board = self.board
+        if layer is board.smoke:
+            if self.counts[cid]:
+                self.pending.append(cid)
+            return
+        neighbors, edge_cost, smoke = board.neighbors, board.edge_cost, board.smoke.cells
+        for d in range(4):
+            neighbor = neighbors[cid * 4 + d]
+            if neighbor >= 0 and is_open(edge_cost[neighbor * 4 + OPPOSITE[d]]):
+                self.counts[neighbor] += 1
+                if smoke[neighbor]:
+                    self.pending.append(neighbor)
+
+    def cell_removed(self, layer, cid: int) -> None:
+        board = self.board
+        if layer is not board.fire:
+            return
+        neighbors, edge_cost = board.neighbors, board.edge_cost
+        for d in range(4):
+            neighbor = neighbors[cid * 4 + d]
+            if neighbor >= 0 and is_open(edge_cost[neighbor * 4 + OPPOSITE[d]]):
+                self.counts[neighbor] -= 1
+
+    def edge_changed(self, half: int, old_cost: int, new_cost: int) -> None:
+        was_open, now_open = is_open(old_cost), is_open(new_cost)
+        if was_open == now_open:
+            return
+        board = self.board
+        neighbor = board.neighbors[half]
+        if neighbor < 0 or not board.fire.cells[neighbor]:
+            return
+        cid = half // 4
+        if now_open:
+            self.counts[cid] += 1
+            if board.smoke.cells[cid]:
+                self.pending.append(cid)
+        else:
+            self.counts[cid] -= 1
@@ -0,0 +1,515 @@
+import os
+import random
+from multiprocessing import get_context, shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_engine import END_COLLAPSE, END_LOST, END_NO_FIREFIGHTERS, END_POOL_EMPTY, END_RESCUED, END_RUNNING
+from board_state import DIRECTIONS, POI_PRESENT, POI_REVEALED, POI_VICTIM
+from board_topology import BoardTopology
+from edge_store import DOOR_CLOSED, DOOR_DESTROYED, DOOR_OPEN, EDGE_DOOR, EDGE_WALL
+from FlashPoint_Backend import FlashPointModel
+from lookahead import (ACTION_CHOP, ACTION_DOOR, ACTION_EXTINGUISH, ACTION_MOVE, ACTION_RULES, ACTION_WAIT,
+                       Action)
+
+# Canales de la observación (cada uno es una matriz de (height + 1) x (width + 1) celdas)
+CH_FIRE = 0  # 1 si la celda tiene fuego
+CH_SMOKE = 1  # 1 si la celda tiene humo
+CH_WALL = 2  # 2-5: salud de la pared en cada dirección (2 intacta, 1 dañada, 0 sin pared)
+CH_DOOR = 6  # 6-9: puerta en cada dirección (1 cerrada, 2 abierta, 0 sin puerta o destruida)
+CH_POI = 10  # 1 si hay un POI sin revelar
+CH_VICTIM = 11  # 1 si hay una víctima revelada
+CH_AGENTS = 12  # Número de bomberos en la celda
+CH_CARRYING = 13  # 1 si un bombero de la celda carga una víctima
+CH_AP = 14  # Puntos de acción (actuales más guardados) de los bomberos de la celda
+CH_EXIT = 15  # 1 si la celda es una salida
+N_CHANNELS = 16
+
+# Contadores de cada juego (vector de enteros junto a la observación)
+STAT_STEP = 0  # Pasos jugados
+STAT_DAMAGE = 1  # Marcadores de daño
+STAT_RESCUED = 2  # Víctimas rescatadas
+STAT_LOST = 3  # Víctimas perdidas
+STAT_AGENTS = 4  # Bomberos en el tablero
+STAT_END = 5  # Motivo de fin (batch_engine.END_*)
+N_STATS = 6
+
+# Acciones de cada bombero como enteros (ver decode_action)
+ACT_RULES = 0  # Reglas fijas
+ACT_MOVE = 1  # 1-4: moverse arriba, izquierda, abajo, derecha
+ACT_EXTINGUISH = 5  # 5: en la celda propia; 6-9: en la vecina arriba, izquierda, abajo, derecha
+ACT_DOOR = 10  # Abrir o cerrar la puerta adyacente
+ACT_CHOP = 11  # Golpear la pared adyacente
+ACT_WAIT = 12  # Guardar los puntos de acción
+N_ACTIONS = 13
+
+# Código de cada estado de puerta en CH_DOOR
+_DOOR_CODES = np.zeros(max(DOOR_CLOSED, DOOR_OPEN, DOOR_DESTROYED) + 1, dtype=np.uint8)
+_DOOR_CODES[DOOR_CLOSED] = 1
+_DOOR_CODES[DOOR_OPEN] = 2
+# Banderas de POI -> CH_POI y CH_VICTIM
+_FLAGS = np.arange(8)
+_HIDDEN = ((_FLAGS & (POI_PRESENT | POI_REVEALED)) == POI_PRESENT).astype(np.uint8)
+_REVEALED_VICTIM = ((_FLAGS & (POI_PRESENT | POI_VICTIM | POI_REVEALED)) == (POI_PRESENT | POI_VICTIM | POI_REVEALED)).astype(np.uint8)
+
+
+def decode_action(agent, code: int) -> Action:
+    """
+    Convierte el entero de una acción (ACT_*) en la acción (tipo, argumento) que ejecuta
+    FirefighterAgent.perform.
+    """
+    x, y = agent.position
+    if ACT_MOVE <= code < ACT_MOVE + 4:
+        dx, dy = DIRECTIONS[code - ACT_MOVE]
+        return ACTION_MOVE, (x + dx, y + dy)
+    if code == ACT_EXTINGUISH:
+        return ACTION_EXTINGUISH, (x, y)
+    if ACT_EXTINGUISH < code <= ACT_EXTINGUISH + 4:
+        dx, dy = DIRECTIONS[code - ACT_EXTINGUISH - 1]
+        return ACTION_EXTINGUISH, (x + dx, y + dy)
+    if code == ACT_DOOR:
+        return ACTION_DOOR, None
+    if code == ACT_CHOP:
+        return ACTION_CHOP, None
+    if code == ACT_WAIT:
+        return ACTION_WAIT, None
+    return ACTION_RULES, None
+
+
+def end_reason(model: FlashPointModel) -> int:
+    """
+    Devuelve el motivo de fin de un juego (batch_engine.END_*), en el orden de check_game_over.
+    """
+    if model.running:
+        return END_RUNNING
+    if model.damage_markers == model.max_damage:
+        return END_COLLAPSE
+    if model.lost_victims == model.max_lost:
+        return END_LOST
+    if model.rescued_victims == model.rescue_goal:
+        return END_RESCUED
+    if len(model.agents) == 0:
+        return END_NO_FIREFIGHTERS
+    return END_POOL_EMPTY
+
+
+class _ActionFeed:
+    """
+    Planificador que entrega a cada bombero la acción que le asignó el entorno en este paso.
+    """
+
+    def __init__(self):
+        self.actions: Sequence[int] = ()
+
+    def choose(self, agent) -> Action:
+        code = int(self.actions[agent.unique_id]) if agent.unique_id < len(self.actions) else ACT_RULES
+        return decode_action(agent, code)
+
+
+class ObservationEncoder:
+    """
+    Escribe el estado de un juego como observación de N_CHANNELS canales sobre un arreglo ya
+    reservado, sin pasar por get_game_state.
+
+    Los canales por celda se copian directamente desde los arreglos del tablero (fuego, humo,
+    POIs, ocupación) y los de paredes y puertas se reúnen desde el registro de aristas con
+    tablas de índices por dirección, calculadas una sola vez por topología; solo los canales
+    de carga y puntos de acción recorren a los bomberos.
+    """
+
+    def __init__(self, topology: BoardTopology):
+        board, edges = topology.board, topology.edges
+        self.shape = (N_CHANNELS, board.rows, board.cols)
+        n_edges = len(edges.kind)
+        kind = np.zeros(n_edges + 1, dtype=np.uint8)
+        kind[:-1] = np.frombuffer(bytes(edges.kind), dtype=np.uint8)
+        edge_at = np.asarray(edges.edge_at, dtype=np.intp).reshape(board.n_cells, 4)
+        has = edge_at >= 0
+        edge_kind = kind[np.where(has, edge_at, n_edges)]
+        # Valores por arista: salud de las paredes y, después, código de las puertas; cada mitad
+        # termina con una entrada en cero para las celdas sin arista de ese tipo
+        self.edge_values = np.zeros(2 * (n_edges + 1), dtype=np.uint8)
+        wall_index = np.where(has & (edge_kind == EDGE_WALL), edge_at, n_edges).T
+        door_index = np.where(has & (edge_kind == EDGE_DOOR), edge_at, n_edges).T + (n_edges + 1)
+        # Índice en edge_values de cada (canal de pared o puerta, celda)
+        self.edge_index = np.ascontiguousarray(np.concatenate((wall_index, door_index)))
+        self.n_edges = n_edges
+        self.carrying = bytearray(board.n_cells)  # Canales de los bomberos, llenados en Python
+        self.ap = bytearray(board.n_cells)
+        self.blank = bytes(board.n_cells)
+        self.exits = np.zeros(board.n_cells, dtype=np.uint8)
+        for pos in topology.exits:
+            cid = board.cell_id(pos)
+            if cid >= 0:
+                self.exits[cid] = 1
+
+    def new_buffer(self) -> np.ndarray:
+        return np.zeros(self.shape, dtype=np.uint8)
+
+    def encode(self, model: FlashPointModel, out: np.ndarray) -> np.ndarray:
+        """
+        Parámetros:
+        - model: Juego a observar (de la misma topología).
+        - out: Arreglo uint8 contiguo con forma self.shape, que se sobrescribe.
+
+        Retorna:
+        - out.
+        """
+        board, edges = model.board, model.edges
+        flat = out.reshape(N_CHANNELS, -1)
+        np.copyto(flat[CH_FIRE], np.frombuffer(board.fire.cells, dtype=np.uint8))
+        np.copyto(flat[CH_SMOKE], np.frombuffer(board.smoke.cells, dtype=np.uint8))
+        n_edges, values = self.n_edges, self.edge_values
+        if n_edges:
+            values[:n_edges] = np.frombuffer(edges.health, dtype=np.uint8)
+            np.take(_DOOR_CODES, np.frombuffer(edges.state, dtype=np.uint8), out=values[n_edges + 1:-1], mode="clip")
+        np.take(values, self.edge_index, out=flat[CH_WALL:CH_DOOR + 4], mode="clip")
+        pois = np.frombuffer(board.pois.cells, dtype=np.uint8)
+        np.take(_HIDDEN, pois, out=flat[CH_POI], mode="clip")
+        np.take(_REVEALED_VICTIM, pois, out=flat[CH_VICTIM], mode="clip")
+        np.copyto(flat[CH_AGENTS], np.frombuffer(board.occupancy, dtype=np.uint8))
+        carrying, ap = self.carrying, self.ap
+        carrying[:] = self.blank
+        ap[:] = self.blank
+        for agent in model.agents:
+            cid = board.cell_id(agent.position)
+            if agent.carrying_victim:
+                carrying[cid] = 1
+            ap[cid] = min(255, ap[cid] + agent.ap + agent.saved_ap)
+        np.copyto(flat[CH_CARRYING], np.frombuffer(carrying, dtype=np.uint8))
+        np.copyto(flat[CH_AP], np.frombuffer(ap, dtype=np.uint8))
+        np.copyto(flat[CH_EXIT], self.exits)
+        return out
+
+
+class FlashPointEnv:
+    """
+    Entorno reset/step sobre un FlashPointModel, con observaciones de ObservationEncoder.
+
+    En cada paso cada bombero ejecuta la acción (ACT_*) que le toca según su id; los
+    derribados la ignoran. La recompensa es víctimas rescatadas menos víctimas perdidas en el
+    paso. El juego termina cuando el modelo termina, al llegar a max_steps o si se agota la
+    bolsa de víctimas (el modelo lanza IndexError).
+    """
+
+    def __init__(self, topology: BoardTopology, victims, fire, n_agents: int = 6, max_steps: int = 200,
+                 seed=None, encoder: ObservationEncoder = None):
+        """
+        Parámetros:
+        - topology: Topología compilada del escenario.
+        - victims, fire: POIs y fuego iniciales (como en FlashPointModel).
+        - n_agents: Bomberos por juego.
+        - max_steps: Pasos máximos por juego.
+        - seed: Semilla de la secuencia de juegos; cada reset sin semilla toma la siguiente.
+        - encoder: Codificador de observaciones compartido (por defecto uno nuevo).
+        """
+        self.topology = topology
+        self.victims = victims
+        self.fire = fire
+        self.n_agents = n_agents
+        self.max_steps = max_steps
+        self.encoder = encoder if encoder is not None else ObservationEncoder(topology)
+        self.observation_shape = self.encoder.shape
+        self.obs = self.encoder.new_buffer()
+        self.stats = np.zeros(N_STATS, dtype=np.int32)  # Contadores del último paso (STAT_*)
+        self.seeds = random.Random(seed)  # Semillas de los juegos sucesivos
+        self.feed = _ActionFeed()
+        self.model: Optional[FlashPointModel] = None
+        self.done = True
+        self.pool_empty = False
+
+    def reset(self, seed=None, out: np.ndarray = None) -> np.ndarray:
+        """
+        Empieza un juego nuevo.
+
+        Parámetros:
+        - seed: Semilla del juego; por defecto la siguiente de la secuencia del entorno.
+        - out: Arreglo donde escribir la observación (por defecto self.obs).
+
+        Retorna:
+        - La observación inicial.
+        """
+        if seed is None:
+            seed = self.seeds.getrandbits(63)
+        self.model = FlashPointModel(self.topology.width, self.topology.height, None, self.victims, self.fire,
+                                     None, None, self.n_agents, planner=self.feed, topology=self.topology,
+                                     seed=seed, quiet=True)
+        self.done = False
+        self.pool_empty = False
+        return self.encoder.encode(self.model, self.obs if out is None else out)
+
+    def advance(self, actions: Sequence[int]) -> Tuple[float, bool]:
+        """
+        Avanza un paso sin escribir la observación.
+
+        Parámetros:
+        - actions: Acción ACT_* de cada bombero, indexada por id.
+
+        Retorna:
+        - (recompensa, terminado).
+        """
+        model = self.model
+        if self.done:
+            raise RuntimeError("El juego terminó; llama a reset")
+        rescued, lost = model.rescued_victims, model.lost_victims
+        self.feed.actions = actions
+        try:
+            model.play_round()
+        except IndexError:
+            # Se agotó la bolsa de víctimas (ver FlashPointModel.add_victim)
+            model.running = False
+            self.pool_empty = True
+        self.done = not model.running or model.current_step >= self.max_steps
+        return float(model.rescued_victims - rescued - (model.lost_victims - lost)), self.done
+
+    def step(self, actions: Sequence[int], out: np.ndarray = None,
+             stats: np.ndarray = None) -> Tuple[np.ndarray, float, bool, np.ndarray]:
+        """
+        Avanza un paso sin reservar memoria.
+
+        Parámetros:
+        - out: Arreglo donde escribir la observación (por defecto self.obs).
+        - stats: Arreglo donde escribir los contadores (por defecto self.stats).
+
+        Retorna:
+        - (observación, recompensa, terminado, contadores STAT_* del juego). Los arreglos por
+          defecto se sobrescriben en el siguiente paso.
+        """
+        reward, done = self.advance(actions)
+        obs = self.encoder.encode(self.model, self.obs if out is None else out)
+        return obs, reward, done, self.write_stats(self.stats if stats is None else stats)
+
+    def write_stats(self, out: np.ndarray) -> np.ndarray:
+        """
+        Escribe los contadores del juego (STAT_*) en out.
+        """
+        model = self.model
+        out[STAT_STEP] = model.current_step
+        out[STAT_DAMAGE] = model.damage_markers
+        out[STAT_RESCUED] = model.rescued_victims
+        out[STAT_LOST] = model.lost_victims
+        out[STAT_AGENTS] = len(model.agents)
+        out[STAT_END] = END_POOL_EMPTY if self.pool_empty else end_reason(model)
+        return out
+
+
+def _layout(n_envs: int, obs_shape: Tuple[int, ...], n_agents: int) -> Tuple[List[Tuple], int]:
+    """
+    Calcula la disposición de los arreglos compartidos de VecFlashPointEnv en un solo bloque.
+
+    Retorna:
+    - ([(nombre, dtype, forma, desplazamiento)], tamaño total en bytes).
+    """
+    arrays = [("obs", np.uint8, (n_envs,) + tuple(obs_shape)), ("actions", np.uint8, (n_envs, n_agents)),
+              ("rewards", np.float32, (n_envs,)), ("dones", np.bool_, (n_envs,)),
+              ("stats", np.int32, (n_envs, N_STATS))]
+    layout, offset = [], 0
+    for name, dtype, shape in arrays:
+        offset = (offset + 7) & ~7
+        layout.append((name, np.dtype(dtype).str, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, max(offset, 1)
+
+
+def _views(buffer, layout) -> Dict[str, np.ndarray]:
+    return {name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+            for name, dtype, shape, offset in layout}
+
+
+def _step_envs(envs: List[FlashPointEnv], arrays: Dict[str, np.ndarray], start: int) -> None:
+    """
+    Avanza un tramo de entornos y escribe sus resultados en los arreglos compartidos; los que
+    terminan escriben sus contadores finales y se reinician.
+    """
+    obs, actions, rewards, dones, stats = (arrays["obs"], arrays["actions"], arrays["rewards"], arrays["dones"],
+                                           arrays["stats"])
+    for k, env in enumerate(envs):
+        i = start + k
+        reward, done = env.advance(actions[i])
+        rewards[i] = reward
+        dones[i] = done
+        env.write_stats(stats[i])
+        if done:
+            env.reset(out=obs[i])
+        else:
+            env.encoder.encode(env.model, obs[i])
+
+
+def _reset_envs(envs: List[FlashPointEnv], arrays: Dict[str, np.ndarray], start: int, seeds) -> None:
+    for k, env in enumerate(envs):
+        i = start + k
+        env.reset(seed=None if seeds is None else seeds[k], out=arrays["obs"][i])
+        arrays["rewards"][i] = 0.0
+        arrays["dones"][i] = False
+        env.write_stats(arrays["stats"][i])
+
+
+def _worker(conn, block_name: str, layout, start: int, topology: BoardTopology, victims, fire, n_agents: int,
+            max_steps: int, seeds: List[int]) -> None:
+    """
+    Proceso de VecFlashPointEnv: atiende órdenes por conn sobre su tramo de entornos y escribe
+    los resultados en el bloque compartido.
+    """
+    try:
+        block = shared_memory.SharedMemory(name=block_name, track=False)  # Python 3.13+
+    except TypeError:
+        block = shared_memory.SharedMemory(name=block_name)
+    arrays = _views(block.buf, layout)
+    encoder = ObservationEncoder(topology)
+    envs = [FlashPointEnv(topology, victims, fire, n_agents, max_steps, seed, encoder) for seed in seeds]
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == "step":
+                _step_envs(envs, arrays, start)
+            elif command == "reset":
+                _reset_envs(envs, arrays, start, arg)
+            else:
+                break
+            conn.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        arrays.clear()  # Las vistas deben soltarse antes de cerrar el bloque
+        block.close()
+        conn.close()
+
+
+class VecFlashPointEnv:
+    """
+    Varios FlashPointEnv que avanzan juntos, repartidos entre procesos.
+
+    Las observaciones, acciones, recompensas, fines y contadores de todos los entornos viven
+    en un solo bloque de memoria compartida: cada proceso escribe su tramo directamente ahí,
+    y por las tuberías solo viajan las órdenes y su confirmación. obs, rewards, dones y stats
+    son vistas sobre ese bloque (sin copias), que se sobrescriben en el siguiente step.
+
+    Un entorno que termina se reinicia solo dentro del mismo step: dones indica que terminó,
+    stats conserva sus contadores finales y obs ya es la observación inicial del juego nuevo.
+    """
+
+    def __init__(self, topology: BoardTopology, victims, fire, n_envs: int, n_workers: int = None,
+                 n_agents: int = 6, max_steps: int = 200, seed=None, context: str = None):
+        """
+        Parámetros:
+        - topology, victims, fire, n_agents, max_steps: Como en FlashPointEnv.
+        - n_envs: Número de entornos.
+        - n_workers: Procesos; 0 avanza los entornos en este proceso (por defecto, uno por CPU
+          sin pasar de n_envs).
+        - seed: Semilla de las secuencias de juegos de todos los entornos.
+        - context: Método de inicio de multiprocessing ("fork", "spawn", ...).
+        """
+        self.n_envs = n_envs
+        self.n_agents = n_agents
+        self.encoder = ObservationEncoder(topology)
+        self.observation_shape = self.encoder.shape
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = min(n_workers, n_envs)
+        seeds = random.Random(seed)
+        env_seeds = [seeds.getrandbits(63) for _ in range(n_envs)]
+
+        layout, size = _layout(n_envs, self.observation_shape, n_agents)
+        self._block = shared_memory.SharedMemory(create=True, size=size)
+        self._arrays = _views(self._block.buf, layout)
+        self.obs = self._arrays["obs"]
+        self.actions = self._arrays["actions"]
+        self.rewards = self._arrays["rewards"]
+        self.dones = self._arrays["dones"]
+        self.stats = self._arrays["stats"]
+
+        self._envs: List[FlashPointEnv] = []
+        self._workers = []  # (proceso, tubería)
+        self._slices = []  # (inicio, fin) del tramo de cada proceso
+        if n_workers == 0:
+            self._envs = [FlashPointEnv(topology, victims, fire, n_agents, max_steps, s, self.encoder)
+                          for s in env_seeds]
+            self._slices.append((0, n_envs))
+            return
+        ctx = get_context(context)
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=_worker, daemon=True,
+                                  args=(child, self._block.name, layout, int(start), topology, victims, fire,
+                                        n_agents, max_steps, env_seeds[start:stop]))
+            process.start()
+            child.close()
+            self._workers.append((process, parent))
+            self._slices.append((int(start), int(stop)))
+
+    def reset(self, seeds: Sequence[int] = None) -> np.ndarray:
+        """
+        Reinicia todos los entornos.
+
+        Parámetros:
+        - seeds: Semilla del juego de cada entorno (por defecto, la siguiente de cada uno).
+
+        Retorna:
+        - obs, con forma (n_envs,) + observation_shape.
+        """
+        if not self._workers:
+            _reset_envs(self._envs, self._arrays, 0, seeds)
+            return self.obs
+        for (process, conn), (start, stop) in zip(self._workers, self._slices):
+            conn.send(("reset", None if seeds is None else list(seeds[start:stop])))
+        self._wait()
+        return self.obs
+
+    def step(self, actions=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Avanza un paso todos los entornos.
+
+        Parámetros:
+        - actions: Arreglo (n_envs, n_agents) de acciones ACT_*; None repite las de self.actions
+          (que también se pueden escribir en su lugar).
+
+        Retorna:
+        - (obs, rewards, dones, stats), vistas sobre la memoria compartida.
+        """
+        if actions is not None:
+            np.copyto(self.actions, actions, casting="unsafe")
+        if not self._workers:
+            _step_envs(self._envs, self._arrays, 0)
+        else:
+            for process, conn in self._workers:
+                conn.send(("step", None))
+            self._wait()
+        return self.obs, self.rewards, self.dones, self.stats
+
+    def _wait(self) -> None:
+        for process, conn in self._workers:
+            try:
+                conn.recv()
+            except EOFError:
+                raise RuntimeError(f"El proceso {process.pid} del entorno terminó inesperadamente") from None
+
+    def close(self) -> None:
+        """
+        Detiene los procesos y libera la memoria compartida.
+        """
+        if self._block is None:
+            return
+        for process, conn in self._workers:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process, conn in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+        self._workers = []
+        self._arrays.clear()
+        self.obs = self.actions = self.rewards = self.dones = self.stats = None
+        self._block.close()
+        self._block.unlink()
+        self._block = None
+
+    def __enter__(self) -> 'VecFlashPointEnv':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,211 @@
+from typing import Dict, List, Optional, Tuple
+
+from board_state import BoardState
+
+# Condiciones que excluyen una celda de un grupo de celdas libres
+EXCLUDE_OCCUPIED = 1  # Hay un bombero en la celda
+EXCLUDE_POI = 2  # Hay un punto de interés en la celda
+EXCLUDE_FIRE = 4  # Hay fuego en la celda
+
+# Tiradas de sample_paired por cada celda del edificio que cumple, en promedio, antes de
+# recurrir a la elección determinista
+PAIRED_ROLLS = 8
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN64 = 0x9E3779B97F4A7C15
+
+
+def _mix64(z: int) -> int:
+    """
+    Mezcla de 64 bits (la de splitmix64): convierte un contador en un número pseudoaleatorio.
+    """
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class CellPool:
+    """
+    Conjunto de ids de celda con muestreo uniforme en O(1).
+
+    Guarda los ids en una lista y la posición de cada uno en un arreglo, de modo que
+    agregar, quitar (intercambiando con el último) y elegir al azar cuestan O(1).
+    """
+
+    __slots__ = ("cells", "index")
+
+    def __init__(self, n_cells: int):
+        self.cells: List[int] = []
+        self.index: List[int] = [-1] * n_cells  # Posición de cada celda en cells, o -1
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __contains__(self, cid: int) -> bool:
+        return self.index[cid] >= 0
+
+    def add(self, cid: int) -> None:
+        if self.index[cid] < 0:
+            self.index[cid] = len(self.cells)
+            self.cells.append(cid)
+
+    def discard(self, cid: int) -> None:
+        i = self.index[cid]
+        if i < 0:
+            return
+        last = self.cells.pop()
+        if last != cid:
+            self.cells[i] = last
+            self.index[last] = i
+        self.index[cid] = -1
+
+    def sample(self, rng) -> int:
+        """
+        Elige una celda al azar.
+
+        Parámetros:
+        - rng: Generador con randrange (el módulo random o un random.Random).
+
+        Retorna:
+        - El id de la celda elegida, o -1 si el grupo está vacío.
+        """
+        if not self.cells:
+            return -1
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class FreeCellIndex:
+    """
+    Índice de celdas libres del edificio.
+
+    Mantiene un CellPool por cada combinación de condiciones EXCLUDE_* que se haya pedido,
+    actualizado cuando cambian la ocupación, los puntos de interés o el fuego del tablero,
+    para colocar bomberos y puntos de interés sin repetir tiradas.
+    """
+
+    def __init__(self, board: BoardState):
+        """
+        Parámetros:
+        - board: Tablero cuyas capas se observan.
+        """
+        self.board = board
+        self.pools: Dict[int, CellPool] = {}
+        self.building_ids = [cid for cid in range(board.n_cells) if board.building[cid]]  # En orden de id
+        board.fire.watchers.append(self)
+        board.pois.watchers.append(self)
+        board.occupancy_watchers.append(self)
+
+    def blocked(self, cid: int) -> int:
+        """
+        Devuelve las condiciones EXCLUDE_* que cumple una celda.
+        """
+        board = self.board
+        return ((EXCLUDE_OCCUPIED if board.occupancy[cid] else 0)
+                | (EXCLUDE_POI if board.pois.cells[cid] else 0)
+                | (EXCLUDE_FIRE if board.fire.cells[cid] else 0))
+
+    def pool(self, exclude: int) -> CellPool:
+        """
+        Devuelve (creándolo si hace falta) el grupo de celdas del edificio que no cumplen
+        ninguna de las condiciones en exclude.
+        """
+        pool = self.pools.get(exclude)
+        if pool is None:
+            pool = CellPool(self.board.n_cells)
+            for cid in range(self.board.n_cells):
+                if self.board.building[cid] and not self.blocked(cid) & exclude:
+                    pool.add(cid)
+            self.pools[exclude] = pool
+        return pool
+
+    def sample(self, rng, exclude: int) -> Optional[Tuple[int, int]]:
+        """
+        Elige al azar, con probabilidad uniforme, una celda del edificio libre según exclude.
+
+        Parámetros:
+        - rng: Generador con randrange.
+        - exclude: Combinación de condiciones EXCLUDE_*.
+
+        Retorna:
+        - La posición (x, y) elegida, o None si no hay celdas que cumplan.
+        """
+        cid = self.pool(exclude).sample(rng)
+        return self.board.positions[cid] if cid >= 0 else None
+
+    def sample_paired(self, rng, exclude: int) -> Optional[Tuple[int, int]]:
+        """
+        Elige al azar, con probabilidad uniforme, una celda del edificio libre según exclude,
+        de modo que dos juegos con el mismo flujo de azar elijan la misma celda aunque sus
+        tableros difieran en otras partes.
+
+        Parámetros:
+        - rng: Generador con getrandbits (por ejemplo un flujo de azar del modelo).
+        - exclude: Combinación de condiciones EXCLUDE_*.
+
+        Retorna:
+        - La posición (x, y) elegida, o None si no hay celdas que cumplan.
+
+        Comportamiento:
+        - Toma siempre un solo número de rng, así que el flujo avanza igual en los dos juegos.
+        - A partir de ese número tira celdas del edificio en orden de id (con un contador
+          mezclado, sin crear generadores) hasta dar con una que cumpla. La celda no depende
+          del orden interno de los grupos, que cambia con la historia del juego: si la primera
+          tirada que cumple es la misma en los dos juegos, la celda es la misma.
+        - Tira a lo más PAIRED_ROLLS veces la proporción de celdas del edificio que cumplen;
+          si ninguna cumple, elige la celda que cumple en la posición (número mod cantidad)
+          en orden de id, de modo que el costo está acotado y el resultado sigue siendo
+          determinista.
+        """
+        pool = self.pool(exclude)
+        eligible = len(pool.cells)
+        if not eligible:
+            return None
+        board = self.board
+        building = self.building_ids
+        n_building = len(building)
+        draw = rng.getrandbits(64)
+        counter = draw
+        for _ in range(PAIRED_ROLLS * -(-n_building // eligible)):
+            counter = (counter + _GOLDEN64) & _MASK64
+            cid = building[_mix64(counter) % n_building]
+            if not self.blocked(cid) & exclude:
+                return board.positions[cid]
+        return board.positions[sorted(pool.cells)[draw % eligible]]
+
+    def reset(self) -> None:
+        """
+        Descarta todos los grupos (por ejemplo, después de restaurar el tablero completo);
+        se vuelven a construir cuando se piden.
+        """
+        self.pools = {}
+
+    def restore(self, orders: Dict[int, List[int]]) -> None:
+        """
+        Reemplaza los grupos por los guardados en un checkpoint, conservando el orden de sus
+        celdas para que los muestreos siguientes den los mismos resultados.
+
+        Parámetros:
+        - orders: {condiciones EXCLUDE_*: lista de ids de celda en el orden del grupo}.
+        """
+        self.pools = {}
+        for exclude, cells in orders.items():
+            pool = CellPool(self.board.n_cells)
+            for cid in cells:
+                pool.add(cid)
+            self.pools[exclude] = pool
+
+    def refresh(self, cid: int) -> None:
+        if not self.board.building[cid]:
+            return
+        blocked = self.blocked(cid)
+        for exclude, pool in self.pools.items():
+            if blocked & exclude:
+                pool.discard(cid)
+            else:
+                pool.add(cid)
+
+    def cell_added(self, layer, cid: int) -> None:
+        self.refresh(cid)
+
+    def cell_removed(self, layer, cid: int) -> None:
+        self.refresh(cid)
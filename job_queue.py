@@ -0,0 +1,426 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+from batch_engine import END_NAMES, END_RESCUED
+from file_parser import board_size, parse_game_config
+from monte_carlo import GameRunner, OutcomeStats
+from sweep import SWEEP_PARAMETERS, params_key, scenario_hash
+
+# Estados de un trabajo
+PENDING = "pending"  # Esperando a un worker
+RUNNING = "running"  # Reclamado por un worker con el lease vigente
+DONE = "done"  # Terminado, con su resumen guardado
+FAILED = "failed"  # Falló max_attempts veces
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS scenarios (hash TEXT PRIMARY KEY, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id INTEGER PRIMARY KEY, batch TEXT NOT NULL, scenario TEXT NOT NULL, params TEXT NOT NULL, "
+    "width INTEGER NOT NULL, height INTEGER NOT NULL, max_steps INTEGER NOT NULL, "
+    "seed_start INTEGER NOT NULL, seed_stop INTEGER NOT NULL, status TEXT NOT NULL, worker TEXT, "
+    "heartbeat REAL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, result TEXT)",
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)",
+)
+
+
+class Job:
+    """
+    Trabajo reclamado por un worker: un rango de semillas de un escenario con unos parámetros.
+    """
+
+    __slots__ = ("id", "batch", "scenario", "params", "width", "height", "max_steps", "seeds", "attempts")
+
+    def __init__(self, id: int, batch: str, scenario: str, params: Dict, width: int, height: int, max_steps: int,
+                 seeds: range, attempts: int):
+        self.id = id
+        self.batch = batch
+        self.scenario = scenario  # Huella del escenario (ver JobQueue.scenario)
+        self.params = params
+        self.width = width
+        self.height = height
+        self.max_steps = max_steps
+        self.seeds = seeds
+        self.attempts = attempts
+
+
+class JobQueue:
+    """
+    Cola de trabajos de simulación en un archivo SQLite compartido por todos los workers.
+
+    No hay un proceso central: cada worker reclama trabajos con una transacción exclusiva y
+    renueva un lease (heartbeat) mientras juega. Un trabajo cuyo lease vence sin heartbeat (el
+    worker murió o perdió la conexión) vuelve a quedar disponible para el siguiente claim, así
+    que agregar workers solo requiere apuntarlos al mismo archivo. Para varias máquinas el
+    archivo debe estar en un sistema de archivos con bloqueos de SQLite confiables, y los
+    relojes de las máquinas deben estar sincronizados con margen menor que el lease.
+    """
+
+    def __init__(self, path: str, lease: float = 60.0, max_attempts: int = 3):
+        """
+        Parámetros:
+        - path: Archivo SQLite de la cola (se crea si no existe).
+        - lease: Segundos sin heartbeat tras los que un trabajo en curso se vuelve a encolar.
+        - max_attempts: Reclamos de un trabajo antes de marcarlo como fallido.
+        """
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self.connection.execute(statement)
+
+    def submit(self, scenario: Dict, games: int, seed: int = 0, params: Dict = None, batch: str = "default",
+               chunk_size: int = 64, width: int = None, height: int = None, max_steps: int = 1000) -> List[int]:
+        """
+        Encola games juegos (semillas seed .. seed + games - 1) en trabajos de chunk_size juegos.
+
+        Parámetros:
+        - scenario: Escenario como lo devuelve file_parser.parse_game_config.
+        - params: Argumentos de FlashPointModel (nombres de sweep.SWEEP_PARAMETERS).
+        - batch: Nombre del estudio, para consultar sus resultados juntos.
+        - width, height, max_steps: Como en monte_carlo.GameRunner; el ancho y la altura por
+          defecto son los de la matriz de paredes.
+
+        Retorna:
+        - Los ids de los trabajos creados.
+
+        Lanza:
+        - ValueError si un parámetro no se conoce.
+        """
+        params = dict(params or {})
+        unknown = set(params) - set(SWEEP_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+        default_width, default_height = board_size(scenario)
+        width, height = width or default_width, height or default_height
+        key = scenario_hash(scenario, width, height)
+        with self._transaction():
+            self.connection.execute("INSERT OR IGNORE INTO scenarios VALUES (?, ?)", (key, json.dumps(scenario)))
+            ids = []
+            for start in range(seed, seed + games, chunk_size):
+                cursor = self.connection.execute(
+                    "INSERT INTO jobs (batch, scenario, params, width, height, max_steps, seed_start, seed_stop, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (batch, key, params_key(params), width, height, max_steps, start,
+                     min(start + chunk_size, seed + games), PENDING))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def scenario(self, key: str) -> Dict:
+        (data,) = self.connection.execute("SELECT data FROM scenarios WHERE hash = ?", (key,)).fetchone()
+        scenario = json.loads(data)
+        # JSON no tiene tuplas: las posiciones vuelven como listas
+        return {"wall_matrix": scenario["wall_matrix"],
+                "victims": [(tuple(pos), kind) for pos, kind in scenario["victims"]],
+                "fire": [tuple(pos) for pos in scenario["fire"]],
+                "doors": [(tuple(a), tuple(b)) for a, b in scenario["doors"]],
+                "exits": [tuple(pos) for pos in scenario["exits"]]}
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Reclama el trabajo pendiente más antiguo, o uno en curso cuyo lease venció.
+
+        Retorna:
+        - El Job reclamado, o None si no hay trabajo disponible.
+
+        Comportamiento:
+        - Los trabajos que vencen tras max_attempts reclamos se marcan como FAILED.
+        """
+        now = time.time()
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired' "
+                "WHERE status = ? AND heartbeat < ? AND attempts >= ?",
+                (FAILED, RUNNING, now - self.lease, self.max_attempts))
+            row = self.connection.execute(
+                "SELECT id, batch, scenario, params, width, height, max_steps, seed_start, seed_stop, attempts "
+                "FROM jobs WHERE status = ? OR (status = ? AND heartbeat < ?) ORDER BY id LIMIT 1",
+                (PENDING, RUNNING, now - self.lease)).fetchone()
+            if row is None:
+                return None
+            job_id, batch, scenario, params, width, height, max_steps, start, stop, attempts = row
+            self.connection.execute("UPDATE jobs SET status = ?, worker = ?, heartbeat = ?, attempts = ? WHERE id = ?",
+                                    (RUNNING, worker, now, attempts + 1, job_id))
+        return Job(job_id, batch, scenario, json.loads(params), width, height, max_steps, range(start, stop),
+                   attempts + 1)
+
+    def heartbeat(self, job: Job, worker: str) -> bool:
+        """
+        Renueva el lease de un trabajo.
+
+        Retorna:
+        - False si el trabajo ya no pertenece al worker (su lease venció y otro lo reclamó).
+        """
+        cursor = self.connection.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ? AND worker = ?",
+                                         (time.time(), job.id, RUNNING, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, worker: str, stats: OutcomeStats) -> bool:
+        """
+        Guarda el resumen de un trabajo terminado, como JSON (OutcomeStats.to_state): leer los
+        resultados no ejecuta nada de lo que haya escrito otro proceso en la cola.
+
+        Retorna:
+        - False si el trabajo ya no pertenece al worker; el resumen se descarta para no contar
+          dos veces los mismos juegos.
+        """
+        cursor = self.connection.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL WHERE id = ? AND status = ? AND worker = ?",
+            (DONE, json.dumps(stats.to_state()), job.id, RUNNING, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job: Job, worker: str, error: str) -> None:
+        """
+        Devuelve a la cola un trabajo que falló, o lo marca como FAILED si agotó sus intentos.
+        """
+        status = FAILED if job.attempts >= self.max_attempts else PENDING
+        self.connection.execute("UPDATE jobs SET status = ?, error = ? WHERE id = ? AND status = ? AND worker = ?",
+                                (status, error, job.id, RUNNING, worker))
+
+    def counts(self, batch: str = None) -> Dict[str, int]:
+        """
+        Trabajos por estado, de un estudio o de toda la cola.
+        """
+        query = "SELECT status, COUNT(*) FROM jobs" + (" WHERE batch = ?" if batch else "") + " GROUP BY status"
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+        counts.update(self.connection.execute(query, (batch,) if batch else ()))
+        return counts
+
+    def results(self, batch: str) -> List[Tuple[Dict, Dict, OutcomeStats]]:
+        """
+        Resumen de los trabajos terminados de un estudio. Solo se combinan los trabajos con el
+        mismo escenario, dimensiones, pasos máximos y parámetros.
+
+        Retorna:
+        - [(juego, parámetros, resumen)] en el orden en que se encolaron, con juego =
+          {"scenario": huella, "width", "height", "max_steps"}.
+
+        Lanza:
+        - ValueError si un resumen guardado no es válido.
+        """
+        merged: Dict[Tuple, OutcomeStats] = {}
+        cursor = self.connection.execute(
+            "SELECT scenario, width, height, max_steps, params, result FROM jobs WHERE batch = ? AND status = ? "
+            "ORDER BY id", (batch, DONE))
+        for scenario, width, height, max_steps, params, result in cursor:
+            key = (scenario, width, height, max_steps, params)
+            merged.setdefault(key, OutcomeStats()).merge(OutcomeStats.from_state(json.loads(result)))
+        return [({"scenario": scenario, "width": width, "height": height, "max_steps": max_steps},
+                 json.loads(params), stats)
+                for (scenario, width, height, max_steps, params), stats in merged.items()]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Transacción exclusiva de escritura (BEGIN IMMEDIATE), para que dos workers no reclamen
+        el mismo trabajo.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Hilo que renueva el lease de un trabajo cada lease / 4 segundos mientras el worker juega,
+    con su propia conexión a la cola, para que un juego más largo que el lease no lo pierda.
+    """
+
+    def __init__(self, path: str, job: Job, worker: str, lease: float):
+        super().__init__(name=f"heartbeat-{job.id}", daemon=True)
+        self.path = path
+        self.job = job
+        self.worker = worker
+        self.lease = lease
+        self.stopped = threading.Event()
+        self.lost = False  # El trabajo ya no pertenece al worker
+
+    def run(self) -> None:
+        queue = JobQueue(self.path, self.lease)
+        try:
+            while not self.stopped.wait(self.lease / 4):
+                try:
+                    if not queue.heartbeat(self.job, self.worker):
+                        self.lost = True
+                        return
+                except sqlite3.Error:
+                    continue  # Cola bloqueada o inaccesible; se reintenta en el siguiente latido
+        finally:
+            queue.close()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(path: str, worker: str = None, lease: float = 60.0, poll: float = 2.0, exit_when_idle: bool = False,
+               max_jobs: int = None) -> int:
+    """
+    Reclama y juega trabajos de la cola hasta que no quedan (o para siempre).
+
+    Parámetros:
+    - path: Archivo de la cola.
+    - worker: Nombre del worker (por defecto máquina:pid).
+    - lease: Como en JobQueue; un hilo aparte manda el heartbeat cada lease / 4 segundos
+      mientras se juega un trabajo, también a mitad de un juego.
+    - poll: Segundos de espera cuando no hay trabajo.
+    - exit_when_idle: Termina en cuanto no hay trabajo disponible en lugar de esperar.
+    - max_jobs: Termina tras tantos trabajos (None = sin límite).
+
+    Retorna:
+    - El número de trabajos terminados.
+
+    Comportamiento:
+    - Reutiliza un GameRunner por escenario, dimensiones y límite de pasos. Si pierde el lease
+      de un trabajo (por ejemplo tras una pausa larga) lo abandona y sigue con otro.
+    """
+    worker = worker or worker_name()
+    queue = JobQueue(path, lease)
+    runners: Dict[Tuple, GameRunner] = {}
+    done = 0
+    try:
+        while max_jobs is None or done < max_jobs:
+            job = queue.claim(worker)
+            if job is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll)
+                continue
+            key = (job.scenario, job.width, job.height, job.max_steps)
+            error = None
+            beat = _Heartbeat(path, job, worker, lease)
+            beat.start()
+            try:
+                if key not in runners:
+                    runners[key] = GameRunner(queue.scenario(job.scenario), job.width, job.height,
+                                              max_steps=job.max_steps)
+                runner = runners[key]
+                stats = OutcomeStats()
+                for seed in job.seeds:
+                    stats.add(*runner.play_game(seed, job.params))
+                    if beat.lost:
+                        break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                beat.stop()
+            if error is not None:
+                queue.fail(job, worker, error)
+            elif not beat.lost and queue.complete(job, worker, stats):
+                done += 1
+    finally:
+        queue.close()
+    return done
+
+
+def _parse_params(text: str) -> Dict[str, int]:
+    params = {}
+    for pair in filter(None, text.split(",")):
+        name, _, value = pair.partition("=")
+        if not value:
+            raise argparse.ArgumentTypeError(f"Se esperaba nombre=valor: {pair}")
+        params[name] = int(value)
+    return params
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cola de trabajos de simulación de Flash Point compartida por varios workers.")
+    parser.add_argument("--queue", default="jobs.sqlite", help="Archivo SQLite de la cola")
+    parser.add_argument("--lease", type=float, default=60.0, help="Segundos sin heartbeat para re-encolar un trabajo")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Encola juegos de un escenario")
+    submit.add_argument("scenario", nargs="?", default="input.txt", help="Archivo del escenario (por defecto input.txt)")
+    submit.add_argument("-n", "--games", type=int, default=1000, help="Número de juegos por configuración")
+    submit.add_argument("-s", "--seed", type=int, default=0, help="Semilla del primer juego")
+    submit.add_argument("-p", "--params", type=_parse_params, action="append", default=[],
+                        help=f"Configuración nombre=valor,... (se puede repetir) con nombres en {', '.join(SWEEP_PARAMETERS)}")
+    submit.add_argument("-b", "--batch", default="default", help="Nombre del estudio")
+    submit.add_argument("--chunk-size", type=int, default=64, help="Juegos por trabajo")
+    submit.add_argument("--max-steps", type=int, default=1000, help="Pasos máximos por juego")
+    submit.add_argument("--width", type=int, default=None, help="Ancho del edificio (por defecto el de la matriz de paredes)")
+    submit.add_argument("--height", type=int, default=None, help="Altura del edificio (por defecto la de la matriz de paredes)")
+
+    work = commands.add_parser("work", help="Juega trabajos de la cola")
+    work.add_argument("-w", "--workers", type=int, default=1, help="Procesos worker en esta máquina")
+    work.add_argument("--poll", type=float, default=2.0, help="Segundos de espera cuando no hay trabajo")
+    work.add_argument("--exit-when-idle", action="store_true", help="Termina cuando no queda trabajo")
+
+    status = commands.add_parser("status", help="Muestra los trabajos por estado")
+    status.add_argument("-b", "--batch", default=None, help="Solo este estudio")
+
+    results = commands.add_parser("results", help="Muestra los resultados de un estudio")
+    results.add_argument("-b", "--batch", default="default", help="Nombre del estudio")
+    results.add_argument("--json", action="store_true", help="Imprime los resultados como JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == "work":
+        worker_args = (args.queue, None, args.lease, args.poll, args.exit_when_idle)
+        if args.workers <= 1:
+            print(f"{run_worker(*worker_args)} jobs done")
+            return 0
+        processes = [get_context().Process(target=run_worker, args=worker_args) for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        return 0
+
+    queue = JobQueue(args.queue, args.lease)
+    try:
+        if args.command == "submit":
+            scenario = parse_game_config(args.scenario)
+            ids = []
+            for params in args.params or [{}]:
+                try:
+                    ids += queue.submit(scenario, args.games, args.seed, params, args.batch, args.chunk_size,
+                                        args.width, args.height, args.max_steps)
+                except ValueError as e:
+                    parser.error(str(e))
+            print(f"submitted {len(ids)} jobs to batch {args.batch}")
+        elif args.command == "status":
+            print(", ".join(f"{status} {count}" for status, count in queue.counts(args.batch).items()))
+        elif args.json:
+            print(json.dumps([{**game, "params": params, **stats.to_dict()}
+                              for game, params, stats in queue.results(args.batch)], indent=2))
+        else:
+            results = queue.results(args.batch)
+            # El escenario y las dimensiones solo se muestran si el estudio tiene más de un juego
+            several = len({tuple(game.values()) for game, _, _ in results}) > 1
+            for game, params, stats in results:
+                if several:
+                    print(f"[{game['scenario'][:12]} {game['width']}x{game['height']}, "
+                          f"max_steps {game['max_steps']}] ", end="")
+                wins = stats.reasons[END_RESCUED] / stats.games if stats.games else 0.0
+                reasons = ", ".join(f"{name} {count}" for name, count in zip(END_NAMES, stats.reasons) if count)
+                rescued = stats.stats["rescued"]
+                print(f"{params_key(params)}: {stats.games} games, win {100.0 * wins:.1f}%, "
+                      f"rescued {rescued.mean:.3f} ± {1.96 * rescued.stderr:.3f}, "
+                      f"damage {stats.stats['damage'].mean:.2f} [{reasons}]")
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
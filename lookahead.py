@@ -0,0 +1,179 @@
+import math
+import random
+import time
+from typing import List, Set, Tuple
+
+from board_state import DIRECTIONS
+from edge_store import DOOR_DESTROYED, EDGE_DOOR
+from navigation import FIELD_EXITS, INF
+
+# Tipos de acción que puede ejecutar FirefighterAgent.perform
+ACTION_RULES = "rules"  # Acción elegida por las reglas fijas del bombero
+ACTION_MOVE = "move"  # Moverse a una celda vecina
+ACTION_EXTINGUISH = "extinguish"  # Extinguir fuego o humo en la celda propia o una vecina
+ACTION_DOOR = "door"  # Abrir o cerrar la puerta adyacente
+ACTION_CHOP = "chop"  # Golpear la pared adyacente
+ACTION_WAIT = "wait"  # Guardar los puntos de acción
+
+Action = Tuple[str, object]
+
+
+class RolloutPlanner:
+    """
+    Planificador de acciones por simulación (Monte Carlo plano con selección UCB1).
+
+    Para cada decisión de un bombero enumera sus acciones posibles, y mientras quede tiempo
+    del presupuesto elige una acción con UCB1, la aplica en una copia barata del juego
+    (FlashPointModel.fork), deja actuar con las reglas fijas a los compañeros que aún no
+    actuaron en el paso, termina el paso y simula unos pasos más con las reglas fijas.
+    Al vencer el plazo devuelve la acción con mejor promedio; las reglas fijas se evalúan
+    primero, así que siempre hay una respuesta.
+    """
+
+    def __init__(self, budget: float = 0.01, depth: int = 3, exploration: float = 5.0, seed=None):
+        """
+        Parámetros:
+        - budget: Tiempo máximo por decisión, en segundos.
+        - depth: Número de pasos que se simulan en cada jugada (incluido el actual).
+        - exploration: Constante de exploración de UCB1, en unidades de la puntuación.
+        - seed: Semilla del generador de las simulaciones.
+        """
+        self.budget = budget
+        self.depth = depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.decisions = 0  # Decisiones tomadas
+        self.rollouts = 0  # Simulaciones realizadas
+        self.overruns = 0  # Decisiones que terminaron después del plazo
+        self._turn = (None, -1)  # (id del modelo, paso) de las decisiones en curso
+        self._acted: Set[int] = set()  # Bomberos que ya decidieron en ese paso
+
+    def candidates(self, agent) -> List[Action]:
+        """
+        Enumera las acciones posibles de un bombero en su posición actual.
+        """
+        model = agent.model
+        board, edges = model.board, model.edges
+        x, y = agent.position
+        actions: List[Action] = [(ACTION_RULES, None)]
+        around = [agent.position]
+        for dx, dy in DIRECTIONS:
+            pos = (x + dx, y + dy)
+            if agent.is_valid_position(pos):
+                around.append(pos)
+                if board.is_free(pos):
+                    actions.append((ACTION_MOVE, pos))
+        for pos in around:
+            if pos in model.fire or pos in model.smoke:
+                actions.append((ACTION_EXTINGUISH, pos))
+
+        cid = board.cell_id(agent.position)
+        if any(edges.kind[eid] == EDGE_DOOR and edges.state[eid] != DOOR_DESTROYED for eid in edges.incident(cid)):
+            actions.append((ACTION_DOOR, None))
+        if any(edges.is_wall(eid) for eid in edges.incident(cid)):
+            actions.append((ACTION_CHOP, None))
+        actions.append((ACTION_WAIT, None))
+        return actions
+
+    def score(self, model, agent_id: int) -> float:
+        """
+        Evalúa un estado del juego desde el punto de vista del equipo y de un bombero.
+        """
+        value = 10.0 * model.rescued_victims - 10.0 * model.lost_victims - model.damage_markers
+        value -= 0.5 * len(model.fire) + 0.1 * len(model.smoke)
+        agent = model.agents.get(agent_id)
+        if agent is None:
+            value -= 5.0  # El bombero fue derribado
+        elif agent.carrying_victim:
+            # Una víctima cargada vale más mientras más cerca esté de una salida
+            distance = model.navigation.distance(FIELD_EXITS, agent.position)
+            value += 5.0 - (0.5 * distance if distance < INF else 5.0)
+        return value
+
+    def pending(self, model, agent) -> List[int]:
+        """
+        Ids de los compañeros de un bombero que todavía no actúan en el paso actual, según las
+        decisiones que este planificador ya tomó en ese paso.
+        """
+        turn = (id(model), model.current_step)
+        if turn != self._turn:
+            self._turn = turn
+            self._acted = set()
+        return [other.unique_id for other in model.schedule.agents
+                if other.unique_id != agent.unique_id and other.unique_id not in self._acted]
+
+    def rollout(self, model, agent, action: Action, pending: List[int] = ()) -> float:
+        """
+        Simula una acción en una copia del juego y devuelve la puntuación final.
+
+        Parámetros:
+        - pending: Compañeros que aún no actúan en el paso; en la copia actúan después de la
+          acción con las reglas fijas, en un orden al azar como el del scheduler.
+        """
+        fork = model.fork(self.rng)
+        twin = fork.agents.get(agent.unique_id)
+        if twin is not None and not twin.perform(action):
+            twin.saved_ap = min(twin.ap, 4)
+            twin.ap = 0
+        order = list(pending)
+        self.rng.shuffle(order)
+        for unique_id in order:
+            teammate = fork.agents.get(unique_id)
+            if teammate is not None:
+                teammate.step()
+        try:
+            fork.end_round()
+            for _ in range(self.depth - 1):
+                if not fork.running:
+                    break
+                fork.schedule.step()
+                fork.end_round()
+        except IndexError:
+            pass  # Se agotaron las víctimas por revelar: la simulación termina ahí
+        self.rollouts += 1
+        return self.score(fork, agent.unique_id)
+
+    def choose(self, agent) -> Action:
+        """
+        Elige la acción de un bombero dentro del presupuesto de tiempo.
+
+        Parámetros:
+        - agent: Bombero que decide (con sus puntos de acción del paso ya sumados).
+
+        Retorna:
+        - La acción (tipo, argumento) con mejor puntuación promedio.
+        """
+        start = time.perf_counter()
+        deadline = start + self.budget
+        actions = self.candidates(agent)
+        totals = [0.0] * len(actions)
+        visits = [0] * len(actions)
+        pending = self.pending(agent.model, agent)
+        self._search(agent, actions, totals, visits, pending, deadline)
+        self._acted.add(agent.unique_id)
+
+        self.decisions += 1
+        if time.perf_counter() - start > self.budget * 1.5:
+            self.overruns += 1
+        best = max((k for k in range(len(actions)) if visits[k]), key=lambda k: totals[k] / visits[k])
+        return actions[best]
+
+    def _search(self, agent, actions: List[Action], totals: List[float], visits: List[int], pending: List[int],
+                deadline: float) -> None:
+        """
+        Reparte simulaciones entre las acciones con UCB1 hasta que vence el plazo. Las copias
+        del juego no imprimen mensajes (ver FlashPointModel.fork).
+        """
+        n = 0
+        while True:
+            if n < len(actions):
+                i = n  # Primero una simulación de cada acción, empezando por las reglas
+            else:
+                log_n = math.log(n)
+                i = max(range(len(actions)),
+                        key=lambda k: totals[k] / visits[k] + self.exploration * math.sqrt(log_n / visits[k]))
+            totals[i] += self.rollout(agent.model, agent, actions[i], pending)
+            visits[i] += 1
+            n += 1
+            if time.perf_counter() >= deadline:
+                break
@@ -0,0 +1,191 @@
+import argparse
+import random
+import sys
+from typing import Dict, List, Tuple
+
+from file_parser import format_game_config
+from scenario_library import write_library
+
+# Bits de la máscara de paredes de una celda, en el orden de los caracteres de wall_matrix
+WALL_UP, WALL_LEFT, WALL_DOWN, WALL_RIGHT = 1, 2, 4, 8
+
+# Densidades del tablero de input.txt: 10 celdas con fuego de 48 y una salida por cada 7
+# celdas del perímetro
+FIRE_FRACTION = 10 / 48
+EXIT_SPACING = 7
+
+# Límites de las dimensiones que se generan; con el cuarto mínimo por defecto (2), el lado
+# más largo de MIN_SIZE todavía se puede partir en dos cuartos unidos por una puerta
+MIN_SIZE = 4
+MAX_SIZE = 500
+
+
+def generate_scenario(width: int, height: int, seed=None, room_size: Tuple[int, int] = (2, 4),
+                      fire_fraction: float = FIRE_FRACTION, n_pois: int = 3, n_exits: int = None) -> Dict:
+    """
+    Genera un escenario válido de cualquier tamaño.
+
+    Parámetros:
+    - width, height: Dimensiones del edificio (de MIN_SIZE a MAX_SIZE).
+    - seed: Semilla; el mismo valor genera siempre el mismo escenario.
+    - room_size: Lados mínimo y máximo de los cuartos.
+    - fire_fraction: Fracción de celdas con fuego inicial.
+    - n_pois: Puntos de interés iniciales.
+    - n_exits: Salidas en el perímetro; por defecto una por cada EXIT_SPACING celdas del
+      perímetro (al menos 4).
+
+    Retorna:
+    - El escenario, como lo devuelve file_parser.parse_game_config.
+
+    Comportamiento:
+    - Divide el edificio en cuartos partiendo rectángulos al azar a lo largo de su lado más
+      largo, hasta que ninguno pasa de room_size[1]. El edificio completo se parte siempre,
+      así que hay al menos una puerta (el formato de texto la necesita para separar el fuego
+      de las salidas). Cada corte es una pared con una puerta, así que desde cualquier celda
+      se llega a cualquier otra. El perímetro es pared y las
+      salidas son celdas del perímetro. El fuego y los POIs van en celdas distintas.
+
+    Lanza:
+    - ValueError si las dimensiones o los tamaños no son válidos, o si el lado más largo del
+      edificio no alcanza para dos cuartos de room_size[0].
+    """
+    if not (MIN_SIZE <= width <= MAX_SIZE and MIN_SIZE <= height <= MAX_SIZE):
+        raise ValueError(f"Las dimensiones deben estar entre {MIN_SIZE} y {MAX_SIZE}")
+    smallest, largest = room_size
+    if not 1 <= smallest <= largest or largest < 2 * smallest - 1:
+        raise ValueError("room_size debe ser (mínimo, máximo) con máximo >= 2 * mínimo - 1")
+    if max(width, height) < 2 * smallest:
+        raise ValueError(f"El lado más largo debe medir al menos {2 * smallest} para partir el edificio en dos cuartos")
+    rng = random.Random(seed)
+    walls = [[0] * (width + 1) for _ in range(height + 1)]  # Indexado por (x, y) desde 1
+
+    for x in range(1, height + 1):
+        walls[x][1] |= WALL_LEFT
+        walls[x][width] |= WALL_RIGHT
+    for y in range(1, width + 1):
+        walls[1][y] |= WALL_UP
+        walls[height][y] |= WALL_DOWN
+
+    doors = []
+    rooms = [(1, 1, height, width)]  # (x0, y0, x1, y1) inclusivos
+    while rooms:
+        x0, y0, x1, y1 = rooms.pop()
+        rows, cols = x1 - x0 + 1, y1 - y0 + 1
+        if max(rows, cols) <= largest and doors:
+            continue  # El edificio completo (el primer rectángulo) se parte aunque quepa en un cuarto
+        if rows >= cols:
+            cut = rng.randint(x0 + smallest - 1, x1 - smallest)  # Pared entre la fila cut y cut + 1
+            for y in range(y0, y1 + 1):
+                walls[cut][y] |= WALL_DOWN
+                walls[cut + 1][y] |= WALL_UP
+            y = rng.randint(y0, y1)
+            doors.append(((cut, y), (cut + 1, y)))
+            rooms += [(x0, y0, cut, y1), (cut + 1, y0, x1, y1)]
+        else:
+            cut = rng.randint(y0 + smallest - 1, y1 - smallest)  # Pared entre la columna cut y cut + 1
+            for x in range(x0, x1 + 1):
+                walls[x][cut] |= WALL_RIGHT
+                walls[x][cut + 1] |= WALL_LEFT
+            x = rng.randint(x0, x1)
+            doors.append(((x, cut), (x, cut + 1)))
+            rooms += [(x0, y0, x1, cut), (x0, cut + 1, x1, y1)]
+
+    perimeter = sorted({(x, y) for x in (1, height) for y in range(1, width + 1)}
+                       | {(x, y) for x in range(1, height + 1) for y in (1, width)})
+    if n_exits is None:
+        n_exits = max(4, len(perimeter) // EXIT_SPACING)
+    exits = sorted(rng.sample(perimeter, min(n_exits, len(perimeter))))
+
+    cells = [(x, y) for x in range(1, height + 1) for y in range(1, width + 1)]
+    n_fire = min(round(fire_fraction * len(cells)), len(cells) - n_pois)
+    chosen = rng.sample(cells, n_fire + n_pois)
+    fire = sorted(chosen[:n_fire])
+    victims = [(pos, rng.random() < 10 / 14) for pos in chosen[n_fire:]]  # Como la bolsa: 10 víctimas y 4 falsas alarmas
+
+    wall_matrix = [["".join("1" if walls[x][y] >> bit & 1 else "0" for bit in range(4)) for y in range(1, width + 1)]
+                   for x in range(1, height + 1)]
+    return {"wall_matrix": wall_matrix, "victims": victims, "fire": fire, "doors": sorted(doors), "exits": exits}
+
+
+def validate_scenario(scenario: Dict) -> None:
+    """
+    Verifica que un escenario sea consistente.
+
+    Lanza:
+    - ValueError si la matriz de paredes no es rectangular, si una pared no coincide con la de
+      la celda vecina, si una puerta no une celdas vecinas separadas por pared, si una salida
+      no está en el perímetro o si hay posiciones fuera del edificio.
+    """
+    wall_matrix = scenario["wall_matrix"]
+    height, width = len(wall_matrix), len(wall_matrix[0]) if wall_matrix else 0
+    if not height or any(len(row) != width for row in wall_matrix):
+        raise ValueError("La matriz de paredes no es rectangular")
+
+    def wall(x: int, y: int, bit: int) -> bool:
+        return wall_matrix[x - 1][y - 1][bit] == "1"
+
+    for x in range(1, height + 1):
+        for y in range(1, width + 1):
+            if x < height and wall(x, y, 2) != wall(x + 1, y, 0):
+                raise ValueError(f"La pared entre {(x, y)} y {(x + 1, y)} no coincide")
+            if y < width and wall(x, y, 3) != wall(x, y + 1, 1):
+                raise ValueError(f"La pared entre {(x, y)} y {(x, y + 1)} no coincide")
+
+    def inside(pos: Tuple[int, int]) -> bool:
+        return 1 <= pos[0] <= height and 1 <= pos[1] <= width
+
+    positions: List[Tuple[int, int]] = [pos for pos, _ in scenario["victims"]] + list(scenario["fire"])
+    for pos in positions:
+        if not inside(pos):
+            raise ValueError(f"{pos} está fuera del edificio")
+    for a, b in scenario["doors"]:
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        if not (inside(a) and inside(b)) or abs(dx) + abs(dy) != 1:
+            raise ValueError(f"La puerta {a}-{b} no une celdas vecinas")
+        bit = {(1, 0): 2, (-1, 0): 0, (0, 1): 3, (0, -1): 1}[(dx, dy)]
+        if not wall(a[0], a[1], bit):
+            raise ValueError(f"La puerta {a}-{b} no está en una pared")
+    for x, y in scenario["exits"]:
+        if not inside((x, y)) or not (x in (1, height) or y in (1, width)):
+            raise ValueError(f"La salida {(x, y)} no está en el perímetro")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Genera escenarios de Flash Point de cualquier tamaño.")
+    parser.add_argument("width", type=int, help="Ancho del edificio")
+    parser.add_argument("height", type=int, help="Altura del edificio")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Semilla del primer escenario")
+    parser.add_argument("-o", "--output", default=None, help="Archivo de escenario (por defecto la salida estándar)")
+    parser.add_argument("--library", default=None, help="Escribe --count escenarios en una biblioteca (scenario_library)")
+    parser.add_argument("--count", type=int, default=1, help="Escenarios de la biblioteca (semillas seed, seed + 1, ...)")
+    parser.add_argument("--min-room", type=int, default=2, help="Lado mínimo de los cuartos")
+    parser.add_argument("--max-room", type=int, default=4, help="Lado máximo de los cuartos")
+    parser.add_argument("--pois", type=int, default=3, help="Puntos de interés iniciales")
+    parser.add_argument("--fire", type=float, default=FIRE_FRACTION, help="Fracción de celdas con fuego inicial")
+    args = parser.parse_args(argv)
+
+    def generate(seed: int) -> Dict:
+        try:
+            return generate_scenario(args.width, args.height, seed, (args.min_room, args.max_room), args.fire, args.pois)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.library:
+        count = write_library(args.library, ((generate(seed), args.width, args.height)
+                                             for seed in range(args.seed, args.seed + args.count)))
+        print(f"wrote {count} boards to {args.library}")
+        return 0
+    try:
+        text = format_game_config(generate(args.seed))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
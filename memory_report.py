@@ -0,0 +1,118 @@
+import sys
+import types
+from typing import Dict, Iterable, Set
+
+from simcore import Grid, _neighborhood_tables
+
+# Objetos que no pertenecen a un juego: módulos, clases, funciones y constantes compartidas
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, type(None), bool)
+
+
+def _slot_names(cls) -> Iterable[str]:
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name not in ("__dict__", "__weakref__"):
+                yield name
+
+
+def deep_sizeof(obj, seen: Set[int]) -> int:
+    """
+    Calcula los bytes que ocupa un objeto y todo lo que alcanza (contenedores, atributos de
+    __dict__ y de __slots__), sin contar dos veces un mismo objeto.
+
+    Parámetros:
+    - obj: Objeto a medir; se mide aunque su id ya esté en seen.
+    - seen: Ids de los objetos ya contados (o que no se deben contar); se actualiza.
+
+    Retorna:
+    - El tamaño en bytes según sys.getsizeof.
+
+    Comportamiento:
+    - No cuenta módulos, clases, funciones, None, booleanos ni los enteros pequeños que
+      Python comparte entre todos los objetos.
+    """
+    total = 0
+    stack = [obj]
+    seen.add(id(obj))
+    while stack:
+        item = stack.pop()
+        total += sys.getsizeof(item)
+        if isinstance(item, memoryview):
+            total += item.nbytes  # Vista sobre un búfer externo (por ejemplo memoria compartida)
+            continue
+        if isinstance(item, (str, bytes, bytearray, int, float)):
+            continue
+        if isinstance(item, dict):
+            children = [value for pair in item.items() for value in pair]
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            children = item
+        else:
+            children = []
+            if hasattr(item, "__dict__"):
+                children.append(item.__dict__)
+            for name in _slot_names(type(item)):
+                if hasattr(item, name):
+                    children.append(getattr(item, name))
+        for child in children:
+            if isinstance(child, _SKIP_TYPES) or (type(child) is int and -5 <= child <= 256):
+                continue
+            if id(child) not in seen:
+                seen.add(id(child))
+                stack.append(child)
+    return total
+
+
+def model_memory_report(model) -> Dict[str, int]:
+    """
+    Reporta la memoria de un juego por subsistema.
+
+    Parámetros:
+    - model: FlashPointModel a medir.
+
+    Retorna:
+    - Un diccionario subsistema -> bytes, más "total" (la suma de los subsistemas propios
+      del juego). "shared" es lo que el juego comparte con los demás juegos del mismo
+      escenario (la topología compilada) o del mismo tamaño (tablas de vecindad de la
+      cuadrícula), y no se suma al total.
+
+    Comportamiento:
+    - Cada objeto se cuenta una sola vez, en el primer subsistema que lo alcanza; las
+      referencias entre subsistemas (observadores, el modelo dentro de cada agente) no se
+      cuentan de nuevo.
+    """
+    subsystems = [
+        ("board", [model.board]),
+        ("edges", [model.edges]),
+        ("grid_structure", [model.grid_structure, model.ouf_of_bounds_grid_structure,
+                            model.building_cells, model.doors]),
+        ("fire_frontier", [model.frontier]),
+        ("shockwave_rays", [model.rays]),
+        ("free_cells", [model.free_cells]),
+        ("navigation", [model.navigation]),
+        ("agents", [model.agents]),
+        ("grid", [model.grid]),
+        ("schedule", [model.schedule]),
+        ("pathing", [model.pathing]),
+        ("rng", [model.random, model.rng] + model.streams()),
+    ]
+    roots = [root for _, group in subsystems for root in group]
+    # Estructuras que el juego usa tal cual desde la topología (por ejemplo las celdas fuera de los límites)
+    shared = {id(value) for value in vars(model.topology).values()}
+    seen = ({id(model)} | {id(root) for root in roots}) - shared
+
+    report = {"shared": deep_sizeof(model.topology, seen)}
+    if isinstance(model.grid, Grid):
+        for table in _neighborhood_tables(model.grid.width, model.grid.height):
+            report["shared"] += deep_sizeof(table, seen)
+
+    for name, group in subsystems:
+        report[name] = sum(deep_sizeof(root, seen) for root in group
+                           if root is not None and not isinstance(root, _SKIP_TYPES) and id(root) not in shared)
+    # Lo que queda del modelo: contadores, bolsa de víctimas, listas de ids, etc.
+    report["model"] = deep_sizeof(model.__dict__, seen) + sys.getsizeof(model)
+    report["total"] = sum(value for name, value in report.items() if name != "shared")
+    return report
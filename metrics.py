@@ -0,0 +1,243 @@
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from step_log import PHASES
+
+# Variable de entorno que apaga las métricas del servidor ("0" = sin instrumentación)
+ENV_ENABLED = "FLASHPOINT_METRICS"
+
+# Límites (en segundos) de las cubetas de los histogramas de tiempo
+TIME_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_enabled() -> bool:
+    """
+    Indica si la instrumentación está encendida según ENV_ENABLED (por defecto sí).
+    """
+    return os.environ.get(ENV_ENABLED, "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """
+    Familia de series con el mismo nombre; cada combinación de valores de etiquetas es una
+    serie (ver labels).
+    """
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.children: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names:
+            self.children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """
+        Serie con los valores de etiquetas dados (en el orden de labels); se crea la primera vez.
+        Conviene guardar la serie en lugar de buscarla en cada medición.
+
+        Lanza:
+        - ValueError si el número de valores no coincide con las etiquetas.
+        """
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} espera las etiquetas {self.label_names}")
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    __slots__ = ("lock", "value")
+
+    def __init__(self, lock: threading.Lock):
+        self.lock = lock
+        self.value = 0
+
+    def inc(self, amount=1) -> None:
+        with self.lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """
+    Contador que solo crece. El nombre debe terminar en _total.
+    """
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild(self.lock)
+
+    def inc(self, amount=1) -> None:
+        self.children[()].inc(amount)
+
+    def samples(self):
+        return [(self.name, tuple(zip(self.label_names, key)), child.value) for key, child in self.children.items()]
+
+
+class Gauge(_Metric):
+    """
+    Valor que se lee al exportar las métricas con la función dada, que devuelve un número o
+    un diccionario {valores de etiquetas: número} si la métrica tiene etiquetas.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], object], labels: Sequence[str] = ()):
+        self.read = read
+        super().__init__(name, help, labels)
+
+    def _new_child(self):
+        return None
+
+    def samples(self):
+        value = self.read()
+        if not self.label_names:
+            return [(self.name, (), value)]
+        return [(self.name, tuple(zip(self.label_names, key)), child) for key, child in sorted(value.items())]
+
+
+class _HistogramChild:
+    __slots__ = ("lock", "bounds", "counts", "sum")
+
+    def __init__(self, lock: threading.Lock, bounds: Tuple[float, ...]):
+        self.lock = lock
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Una cubeta por límite más la de +Inf, sin acumular
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """
+    Histograma con cubetas fijas. Cada observación es una búsqueda binaria y dos sumas; las
+    cubetas se acumulan solo al exportar.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = TIME_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.lock, self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.children[()].observe(value)
+
+    def samples(self):
+        samples = []
+        for key, child in self.children.items():
+            labels = tuple(zip(self.label_names, key))
+            with self.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    """
+    Conjunto de métricas que se exportan juntas en el formato de texto de Prometheus.
+    """
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Agrega una métrica y la regresa.
+
+        Lanza:
+        - ValueError si ya hay una métrica con ese nombre.
+        """
+        if any(existing.name == metric.name for existing in self.metrics):
+            raise ValueError(f"Ya hay una métrica llamada {metric.name}")
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+
+class GameMetrics:
+    """
+    Métricas de la simulación que registra FlashPointModel (argumento metrics): tiempo de cada
+    fase del paso, explosiones, ondas de choque y conversiones de flashover. El tiempo de armar
+    y convertir el estado del juego lo anota el servidor en /game_state. Un modelo sin
+    GameMetrics solo paga una comparación con None por evento.
+    """
+
+    def __init__(self, registry: Registry):
+        self.step_seconds = registry.register(Histogram(
+            "flashpoint_step_seconds", "Duration of a whole game step."))
+        phase_seconds = registry.register(Histogram(
+            "flashpoint_step_phase_seconds", "Duration of each phase of a game step.", ("phase",)))
+        self.phases = [phase_seconds.labels(phase) for phase in PHASES]
+        self.explosions = registry.register(Counter(
+            "flashpoint_explosions_total", "Explosions caused by smoke landing on fire."))
+        self.shockwaves = registry.register(Counter(
+            "flashpoint_shockwaves_total", "Shockwaves travelling through burning cells."))
+        self.flashovers = registry.register(Counter(
+            "flashpoint_flashover_conversions_total", "Smoke cells turned into fire by flashover."))
+        serialize_seconds = registry.register(Histogram(
+            "flashpoint_serialize_seconds", "Time spent building and converting the game state.", ("stage",)))
+        self.state_seconds = serialize_seconds.labels("state")
+        self.convert_seconds = serialize_seconds.labels("convert")
+
+    def record(self, model, marks: List[float]) -> None:
+        """
+        Anota un paso terminado, con la misma interfaz que step_log.StepLogWriter.record.
+
+        Parámetros:
+        - model: FlashPointModel después de end_round.
+        - marks: Instantes (perf_counter) al inicio del paso y al terminar cada fase de PHASES.
+        """
+        for phase, start, end in zip(self.phases, marks, marks[1:]):
+            phase.observe(end - start)
+        self.step_seconds.observe(marks[-1] - marks[0])
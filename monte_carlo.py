@@ -0,0 +1,343 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from batch_engine import END_NAMES, END_POOL_EMPTY
+from board_topology import BoardTopology
+from file_parser import board_size, parse_game_config
+from FlashPoint_Backend import FlashPointModel, stream_seeds
+from flashpoint_env import end_reason
+from step_log import StepLogWriter
+
+# Resultados de un juego que se resumen (atributo de FlashPointModel -> nombre en el reporte)
+OUTCOMES = (("current_step", "steps"), ("rescued_victims", "rescued"), ("lost_victims", "lost"),
+            ("damage_markers", "damage"))
+
+# Contexto de cada proceso del pool (topología y parámetros), creado una sola vez por proceso
+_worker = None
+
+
+class RunningStat:
+    """
+    Media, varianza, mínimo y máximo de una serie de valores, actualizados en línea (Welford)
+    y combinables entre procesos (Chan et al.), sin guardar los valores.
+    """
+
+    __slots__ = ("n", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Suma de cuadrados de las desviaciones respecto a la media
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __getstate__(self):
+        return (self.n, self.mean, self.m2, self.min, self.max)
+
+    def __setstate__(self, state):
+        self.n, self.mean, self.m2, self.min, self.max = state
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'RunningStat') -> None:
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stderr(self) -> float:
+        return math.sqrt(self.variance / self.n) if self.n else math.inf
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"mean": self.mean, "std": math.sqrt(self.variance), "min": self.min, "max": self.max}
+
+
+class OutcomeStats:
+    """
+    Resumen en línea de muchos juegos: cuántos terminaron por cada motivo de check_game_over
+    (batch_engine.END_NAMES) y RunningStat de pasos, víctimas rescatadas y perdidas y
+    marcadores de daño. Ocupa lo mismo sin importar cuántos juegos resuma.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.reasons = [0] * len(END_NAMES)
+        self.stats = {name: RunningStat() for _, name in OUTCOMES}
+
+    def add(self, reason: int, outcome: Dict[str, int]) -> None:
+        """
+        Parámetros:
+        - reason: Motivo de fin (batch_engine.END_*).
+        - outcome: Valor de cada resultado de OUTCOMES, por nombre.
+        """
+        self.games += 1
+        self.reasons[reason] += 1
+        for name, stat in self.stats.items():
+            stat.add(outcome[name])
+
+    def merge(self, other: 'OutcomeStats') -> None:
+        self.games += other.games
+        self.reasons = [a + b for a, b in zip(self.reasons, other.reasons)]
+        for name, stat in self.stats.items():
+            stat.merge(other.stats[name])
+
+    def to_dict(self) -> Dict:
+        return {"games": self.games,
+                "reasons": {name: count for name, count in zip(END_NAMES, self.reasons)},
+                **{name: stat.to_dict() for name, stat in self.stats.items()}}
+
+    def to_state(self) -> Dict:
+        """
+        Estado completo del resumen con solo tipos de JSON, para guardarlo y combinarlo después
+        (ver from_state); a diferencia de to_dict, conserva m2 y no pierde precisión.
+        """
+        return {"games": self.games,
+                "reasons": {name: count for name, count in zip(END_NAMES, self.reasons) if count},
+                "stats": {name: stat.__getstate__() for name, stat in self.stats.items()}}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'OutcomeStats':
+        """
+        Reconstruye un resumen guardado con to_state.
+
+        Lanza:
+        - ValueError si el estado tiene motivos de fin o resultados desconocidos.
+        """
+        stats = cls()
+        try:
+            stats.games = int(state["games"])
+            for name, count in state["reasons"].items():
+                stats.reasons[END_NAMES.index(name)] = int(count)
+            for name, (n, mean, m2, low, high) in state["stats"].items():
+                stats.stats[name].__setstate__((int(n), float(mean), float(m2), float(low), float(high)))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Resumen inválido: {e}") from None
+        return stats
+
+    def format(self) -> str:
+        """
+        Resumen legible en una línea por dato.
+        """
+        lines = [f"games: {self.games}"]
+        for name, count in zip(END_NAMES, self.reasons):
+            if count:
+                lines.append(f"  {name}: {count} ({100.0 * count / self.games:.1f}%)")
+        for name, stat in self.stats.items():
+            lines.append(f"{name}: mean {stat.mean:.3f} ± {1.96 * stat.stderr:.3f} "
+                         f"(std {math.sqrt(stat.variance):.3f}, min {stat.min:g}, max {stat.max:g})")
+        return "\n".join(lines)
+
+
+class GameRunner:
+    """
+    Juega juegos completos de un escenario con las reglas fijas, reutilizando la topología
+    compilada del escenario en todos ellos.
+    """
+
+    def __init__(self, scenario: Dict, width: int = None, height: int = None, n_agents: int = 6, max_steps: int = 1000,
+                 params: Dict = None, split_streams: bool = False, step_log: StepLogWriter = None,
+                 topology: BoardTopology = None):
+        """
+        Parámetros:
+        - scenario: Escenario como lo devuelve file_parser.parse_game_config.
+        - width, height: Dimensiones del edificio; por defecto las de la matriz de paredes.
+        - n_agents: Bomberos por juego.
+        - max_steps: Pasos máximos por juego; los que llegan ahí cuentan como "running".
+        - params: Otros argumentos de FlashPointModel para todos los juegos (por ejemplo
+          max_pois o n_rescuers).
+        - split_streams: Si es True, cada juego separa sus tiradas de fuego, POIs y reaparición en
+          flujos propios derivados de la semilla (FlashPoint_Backend.stream_seeds), de modo que
+          juegos con la misma semilla y distintos parámetros ven las mismas tiradas.
+        - step_log: Registro en el que se anota cada paso de cada juego, con la semilla como
+          identificador del juego (ver step_log.py); None no registra nada.
+        - topology: Topología ya compilada del escenario (por ejemplo de
+          scenario_library.ScenarioLibrary), para no compilarla de nuevo.
+        """
+        self.scenario = scenario
+        self.params = dict(params or {})
+        if topology is None:
+            default_width, default_height = board_size(scenario)
+            width, height = width or default_width, height or default_height
+            topology = BoardTopology(width, height, scenario["wall_matrix"], scenario["doors"], scenario["exits"],
+                                     quiet=True)
+        self.topology = topology
+        self.n_agents = n_agents
+        self.max_steps = max_steps
+        self.split_streams = split_streams
+        self.step_log = step_log
+
+    def new_game(self, seed: int, params: Dict = None) -> FlashPointModel:
+        """
+        Crea un juego con la semilla dada; params reemplaza argumentos de FlashPointModel
+        (incluido n_agents) solo para este juego.
+        """
+        kwargs = {"n_agents": self.n_agents, **self.params, **(params or {})}
+        if self.split_streams:
+            kwargs["streams"] = stream_seeds(seed)
+        if self.step_log is not None:
+            kwargs.update(step_log=self.step_log, game_id=seed)
+        return FlashPointModel(self.topology.width, self.topology.height, None, self.scenario["victims"],
+                               self.scenario["fire"], None, None, topology=self.topology, seed=seed, quiet=True,
+                               **kwargs)
+
+    def play_game(self, seed: int, params: Dict = None) -> Tuple[int, Dict[str, int]]:
+        """
+        Juega un juego completo.
+
+        Retorna:
+        - (motivo de fin batch_engine.END_*, valor de cada resultado de OUTCOMES por nombre).
+        """
+        model = self.new_game(seed, params)
+        reason = None
+        try:
+            while model.running and model.current_step < self.max_steps:
+                model.play_round()
+        except IndexError:
+            reason = END_POOL_EMPTY  # Se agotó la bolsa de víctimas (ver FlashPointModel.add_victim)
+        if reason is None:
+            reason = end_reason(model)
+        return reason, {name: getattr(model, attr) for attr, name in OUTCOMES}
+
+    def play(self, seed: int, stats: OutcomeStats) -> None:
+        """
+        Juega un juego con la semilla dada y lo agrega a stats.
+        """
+        stats.add(*self.play_game(seed))
+
+    def play_range(self, seeds: range) -> OutcomeStats:
+        stats = OutcomeStats()
+        for seed in seeds:
+            self.play(seed, stats)
+        if self.step_log is not None:
+            self.step_log.flush()  # Los procesos del pool terminan sin cerrar el registro
+        return stats
+
+
+def _init_worker(step_log: Optional[str], *args) -> None:
+    global _worker
+    _worker = GameRunner(*args, step_log=_open_step_log(step_log))
+
+
+def _open_step_log(path: Optional[str]) -> Optional[StepLogWriter]:
+    # Cada proceso escribe en su propio directorio dentro de path (ver step_log.step_log_parts)
+    return StepLogWriter(os.path.join(path, f"part-{os.getpid()}")) if path else None
+
+
+def _play_chunk(seeds: range) -> OutcomeStats:
+    return _worker.play_range(seeds)
+
+
+def _chunks(seed: int, games: int, chunk_size: int) -> Iterator[range]:
+    for start in range(0, games, chunk_size):
+        yield range(seed + start, seed + min(start + chunk_size, games))
+
+
+def run_monte_carlo(scenario: Dict, games: int, seed: int = 0, workers: Optional[int] = None, chunk_size: int = 64,
+                    width: int = None, height: int = None, n_agents: int = 6, max_steps: int = 1000,
+                    on_progress: Callable[[OutcomeStats], None] = None, step_log: str = None) -> OutcomeStats:
+    """
+    Juega games juegos de un escenario repartidos en un pool de procesos.
+
+    Parámetros:
+    - scenario: Escenario como lo devuelve file_parser.parse_game_config.
+    - games: Número de juegos; el juego i usa la semilla seed + i.
+    - workers: Procesos del pool (por defecto uno por CPU); 0 juega en este proceso.
+    - chunk_size: Juegos por tarea del pool.
+    - width, height, n_agents, max_steps: Como en GameRunner.
+    - on_progress: Se llama con el resumen acumulado cada vez que termina una tarea.
+    - step_log: Directorio en el que cada proceso anota cada paso de sus juegos, en su propio
+      registro part-<pid> (ver step_log.py); None no registra nada.
+
+    Retorna:
+    - El resumen de todos los juegos.
+
+    Comportamiento:
+    - Cada proceso compila la topología del escenario una sola vez y devuelve solo el resumen
+      de cada tarea, así que la memoria no crece con el número de juegos.
+    """
+    total = OutcomeStats()
+    args = (scenario, width, height, n_agents, max_steps)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0:
+        runner = GameRunner(*args, step_log=_open_step_log(step_log))
+        try:
+            for partial in map(runner.play_range, _chunks(seed, games, chunk_size)):
+                total.merge(partial)
+                if on_progress is not None:
+                    on_progress(total)
+        finally:
+            if runner.step_log is not None:
+                runner.step_log.close()
+        return total
+    with get_context().Pool(workers, initializer=_init_worker, initargs=(step_log,) + args) as pool:
+        for partial in pool.imap_unordered(_play_chunk, _chunks(seed, games, chunk_size)):
+            total.merge(partial)
+            if on_progress is not None:
+                on_progress(total)
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Juega muchos juegos de Flash Point con las reglas fijas y resume los resultados.")
+    parser.add_argument("scenario", nargs="?", default="input.txt", help="Archivo del escenario (por defecto input.txt)")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="Número de juegos")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Semilla del primer juego (el juego i usa seed + i)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos (por defecto uno por CPU; 0 = sin pool)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Juegos por tarea del pool")
+    parser.add_argument("--agents", type=int, default=6, help="Bomberos por juego")
+    parser.add_argument("--max-steps", type=int, default=1000, help="Pasos máximos por juego")
+    parser.add_argument("--width", type=int, default=None, help="Ancho del edificio (por defecto el de la matriz de paredes)")
+    parser.add_argument("--height", type=int, default=None, help="Altura del edificio (por defecto la de la matriz de paredes)")
+    parser.add_argument("--report-every", type=int, default=0, help="Muestra el resumen parcial cada tantos juegos en stderr")
+    parser.add_argument("--json", action="store_true", help="Imprime el resumen final como JSON")
+    parser.add_argument("--step-log", default=None, help="Directorio en el que se registra cada paso de cada juego")
+    args = parser.parse_args(argv)
+
+    scenario = parse_game_config(args.scenario)
+    start = time.perf_counter()
+    next_report = args.report_every
+
+    def progress(stats: OutcomeStats) -> None:
+        nonlocal next_report
+        if args.report_every and stats.games >= next_report:
+            rate = stats.games / (time.perf_counter() - start)
+            print(f"--- {stats.games}/{args.games} juegos ({rate:.0f} juegos/s) ---\n{stats.format()}", file=sys.stderr)
+            next_report += args.report_every
+
+    stats = run_monte_carlo(scenario, args.games, args.seed, args.workers, args.chunk_size, args.width, args.height,
+                            args.agents, args.max_steps, progress, args.step_log)
+    if args.json:
+        print(json.dumps(stats.to_dict(), indent=2))
+    else:
+        print(stats.format())
+        print(f"elapsed: {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from board_state import OPPOSITE, POI_PRESENT, POI_REVEALED, BoardState
+
+INF = 1 << 30
+NO_STEP = 255  # Marca de celda sin camino hacia un objetivo
+
+# Campos de distancia disponibles
+FIELD_EXITS = "exits"  # Salidas (para bomberos que cargan una víctima)
+FIELD_FIRE = "fire"  # Celdas con fuego
+FIELD_POIS = "pois"  # Puntos de interés sin revelar
+
+FIRE_SURCHARGE = 1  # Costo extra por entrar a una celda con fuego (igual que en FirefighterAgent.move)
+
+
+class DistanceField:
+    """
+    Distancias al objetivo más cercano para todas las celdas del edificio.
+
+    step guarda, por celda, la dirección del primer paso del camino más barato, y version
+    la versión del tablero con la que se calculó el campo.
+    """
+
+    __slots__ = ("dist", "step", "version")
+
+    def __init__(self, dist: List[int], step: bytearray, version: Tuple[int, ...]):
+        self.dist = dist
+        self.step = step
+        self.version = version
+
+
+class NavigationFields:
+    """
+    Campos de distancia multi-fuente compartidos por todos los bomberos de un tablero.
+
+    Los costos son los de grid_structure (camino 1, puerta 2, pared 5) más un recargo por
+    entrar al fuego; el campo de salidas no cruza el fuego, porque un bombero con una víctima
+    no puede entrar a una celda en llamas. Cada campo se recalcula solo cuando cambia la
+    versión de las aristas, del fuego o de los puntos de interés de la que depende, así que
+    las consultas de los agentes son búsquedas en O(1).
+    """
+
+    def __init__(self, board: BoardState, exits: Iterable[Tuple[int, int]]):
+        """
+        Parámetros:
+        - board: Tablero del modelo.
+        - exits: Posiciones de salida.
+        """
+        self.board = board
+        self.exits = [board.cell_id(pos) for pos in exits if board.in_building(pos)]
+        self.fields: Dict[str, DistanceField] = {}
+        self.rebuilds = 0  # Número de campos recalculados (para medir la reutilización)
+
+    def fork(self, board: BoardState) -> 'NavigationFields':
+        """
+        Crea los campos de un tablero copiado con fork. Los campos ya calculados no se modifican
+        nunca, así que se comparten hasta que la copia cambie de versión.
+        """
+        fields = NavigationFields.__new__(NavigationFields)
+        fields.board = board
+        fields.exits = self.exits
+        fields.fields = dict(self.fields)
+        fields.rebuilds = 0
+        return fields
+
+    def reset(self) -> None:
+        """
+        Descarta los campos calculados (por ejemplo, después de restaurar el tablero completo).
+        """
+        self.fields = {}
+
+    def version(self, name: str) -> Tuple[int, ...]:
+        """
+        Devuelve la versión del tablero de la que depende un campo.
+        """
+        board = self.board
+        if name == FIELD_POIS:
+            return (board.edge_version, board.fire.version, board.pois.version)
+        return (board.edge_version, board.fire.version)
+
+    def sources(self, name: str) -> List[int]:
+        board = self.board
+        if name == FIELD_EXITS:
+            return self.exits
+        if name == FIELD_FIRE:
+            return [cid for cid in board.fire.iter_ids() if board.building[cid]]
+        if name == FIELD_POIS:
+            cells = board.pois.cells
+            return [cid for cid in board.pois.iter_ids() if cells[cid] & (POI_PRESENT | POI_REVEALED) == POI_PRESENT]
+        raise ValueError(f"Campo de navegación desconocido: {name}")
+
+    def field(self, name: str) -> DistanceField:
+        """
+        Devuelve un campo de distancia, recalculándolo si el tablero cambió desde la última vez.
+
+        Parámetros:
+        - name: FIELD_EXITS, FIELD_FIRE o FIELD_POIS.
+        """
+        version = self.version(name)
+        field = self.fields.get(name)
+        if field is None or field.version != version:
+            field = self.build(name, version)
+            self.fields[name] = field
+        return field
+
+    def build(self, name: str, version: Tuple[int, ...]) -> DistanceField:
+        """
+        Calcula un campo con Dijkstra desde todos los objetivos a la vez.
+        """
+        board = self.board
+        neighbors, edge_cost, building, fire = board.neighbors, board.edge_cost, board.building, board.fire.cells
+        avoid_fire = name == FIELD_EXITS
+        dist = [INF] * board.n_cells
+        step = bytearray([NO_STEP]) * board.n_cells
+        heap = []
+        for cid in self.sources(name):
+            dist[cid] = 0
+            heap.append((0, cid))
+        heapq.heapify(heap)
+
+        while heap:
+            d_v, v = heapq.heappop(heap)
+            if d_v > dist[v]:
+                continue
+            # Costo de entrar a v desde una vecina
+            if fire[v]:
+                if avoid_fire and d_v > 0:
+                    continue
+                enter = FIRE_SURCHARGE
+            else:
+                enter = 0
+            for d in range(4):
+                u = neighbors[v * 4 + d]
+                if u < 0 or not building[u]:
+                    continue
+                back = OPPOSITE[d]  # Dirección de u hacia v
+                candidate = d_v + edge_cost[u * 4 + back] + enter
+                if candidate < dist[u]:
+                    dist[u] = candidate
+                    step[u] = back
+                    heapq.heappush(heap, (candidate, u))
+
+        self.rebuilds += 1
+        return DistanceField(dist, step, version)
+
+    def next_step(self, name: str, pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """
+        Devuelve la siguiente celda del camino más barato hacia el objetivo más cercano.
+
+        Parámetros:
+        - name: Campo a consultar.
+        - pos: Posición actual del bombero.
+
+        Retorna:
+        - La posición vecina a la que conviene moverse, o None si ya está en un objetivo
+          o no hay camino.
+        """
+        cid = self.board.cell_id(pos)
+        if cid < 0:
+            return None
+        d = self.field(name).step[cid]
+        if d == NO_STEP:
+            return None
+        return self.board.positions[self.board.neighbors[cid * 4 + d]]
+
+    def distance(self, name: str, pos: Tuple[int, int]) -> int:
+        """
+        Devuelve el costo del camino más barato hacia el objetivo más cercano (INF si no hay).
+        """
+        cid = self.board.cell_id(pos)
+        return self.field(name).dist[cid] if cid >= 0 else INF
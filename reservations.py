@@ -0,0 +1,245 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from navigation import FIELD_EXITS, FIRE_SURCHARGE, INF, NavigationFields
+
+WAIT_COST = 1  # Costo de quedarse en la misma celda un paso
+
+
+class ReservationTable:
+    """
+    Tabla espacio-tiempo de reservaciones: qué bombero ocupará cada celda en cada paso.
+
+    Las claves son enteros t * n_cells + cid para no crear tuplas en cada consulta.
+    """
+
+    def __init__(self, n_cells: int):
+        self.n_cells = n_cells
+        self.slots: Dict[int, int] = {}  # Clave (celda, paso) -> id del bombero
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def key(self, cid: int, t: int) -> int:
+        return t * self.n_cells + cid
+
+    def owner(self, cid: int, t: int) -> Optional[int]:
+        return self.slots.get(t * self.n_cells + cid)
+
+    def reserve(self, cid: int, t: int, agent_id: int) -> int:
+        key = t * self.n_cells + cid
+        self.slots[key] = agent_id
+        return key
+
+    def release(self, key: int, agent_id: int) -> None:
+        if self.slots.get(key) == agent_id:
+            del self.slots[key]
+
+
+class PathPlan:
+    """
+    Camino reservado por un bombero: cells[k] es la celda en el paso start + k.
+    """
+
+    __slots__ = ("field", "end_dist", "start", "cells", "keys", "released")
+
+    def __init__(self, field: str, end_dist: int, start: int, cells: List[int], keys: List[int]):
+        self.field = field
+        self.end_dist = end_dist  # Distancia al objetivo desde la última celda al planear
+        self.start = start
+        self.cells = cells
+        self.keys = keys  # Claves reservadas, alineadas con cells
+        self.released = 0  # Claves ya liberadas al inicio de keys
+
+
+class CooperativePathing:
+    """
+    Planificación cooperativa de caminos para los bomberos.
+
+    Cada bombero planea con A* espacio-tiempo sobre un horizonte corto, usando el campo de
+    distancia compartido como heurística, evita las celdas y los intercambios reservados por
+    los demás y reserva su propio camino (y su celda final hasta el horizonte). Un plan se
+    reutiliza en los pasos siguientes mientras el bombero lo vaya cumpliendo y el resto del
+    camino siga siendo válido, aunque el fuego haya cambiado en otras partes del tablero.
+    """
+
+    def __init__(self, model, navigation: NavigationFields, horizon: int = 8):
+        """
+        Parámetros:
+        - model: FlashPointModel (se usa su paso actual como reloj).
+        - navigation: Campos de distancia compartidos del modelo.
+        - horizon: Número de pasos que se planean y reservan hacia adelante.
+        """
+        self.model = model
+        self.navigation = navigation
+        self.board = navigation.board
+        self.horizon = horizon
+        self.table = ReservationTable(self.board.n_cells)
+        self.plans: Dict[int, PathPlan] = {}
+        self.replans = 0  # Número de planes calculados
+        self.reuses = 0  # Número de pasos servidos por un plan existente
+
+    def next_move(self, agent, field: str) -> Optional[Tuple[int, int]]:
+        """
+        Devuelve la siguiente celda del plan del bombero, planeando de nuevo si hace falta.
+
+        Parámetros:
+        - agent: Bombero que se mueve.
+        - field: Campo de navegación hacia el que se dirige.
+
+        Retorna:
+        - La posición a la que debe moverse, su posición actual si el plan indica esperar,
+          o None si no hay camino.
+        """
+        now = self.model.current_step
+        cid = self.board.cell_id(agent.position)
+        if cid < 0:
+            return None
+        plan = self.plans.get(agent.unique_id)
+        if plan is not None:
+            self.release_past(agent.unique_id, plan, now)
+            i = now - plan.start
+            if (plan.field == field and 0 <= i < len(plan.cells) - 1 and plan.cells[i] == cid
+                    and self.still_valid(plan, i)):
+                self.reuses += 1
+                return self.board.positions[plan.cells[i + 1]]
+            self.forget(agent.unique_id)
+
+        plan = self.plan(agent.unique_id, cid, now, field)
+        if plan is None:
+            return None
+        self.plans[agent.unique_id] = plan
+        if len(plan.cells) < 2:
+            return None
+        return self.board.positions[plan.cells[1]]
+
+    def still_valid(self, plan: PathPlan, i: int) -> bool:
+        """
+        Indica si el resto de un plan se puede seguir usando.
+
+        El plan deja de servir si su última celda quedó más lejos del objetivo que al planear
+        (por ejemplo, porque se apagó el fuego al que iba) o si un bombero con víctima tendría
+        que cruzar una celda que ahora tiene fuego.
+        """
+        dist = self.navigation.field(plan.field).dist
+        if dist[plan.cells[-1]] > plan.end_dist:
+            return False
+        if plan.field == FIELD_EXITS:
+            fire = self.board.fire.cells
+            return not any(fire[cid] for cid in plan.cells[i + 1:])
+        return True
+
+    def release_past(self, agent_id: int, plan: PathPlan, now: int) -> None:
+        """
+        Libera las reservaciones del plan que ya quedaron en el pasado.
+        """
+        while plan.released < len(plan.keys) and plan.start + plan.released < now:
+            self.table.release(plan.keys[plan.released], agent_id)
+            plan.released += 1
+
+    def release_expired(self, now: int) -> None:
+        """
+        Libera las reservaciones pasadas de todos los planes, incluidos los de bomberos que
+        dejaron de navegar, para que la tabla no crezca con el tiempo.
+        """
+        for agent_id, plan in self.plans.items():
+            self.release_past(agent_id, plan, now)
+
+    def forget(self, agent_id: int) -> None:
+        """
+        Descarta el plan de un bombero y libera todas sus reservaciones.
+        """
+        plan = self.plans.pop(agent_id, None)
+        if plan is None:
+            return
+        for key in plan.keys[plan.released:]:
+            self.table.release(key, agent_id)
+
+    def blocked(self, agent_id: int, cid: int, target: int, t: int) -> bool:
+        """
+        Indica si moverse de cid a target entre los pasos t y t + 1 choca con otra reservación.
+        """
+        owner = self.table.owner(target, t + 1)
+        if owner is not None and owner != agent_id:
+            return True
+        if target == cid:
+            return False
+        # Intercambio: otro bombero va de target a cid en el mismo paso
+        other = self.table.owner(target, t)
+        return other is not None and other != agent_id and self.table.owner(cid, t + 1) == other
+
+    def plan(self, agent_id: int, start: int, now: int, field: str) -> Optional[PathPlan]:
+        """
+        Planea con A* espacio-tiempo y reserva el camino resultante.
+
+        Retorna:
+        - El plan reservado, o None si el bombero no tiene camino hacia el campo.
+        """
+        board = self.board
+        neighbors, edge_cost, building, fire = board.neighbors, board.edge_cost, board.building, board.fire.cells
+        dist = self.navigation.field(field).dist
+        if dist[start] >= INF:
+            return None
+        avoid_fire = field == FIELD_EXITS
+        horizon = now + self.horizon
+
+        # Estados: (f, g, t, celda); came_from usa la clave de la tabla de reservaciones
+        table = self.table
+        start_key = table.key(start, now)
+        came_from = {start_key: -1}
+        best_g = {start_key: 0}
+        heap = [(dist[start], 0, now, start)]
+        goal = None
+        fallback = (INF, start_key)
+        while heap:
+            f, g, t, cid = heapq.heappop(heap)
+            key = table.key(cid, t)
+            if g > best_g.get(key, INF):
+                continue
+            if dist[cid] == 0:
+                goal = key
+                break
+            if t == horizon:
+                if f < fallback[0]:
+                    fallback = (f, key)
+                continue
+            for d in range(5):
+                if d == 4:
+                    target, step_cost = cid, WAIT_COST
+                else:
+                    target = neighbors[cid * 4 + d]
+                    if target < 0 or not building[target]:
+                        continue
+                    if fire[target]:
+                        if avoid_fire:
+                            continue
+                        step_cost = edge_cost[cid * 4 + d] + FIRE_SURCHARGE
+                    else:
+                        step_cost = edge_cost[cid * 4 + d]
+                if dist[target] >= INF or self.blocked(agent_id, cid, target, t):
+                    continue
+                next_key = table.key(target, t + 1)
+                next_g = g + step_cost
+                if next_g < best_g.get(next_key, INF):
+                    best_g[next_key] = next_g
+                    came_from[next_key] = key
+                    heapq.heappush(heap, (next_g + dist[target], next_g, t + 1, target))
+
+        end = goal if goal is not None else fallback[1]
+        cells = []
+        key = end
+        while key != -1:
+            cells.append(key % board.n_cells)
+            key = came_from[key]
+        cells.reverse()
+
+        # Estaciona al bombero en su última celda hasta el horizonte
+        last = cells[-1]
+        while len(cells) <= self.horizon:
+            if self.table.owner(last, now + len(cells)) not in (None, agent_id):
+                break
+            cells.append(last)
+
+        keys = [self.table.reserve(c, now + k, agent_id) for k, c in enumerate(cells)]
+        self.replans += 1
+        return PathPlan(field, dist[last], now, cells, keys)
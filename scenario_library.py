@@ -0,0 +1,324 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from multiprocessing import get_context
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from board_topology import BoardTopology
+from file_parser import board_size, parse_game_config
+from FlashPoint_Backend import FlashPointModel
+from monte_carlo import GameRunner, OutcomeStats
+
+MAGIC = b"FPSL"
+FORMAT_VERSION = 1
+
+# Encabezado del archivo: magia, versión, número de tableros, posición del índice
+_HEADER = struct.Struct("<4sH2xQQ")  # 24 bytes: los tableros empiezan alineados a 8
+# Entrada del índice por tablero: posición, bytes del escenario, bytes de la topología compilada
+_ENTRY = struct.Struct("<QII")
+# Encabezado de un escenario: ancho, alto, víctimas, fuego, puertas, salidas
+_SCENARIO = struct.Struct("<HHIIII")
+
+# Paredes de una celda como en wall_matrix ("1100" = arriba e izquierda) por máscara de bits
+_WALL_STRINGS = tuple("".join("1" if mask >> bit & 1 else "0" for bit in range(4)) for mask in range(16))
+
+# Contexto de cada proceso del pool: la biblioteca abierta y los GameRunner por tablero
+_worker = None
+
+
+def _align(size: int) -> int:
+    return -size % 8
+
+
+def pack_scenario(scenario: Dict, width: int, height: int) -> bytes:
+    """
+    Serializa un escenario en binario: encabezado, máscara de paredes por celda y tablas de
+    enteros de 16 bits con víctimas (x, y, es víctima), fuego (x, y), puertas (x1, y1, x2, y2)
+    y salidas (x, y).
+
+    Parámetros:
+    - scenario: Escenario como lo devuelve file_parser.parse_game_config.
+    - width, height: Dimensiones del edificio.
+    """
+    walls = bytes(sum(1 << bit for bit in range(4) if cell[bit] == "1")
+                  for row in scenario["wall_matrix"][:height] for cell in row[:width])
+    if len(walls) != width * height:
+        raise ValueError(f"wall_matrix no es de {height}x{width}")
+    tables = array("H")
+    for (x, y), is_victim in scenario["victims"]:
+        tables.extend((x, y, 1 if is_victim else 0))
+    for x, y in scenario["fire"]:
+        tables.extend((x, y))
+    for (x1, y1), (x2, y2) in scenario["doors"]:
+        tables.extend((x1, y1, x2, y2))
+    for x, y in scenario["exits"]:
+        tables.extend((x, y))
+    if sys.byteorder != "little":
+        tables.byteswap()
+    header = _SCENARIO.pack(width, height, len(scenario["victims"]), len(scenario["fire"]), len(scenario["doors"]),
+                            len(scenario["exits"]))
+    return header + tables.tobytes() + walls
+
+
+def unpack_scenario(buffer) -> Tuple[Dict, int, int]:
+    """
+    Lee un escenario serializado con pack_scenario.
+
+    Retorna:
+    - (escenario como lo devuelve file_parser.parse_game_config, ancho, alto).
+    """
+    view = memoryview(buffer)
+    width, height, n_victims, n_fire, n_doors, n_exits = _SCENARIO.unpack_from(view, 0)
+    offset = _SCENARIO.size
+    n_values = 3 * n_victims + 2 * n_fire + 4 * n_doors + 2 * n_exits
+    tables = array("H")
+    tables.frombytes(view[offset:offset + 2 * n_values])
+    if sys.byteorder != "little":
+        tables.byteswap()
+    walls = view[offset + 2 * n_values:offset + 2 * n_values + width * height]
+
+    def take(count: int, size: int) -> List[Tuple[int, ...]]:
+        nonlocal position
+        rows = [tuple(tables[position + i * size:position + (i + 1) * size]) for i in range(count)]
+        position += count * size
+        return rows
+
+    position = 0
+    victims = [((x, y), bool(is_victim)) for x, y, is_victim in take(n_victims, 3)]
+    fire = take(n_fire, 2)
+    doors = [((x1, y1), (x2, y2)) for x1, y1, x2, y2 in take(n_doors, 4)]
+    exits = take(n_exits, 2)
+    wall_matrix = [[_WALL_STRINGS[walls[row * width + col]] for col in range(width)] for row in range(height)]
+    scenario = {"wall_matrix": wall_matrix, "victims": victims, "fire": fire, "doors": doors, "exits": exits}
+    return scenario, width, height
+
+
+def write_library(path: str, boards: Iterable[Tuple[Dict, int, int]]) -> int:
+    """
+    Escribe una biblioteca de tableros en un solo archivo binario.
+
+    Parámetros:
+    - path: Archivo de salida.
+    - boards: (escenario, ancho, alto) de cada tablero; se escriben uno a uno, así que puede
+      ser un generador con miles de tableros.
+
+    Retorna:
+    - El número de tableros escritos.
+
+    Comportamiento:
+    - Cada tablero guarda su escenario y su topología compilada (BoardTopology.to_bytes),
+      alineados a 8 bytes, y el índice con sus posiciones va al final del archivo.
+    """
+    index = []
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        offset = _HEADER.size
+        for scenario, width, height in boards:
+            packed = pack_scenario(scenario, width, height)
+            compiled = BoardTopology(width, height, scenario["wall_matrix"], scenario["doors"], scenario["exits"],
+                                     quiet=True).to_bytes()
+            record = packed + bytes(_align(len(packed))) + compiled
+            record += bytes(_align(len(record)))
+            f.write(record)
+            index.append(_ENTRY.pack(offset, len(packed), len(compiled)))
+            offset += len(record)
+        f.write(b"".join(index))
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index), offset))
+    return len(index)
+
+
+class ScenarioLibrary:
+    """
+    Biblioteca de tableros escrita con write_library, abierta con mmap: leer un tablero no
+    parsea texto ni compila su topología, cuyas tablas son vistas sobre el archivo mapeado.
+    """
+
+    def __init__(self, path: str):
+        """
+        Lanza:
+        - ValueError si el archivo no es una biblioteca de esta versión.
+        """
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        if len(self.map) < _HEADER.size:
+            raise ValueError("Biblioteca de escenarios incompleta")
+        magic, version, count, index_offset = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Formato de biblioteca de escenarios desconocido")
+        if index_offset + count * _ENTRY.size > len(self.map):
+            raise ValueError("Biblioteca de escenarios incompleta")
+        self.count = count
+        self.index_offset = index_offset
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _entry(self, index: int) -> Tuple[int, int, int]:
+        if not 0 <= index < self.count:
+            raise IndexError(f"Tablero {index} fuera de la biblioteca ({self.count} tableros)")
+        return _ENTRY.unpack_from(self.map, self.index_offset + index * _ENTRY.size)
+
+    def scenario(self, index: int) -> Tuple[Dict, int, int]:
+        """
+        Retorna:
+        - (escenario como lo devuelve file_parser.parse_game_config, ancho, alto) del tablero.
+        """
+        offset, size, _ = self._entry(index)
+        return unpack_scenario(memoryview(self.map)[offset:offset + size])
+
+    def topology(self, index: int) -> BoardTopology:
+        """
+        Topología compilada del tablero, con sus tablas sobre el archivo mapeado (sin copiarlas).
+        """
+        offset, size, compiled = self._entry(index)
+        start = offset + size + _align(size)
+        return BoardTopology.from_buffer(memoryview(self.map)[start:start + compiled])
+
+    def new_model(self, index: int, **kwargs) -> FlashPointModel:
+        """
+        Crea un juego del tablero.
+
+        Parámetros:
+        - kwargs: Otros argumentos de FlashPointModel (n_agents, seed, ...).
+        """
+        scenario, _, _ = self.scenario(index)
+        topology = self.topology(index)
+        return FlashPointModel(topology.width, topology.height, None, scenario["victims"], scenario["fire"], None,
+                               None, topology=topology, **kwargs)
+
+    def runner(self, index: int, **kwargs) -> GameRunner:
+        """
+        GameRunner del tablero, con su topología ya compilada; kwargs como en GameRunner.
+        """
+        scenario, width, height = self.scenario(index)
+        return GameRunner(scenario, width, height, topology=self.topology(index), **kwargs)
+
+    def close(self) -> None:
+        """
+        Cierra el archivo. Si todavía hay topologías vivas, el mapeo se libera con la última.
+        """
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self) -> 'ScenarioLibrary':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _init_worker(path: str, n_agents: int, max_steps: int) -> None:
+    global _worker
+    _worker = (ScenarioLibrary(path), n_agents, max_steps, {})
+
+
+def _play_board(job: Tuple[int, range]) -> Tuple[int, OutcomeStats]:
+    library, n_agents, max_steps, runners = _worker
+    index, seeds = job
+    if index not in runners:
+        runners.clear()  # Los trabajos llegan en orden de tablero: basta el último
+        runners[index] = library.runner(index, n_agents=n_agents, max_steps=max_steps)
+    return index, runners[index].play_range(seeds)
+
+
+def run_library(path: str, games: int, boards: Sequence[int] = None, seed: int = 0, workers: Optional[int] = None,
+                chunk_size: int = 64, n_agents: int = 6, max_steps: int = 1000) -> List[Tuple[int, OutcomeStats]]:
+    """
+    Juega games juegos (semillas seed .. seed + games - 1) en cada tablero de una biblioteca.
+
+    Parámetros:
+    - path: Archivo de la biblioteca.
+    - boards: Índices de los tableros; por defecto todos.
+    - workers, chunk_size, n_agents, max_steps: Como en monte_carlo.run_monte_carlo.
+
+    Retorna:
+    - [(índice, resumen)] en el orden de boards.
+    """
+    if boards is None:
+        with ScenarioLibrary(path) as library:
+            boards = range(len(library))
+    jobs = [(index, range(start, min(start + chunk_size, seed + games)))
+            for index in boards for start in range(seed, seed + games, chunk_size)]
+    totals = {index: OutcomeStats() for index in boards}
+    args = (path, n_agents, max_steps)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0:
+        _init_worker(*args)
+        partials = map(_play_board, jobs)
+        for index, stats in partials:
+            totals[index].merge(stats)
+    else:
+        with get_context().Pool(workers, initializer=_init_worker, initargs=args) as pool:
+            for index, stats in pool.imap_unordered(_play_board, jobs):
+                totals[index].merge(stats)
+    return [(index, totals[index]) for index in boards]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bibliotecas binarias de tableros de Flash Point.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack", help="Empaqueta archivos de escenario en una biblioteca")
+    pack.add_argument("output", help="Archivo de la biblioteca")
+    pack.add_argument("scenarios", nargs="+", help="Archivos de escenario")
+    pack.add_argument("--width", type=int, default=None, help="Ancho del edificio (por defecto el de la matriz de paredes)")
+    pack.add_argument("--height", type=int, default=None, help="Altura del edificio (por defecto la de la matriz de paredes)")
+
+    info = commands.add_parser("info", help="Muestra los tableros de una biblioteca")
+    info.add_argument("library", help="Archivo de la biblioteca")
+
+    run = commands.add_parser("run", help="Juega los tableros de una biblioteca")
+    run.add_argument("library", help="Archivo de la biblioteca")
+    run.add_argument("-n", "--games", type=int, default=100, help="Juegos por tablero")
+    run.add_argument("-b", "--board", type=int, action="append", default=None, help="Índice de tablero (se puede repetir)")
+    run.add_argument("-s", "--seed", type=int, default=0, help="Semilla del primer juego de cada tablero")
+    run.add_argument("-w", "--workers", type=int, default=None, help="Procesos (por defecto uno por CPU; 0 = sin pool)")
+    run.add_argument("--chunk-size", type=int, default=64, help="Juegos por tarea del pool")
+    run.add_argument("--agents", type=int, default=6, help="Bomberos por juego")
+    run.add_argument("--max-steps", type=int, default=1000, help="Pasos máximos por juego")
+    run.add_argument("--json", action="store_true", help="Imprime los resultados como JSON")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "pack":
+        def boards():
+            for path in args.scenarios:
+                scenario = parse_game_config(path)
+                width, height = board_size(scenario)
+                yield scenario, args.width or width, args.height or height
+
+        count = write_library(args.output, boards())
+        print(f"packed {count} boards into {args.output} ({os.path.getsize(args.output)} bytes)")
+    elif args.command == "info":
+        with ScenarioLibrary(args.library) as library:
+            for index in range(len(library)):
+                scenario, width, height = library.scenario(index)
+                print(f"{index}: {width}x{height}, {len(scenario['victims'])} POIs, {len(scenario['fire'])} fire, "
+                      f"{len(scenario['doors'])} doors, {len(scenario['exits'])} exits")
+        return 0
+    else:
+        results = run_library(args.library, args.games, args.board, args.seed, args.workers, args.chunk_size,
+                              args.agents, args.max_steps)
+        if args.json:
+            print(json.dumps([{"board": index, **stats.to_dict()} for index, stats in results], indent=2))
+            return 0
+        for index, stats in results:
+            rescued = stats.stats["rescued"]
+            print(f"{index}: {stats.games} games, rescued {rescued.mean:.3f} ± {1.96 * rescued.stderr:.3f}, "
+                  f"damage {stats.stats['damage'].mean:.2f}, steps {stats.stats['steps'].mean:.1f}")
+    print(f"elapsed: {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,54 @@
-from flask import Flask, request, jsonify
+import os
+from time import perf_counter
+from flask import Flask, Response, g, request, jsonify
 from FlashPoint_Backend import FlashPointModel
-from file_parser import parse_game_config
+from file_parser import board_size, parse_game_config
+from metrics import CONTENT_TYPE, Counter, GameMetrics, Gauge, Histogram, Registry, metrics_enabled
 
 app = Flask(__name__)
 
 # Global variable to store the current game state
 current_game = None
 
+# Checkpoint the running game every CHECKPOINT_EVERY steps so another worker can resume it
+CHECKPOINT_PATH = os.environ.get('FLASHPOINT_CHECKPOINT', 'game.ckpt')
+CHECKPOINT_EVERY = int(os.environ.get('FLASHPOINT_CHECKPOINT_EVERY', '10'))
+
+# Prometheus metrics, served on /metrics; FLASHPOINT_METRICS=0 leaves the game and the routes
+# uninstrumented (game_metrics is None and no request hooks are installed)
+METRICS_ENABLED = metrics_enabled()
+registry = Registry()
+game_metrics = GameMetrics(registry) if METRICS_ENABLED else None
+request_seconds = registry.register(Histogram(
+    'flashpoint_request_seconds', 'Latency of each HTTP route.', ('route', 'method', 'status')))
+games_started = registry.register(Counter(
+    'flashpoint_games_started_total', 'Games started or restored.', ('source',)))
+registry.register(Gauge(
+    'flashpoint_games_active', 'Games in progress.',
+    lambda: int(current_game is not None and current_game.running)))
+registry.register(Gauge(
+    'flashpoint_game_step', 'Current step of the loaded game.',
+    lambda: current_game.current_step if current_game is not None else 0))
+
+def save_checkpoint(game):
+    # Write to a temporary file first so a crash never leaves a truncated checkpoint
+    tmp_path = CHECKPOINT_PATH + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(game.save_checkpoint())
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+def new_game(file_path):
+    # Build a fresh game from the scenario file
+    config = parse_game_config(file_path)
+    width, height = board_size(config)
+    wall_matrix = config['wall_matrix']
+    victims = config['victims']
+    fire = config['fire']
+    doors = config['doors']
+    exits = config['exits']
+    n_agents = 6
+    return FlashPointModel(width, height, wall_matrix, victims, fire, doors, exits, n_agents, metrics=game_metrics)
+
 def convert_to_json_compatible(obj):
     # Converts complex Python data types to JSON-compatible types.
     if isinstance(obj, dict):
@@ -30,17 +72,9 @@ def start_game():
     file_path = 'input.txt'
     
     try:
-        config = parse_game_config(file_path)
-        width = 8
-        height = 6
-        wall_matrix = config['wall_matrix']
-        victims = config['victims']
-        fire = config['fire']
-        doors = config['doors']
-        exits = config['exits']
-        n_agents = 6
-        
-        current_game = FlashPointModel(width, height, wall_matrix, victims, fire, doors, exits, n_agents)
+        current_game = new_game(file_path)
+        if METRICS_ENABLED:
+            games_started.labels('start').inc()
         return jsonify({"message": "Game started successfully"}), 200
     except FileNotFoundError:
         return jsonify({"error": f"Config file not found: {file_path}"}), 404
@@ -56,11 +90,39 @@ def step():
         return jsonify({"error": "No game in progress"}), 400
     
     try:
+        previous_step = current_game.current_step
         current_game.step()
+        # A finished game does not advance, so only checkpoint steps that actually ran
+        advanced = current_game.current_step != previous_step
+        if advanced and CHECKPOINT_EVERY > 0 and current_game.current_step % CHECKPOINT_EVERY == 0:
+            save_checkpoint(current_game)
         return jsonify({"message": "Simulation advanced by one step"}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to perform step: {str(e)}"}), 500
 
+@app.route('/restore_game', methods=['POST'])
+def restore_game():
+    global current_game
+
+    # Resume the last checkpointed game (the scenario file must be the same one it started from)
+    file_path = 'input.txt'
+
+    try:
+        with open(CHECKPOINT_PATH, 'rb') as f:
+            data = f.read()
+        game = new_game(file_path)
+        game.load_checkpoint(data)
+        current_game = game
+        if METRICS_ENABLED:
+            games_started.labels('restore').inc()
+        return jsonify({"message": "Game restored successfully", "step": current_game.current_step}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": f"File not found: {e.filename}"}), 404
+    except ValueError as e:
+        return jsonify({"error": f"Invalid checkpoint: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to restore game: {str(e)}"}), 500
+
 @app.route('/game_state', methods=['GET'])
 def game_state():
     global current_game
@@ -69,13 +131,38 @@ def game_state():
     
     try:
         # Get the game state
+        start = perf_counter()
         game_state = current_game.get_game_state()
+        converted = perf_counter()
         # Convert complex data types to JSON-compatible types
         game_state_json_compatible = convert_to_json_compatible(game_state)
+        if game_metrics is not None:
+            game_metrics.state_seconds.observe(converted - start)
+            game_metrics.convert_seconds.observe(perf_counter() - converted)
         # Return the converted game state
         return jsonify(game_state_json_compatible), 200
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve game state: {str(e)}"}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+if METRICS_ENABLED:
+    @app.before_request
+    def start_timer():
+        g.request_start = perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            # Label by route rule, not raw path, so unknown URLs share one series
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            request_seconds.labels(route, request.method, response.status_code).observe(perf_counter() - start)
+        return response
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,120 @@
+from typing import List
+
+from board_state import BoardState
+
+# Direcciones horizontales (izquierda, derecha); las demás recorren columnas
+HORIZONTAL = (False, True, False, True)
+
+
+class ShockwaveRays:
+    """
+    Índice de rayos para resolver ondas de choque.
+
+    Para cada (celda, dirección) guarda la última celda con fuego que se alcanza avanzando en
+    esa dirección sin cruzar una pared o puerta cerrada; la siguiente celda es donde se detiene
+    la onda. Los resultados se comprimen a lo largo del camino, por lo que una consulta cuesta
+    O(1) amortizado. Cada fila y columna tiene una época: extinguir fuego o cerrar una arista
+    invalida solo los rayos de esa línea, y las extensiones (fuego nuevo, paredes destruidas)
+    se detectan al validar el extremo guardado.
+    """
+
+    def __init__(self, board: BoardState):
+        """
+        Parámetros:
+        - board: Tablero cuyas capas de fuego y aristas se observan.
+        """
+        self.board = board
+        self.row_of = [cid // board.cols for cid in range(board.n_cells)]
+        self.col_of = [cid % board.cols for cid in range(board.n_cells)]
+        self.run_end: List[int] = [-1] * (board.n_cells * 4)  # Última celda con fuego del rayo
+        self.stamp: List[int] = [-1] * (board.n_cells * 4)  # Época de la línea al guardar run_end
+        self.line_epoch: List[int] = [0] * (board.rows + board.cols)  # Filas y después columnas
+        board.fire.watchers.append(self)
+        board.edge_watchers.append(self)
+
+    def fork(self, board: BoardState) -> 'ShockwaveRays':
+        """
+        Copia el índice para un tablero copiado con BoardState.fork; los rayos guardados siguen
+        siendo válidos porque el fuego y las aristas son los mismos.
+        """
+        rays = ShockwaveRays.__new__(ShockwaveRays)
+        rays.board = board
+        rays.row_of = self.row_of
+        rays.col_of = self.col_of
+        rays.run_end = self.run_end[:]
+        rays.stamp = self.stamp[:]
+        rays.line_epoch = self.line_epoch[:]
+        board.fire.watchers.append(rays)
+        board.edge_watchers.append(rays)
+        return rays
+
+    def line(self, cid: int, direction: int) -> int:
+        """
+        Devuelve el índice de la fila o columna que recorre el rayo.
+        """
+        if HORIZONTAL[direction]:
+            return self.row_of[cid]
+        return self.board.rows + self.col_of[cid]
+
+    def reset(self) -> None:
+        """
+        Invalida todos los rayos (por ejemplo, después de restaurar el tablero completo).
+        """
+        self.line_epoch = [epoch + 1 for epoch in self.line_epoch]
+
+    def find(self, cid: int, direction: int) -> int:
+        """
+        Busca dónde se detiene una onda de choque que sale de una celda.
+
+        Parámetros:
+        - cid: Id de la celda de origen (normalmente con fuego).
+        - direction: Índice de la dirección (ver board_state.DIRECTIONS).
+
+        Retorna:
+        - El id de la última celda con fuego antes de la parada. La parada está en su vecina
+          en esa dirección: fuera del tablero, detrás de una pared o puerta cerrada, o en una
+          celda sin fuego.
+        """
+        board = self.board
+        neighbors, edge_cost, fire = board.neighbors, board.edge_cost, board.fire.cells
+        run_end, stamp = self.run_end, self.stamp
+        epoch = self.line_epoch[self.line(cid, direction)]
+
+        path = []
+        current = cid
+        while True:
+            half = current * 4 + direction
+            cached = run_end[half]
+            if cached >= 0 and cached != current and stamp[half] == epoch:
+                # Todo el tramo hasta cached sigue ardiendo: se salta y se valida su extremo
+                path.append(current)
+                current = cached
+                continue
+            neighbor = neighbors[half]
+            cost = edge_cost[half]
+            if neighbor < 0 or cost == 5 or cost == 2 or not fire[neighbor]:
+                break
+            path.append(current)
+            current = neighbor
+
+        # Compresión de caminos: todo el recorrido apunta al extremo encontrado
+        run_end[current * 4 + direction] = current
+        stamp[current * 4 + direction] = epoch
+        for visited in path:
+            run_end[visited * 4 + direction] = current
+            stamp[visited * 4 + direction] = epoch
+        return current
+
+    def cell_added(self, layer, cid: int) -> None:
+        # Más fuego solo alarga rayos; find lo detecta al validar el extremo guardado
+        return
+
+    def cell_removed(self, layer, cid: int) -> None:
+        # Extinguir fuego corta los rayos que cruzaban la celda en su fila y su columna
+        self.line_epoch[self.row_of[cid]] += 1
+        self.line_epoch[self.board.rows + self.col_of[cid]] += 1
+
+    def edge_changed(self, half: int, old_cost: int, new_cost: int) -> None:
+        closes = (new_cost == 5 or new_cost == 2) and not (old_cost == 5 or old_cost == 2)
+        if closes:
+            self.line_epoch[self.line(half // 4, half % 4)] += 1
@@ -0,0 +1,245 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+# Implementaciones disponibles de cuadrícula y scheduler
+BACKEND_BUILTIN = "builtin"  # Cuadrícula y scheduler mínimos de este módulo
+BACKEND_MESA = "mesa"  # MultiGrid y RandomActivation de Mesa (se importa solo si se pide)
+
+# Tablas de vecindad compartidas por todas las cuadrículas con las mismas dimensiones
+_NEIGHBORHOODS: Dict[Tuple[int, int], Tuple[List[Tuple], List[Tuple]]] = {}
+
+
+class Model:
+    """
+    Base mínima de un modelo, compatible con mesa.Model para lo que usa FlashPointModel.
+
+    Igual que Mesa, cada instancia recibe un generador random.Random propio, sembrado con
+    seed o, si no se da, con random.random(), de modo que random.seed(s) antes de construir
+    el modelo lo hace reproducible con cualquiera de las dos implementaciones.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        obj = object.__new__(cls)
+        obj._seed = kwargs.get("seed")
+        if obj._seed is None:
+            obj._seed = random.random()
+        obj.random = random.Random(obj._seed)
+        return obj
+
+    def __init__(self, *args, **kwargs):
+        self.running = True
+        self.schedule = None
+        self.current_id = 0
+
+
+class Agent:
+    """
+    Base mínima de un agente, compatible con mesa.Agent. Usa __slots__ para que las
+    subclases que también los declaren no tengan un __dict__ por instancia.
+    """
+
+    __slots__ = ("unique_id", "model", "pos")
+
+    def __init__(self, unique_id: int, model: Model):
+        self.unique_id = unique_id
+        self.model = model
+        self.pos: Optional[Tuple[int, int]] = None
+
+    @property
+    def random(self) -> random.Random:
+        return self.model.random
+
+    def step(self) -> None:
+        return
+
+    def advance(self) -> None:
+        return
+
+
+def _neighborhood_tables(width: int, height: int) -> Tuple[List[Tuple], List[Tuple]]:
+    """
+    Devuelve las vecindades de von Neumann de radio 1 (sin y con el centro) de cada celda,
+    en el mismo orden que Mesa, calculadas una sola vez por dimensiones.
+    """
+    key = (width, height)
+    tables = _NEIGHBORHOODS.get(key)
+    if tables is None:
+        without_center, with_center = [], []
+        for x in range(width):
+            for y in range(height):
+                cells = []
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        nx, ny = x + dx, y + dy
+                        if abs(dx) + abs(dy) <= 1 and 0 <= nx < width and 0 <= ny < height:
+                            cells.append((nx, ny))
+                with_center.append(tuple(cells))
+                cells.remove((x, y))
+                without_center.append(tuple(cells))
+        tables = (without_center, with_center)
+        _NEIGHBORHOODS[key] = tables
+    return tables
+
+
+class Grid:
+    """
+    Cuadrícula mínima que admite varios agentes por celda (como mesa.space.MultiGrid sin torus).
+
+    Las vecindades de cada celda están precalculadas y se comparten entre cuadrículas de las
+    mismas dimensiones; la ocupación es un arreglo de conteos y el contenido de las celdas un
+    diccionario disperso, así que crear una cuadrícula nueva cuesta O(celdas) en memset.
+    """
+
+    def __init__(self, width: int, height: int, torus: bool = False):
+        """
+        Parámetros:
+        - width, height: Dimensiones (como en Mesa: x en [0, width), y en [0, height)).
+        - torus: Solo se admite False.
+        """
+        if torus:
+            raise ValueError("La cuadrícula integrada no admite torus")
+        self.width = width
+        self.height = height
+        self.torus = False
+        self.num_cells = width * height
+        self._neighbors, self._neighbors_center = _neighborhood_tables(width, height)
+        self.occupancy = bytearray(self.num_cells)  # Agentes por celda (saturado en 255)
+        self._contents: Dict[int, List[Agent]] = {}  # Agentes de cada celda ocupada
+
+    def _index(self, pos: Tuple[int, int]) -> int:
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise Exception("The `pos` tuple passed is out of bounds.")
+        return x * self.height + y
+
+    def out_of_bounds(self, pos: Tuple[int, int]) -> bool:
+        x, y = pos
+        return x < 0 or x >= self.width or y < 0 or y >= self.height
+
+    def get_neighborhood(self, pos: Tuple[int, int], moore: bool = False, include_center: bool = False,
+                         radius: int = 1) -> Tuple[Tuple[int, int], ...]:
+        """
+        Devuelve las posiciones vecinas de pos (solo vecindad de von Neumann de radio 1).
+        """
+        if moore or radius != 1:
+            raise ValueError("La cuadrícula integrada solo precalcula vecindades de von Neumann de radio 1")
+        index = self._index(pos)
+        return self._neighbors_center[index] if include_center else self._neighbors[index]
+
+    def is_cell_empty(self, pos: Tuple[int, int]) -> bool:
+        return self.occupancy[self._index(pos)] == 0
+
+    def get_cell_list_contents(self, cell_list) -> List[Agent]:
+        if isinstance(cell_list, tuple) and len(cell_list) == 2 and isinstance(cell_list[0], int):
+            cell_list = [cell_list]
+        agents = []
+        for pos in cell_list:
+            agents.extend(self._contents.get(self._index(pos), ()))
+        return agents
+
+    def place_agent(self, agent: Agent, pos: Tuple[int, int]) -> None:
+        index = self._index(pos)
+        contents = self._contents.setdefault(index, [])
+        if agent not in contents:
+            contents.append(agent)
+            if self.occupancy[index] < 255:
+                self.occupancy[index] += 1
+        agent.pos = pos
+
+    def remove_agent(self, agent: Agent) -> None:
+        index = self._index(agent.pos)
+        contents = self._contents[index]
+        contents.remove(agent)
+        if not contents:
+            del self._contents[index]
+            self.occupancy[index] = 0
+        elif self.occupancy[index] < 255:
+            self.occupancy[index] -= 1
+        agent.pos = None
+
+    def move_agent(self, agent: Agent, pos: Tuple[int, int]) -> None:
+        self.remove_agent(agent)
+        self.place_agent(agent, pos)
+
+
+class RandomActivation:
+    """
+    Scheduler mínimo que activa a cada agente una vez por paso en orden aleatorio.
+
+    Reproduce mesa.time.RandomActivation: el orden se baraja con model.random sobre la lista
+    de ids en orden de inserción, y los agentes eliminados durante el paso se saltan.
+    """
+
+    def __init__(self, model: Model):
+        self.model = model
+        self.steps = 0
+        self.time = 0
+        self._agents: Dict[int, Agent] = {}
+
+    def add(self, agent: Agent) -> None:
+        if agent.unique_id in self._agents:
+            raise Exception(f"Agent with unique id {agent.unique_id!r} already added to scheduler")
+        self._agents[agent.unique_id] = agent
+
+    def remove(self, agent: Agent) -> None:
+        del self._agents[agent.unique_id]
+
+    def get_agent_count(self) -> int:
+        return len(self._agents)
+
+    @property
+    def agents(self) -> List[Agent]:
+        return list(self._agents.values())
+
+    def step(self) -> None:
+        keys = list(self._agents)
+        self.model.random.shuffle(keys)
+        agents = self._agents
+        for key in keys:
+            agent = agents.get(key)
+            if agent is not None:
+                agent.step()
+        self.steps += 1
+        self.time += 1
+
+
+def make_grid(backend: str, width: int, height: int):
+    """
+    Crea una cuadrícula sin torus con la implementación pedida.
+
+    Parámetros:
+    - backend: BACKEND_BUILTIN o BACKEND_MESA.
+    - width, height: Dimensiones de la cuadrícula.
+    """
+    if backend == BACKEND_BUILTIN:
+        return Grid(width, height)
+    if backend == BACKEND_MESA:
+        from mesa.space import MultiGrid
+        return MultiGrid(width, height, torus=False)
+    raise ValueError(f"Implementación desconocida: {backend}")
+
+
+def make_scheduler(backend: str, model: Model):
+    """
+    Crea un scheduler de activación aleatoria con la implementación pedida.
+    """
+    if backend == BACKEND_BUILTIN:
+        return RandomActivation(model)
+    if backend == BACKEND_MESA:
+        from mesa.time import RandomActivation as MesaRandomActivation
+        return MesaRandomActivation(model)
+    raise ValueError(f"Implementación desconocida: {backend}")
+
+
+def empty_grid_like(grid):
+    """
+    Crea una cuadrícula vacía con la misma implementación y dimensiones que grid (para fork).
+    """
+    if isinstance(grid, Grid):
+        return Grid(grid.width, grid.height)
+    # MultiGrid de Mesa: se copia sin recalcular su caché de vecindades, que solo depende de las dimensiones
+    clone = type(grid).__new__(type(grid))
+    clone.__dict__.update(grid.__dict__)
+    clone._grid = [[[] for _ in column] for column in grid._grid]
+    clone._empties_built = False
+    return clone
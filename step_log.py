@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+from array import array
+from typing import Dict, List
+
+import numpy as np
+
+# Fases de un paso cronometradas en el registro (ver FlashPointModel.play_round)
+PHASES = ("agents", "fire", "victims", "pois", "game_over")
+
+# Columnas del registro: (nombre, código de array, tipo de NumPy)
+COLUMNS = (
+    ("game", "I", "u4"),  # Identificador del juego (la semilla en monte_carlo)
+    ("step", "I", "u4"),  # Paso terminado (current_step antes de avanzar)
+    ("fire", "I", "u4"),  # Celdas con fuego
+    ("smoke", "I", "u4"),  # Celdas con humo
+    ("damage", "H", "u2"),  # Marcadores de daño
+    ("rescued", "B", "u1"),  # Víctimas rescatadas
+    ("lost", "B", "u1"),  # Víctimas perdidas
+    ("agents", "H", "u2"),  # Bomberos en el tablero
+) + tuple((f"t_{phase}", "f", "f4") for phase in PHASES)  # Segundos de cada fase
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 2
+
+
+def _schema() -> Dict:
+    return {"version": FORMAT_VERSION, "byteorder": sys.byteorder,
+            "columns": [[name, dtype] for name, _, dtype in COLUMNS]}
+
+
+class StepLogWriter:
+    """
+    Registro de solo anexado con un renglón de ancho fijo por paso de juego, guardado por
+    columnas: un archivo binario crudo por columna en un directorio, más schema.json con sus
+    tipos. Los renglones se acumulan en arreglos tipados y se escriben por bloques, así que
+    registrar un paso no crea objetos por renglón ni JSON.
+
+    Un directorio tiene un solo escritor; varios procesos escriben cada uno en su propio
+    directorio (ver monte_carlo.run_monte_carlo).
+    """
+
+    def __init__(self, path: str, buffer_rows: int = 4096):
+        """
+        Parámetros:
+        - path: Directorio del registro; si ya existe, los renglones nuevos se agregan al final.
+        - buffer_rows: Renglones que se acumulan antes de escribir.
+
+        Lanza:
+        - ValueError si el directorio tiene un registro con otras columnas.
+        """
+        os.makedirs(path, exist_ok=True)
+        schema_path = os.path.join(path, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                if json.load(f) != _schema():
+                    raise ValueError(f"El registro en {path} tiene otro formato")
+        else:
+            with open(schema_path, "w") as f:
+                json.dump(_schema(), f)
+        self.path = path
+        self.buffer_rows = buffer_rows
+        self.buffers = [array(code) for _, code, _ in COLUMNS]
+        self.files = [open(os.path.join(path, f"{name}.bin"), "ab") for name, _, _ in COLUMNS]
+
+    def record(self, model, marks: List[float]) -> None:
+        """
+        Agrega el renglón del paso que acaba de terminar.
+
+        Parámetros:
+        - model: FlashPointModel después de end_round.
+        - marks: Instantes (perf_counter) al inicio del paso y al terminar cada fase de PHASES.
+        """
+        values = (model.game_id, model.current_step - 1, len(model.fire), len(model.smoke), model.damage_markers,
+                  model.rescued_victims, model.lost_victims, len(model.agents),
+                  *(end - start for start, end in zip(marks, marks[1:])))
+        for buffer, value in zip(self.buffers, values):
+            buffer.append(value)
+        if len(self.buffers[0]) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Escribe los renglones acumulados. Todas las columnas se escriben juntas, así que un
+        lector solo ve renglones incompletos si el proceso muere a la mitad de una escritura.
+        """
+        for buffer, f in zip(self.buffers, self.files):
+            buffer.tofile(f)
+            del buffer[:]
+            f.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for f in self.files:
+            f.close()
+
+    def __enter__(self) -> 'StepLogWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_step_log(path: str) -> Dict[str, np.ndarray]:
+    """
+    Abre un registro para leerlo sin copiarlo.
+
+    Parámetros:
+    - path: Directorio escrito por StepLogWriter.
+
+    Retorna:
+    - Un arreglo de NumPy mapeado en memoria (solo lectura) por columna, todos con el mismo
+      largo: el de los renglones completos.
+
+    Lanza:
+    - ValueError si el directorio no tiene un registro de esta versión.
+    """
+    try:
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"{path} no tiene un registro de pasos") from None
+    if schema.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Versión de registro desconocida en {path}")
+    order = "<" if schema["byteorder"] == "little" else ">"
+    dtypes = [(name, np.dtype(order + dtype)) for name, dtype in schema["columns"]]
+    rows = min(os.path.getsize(os.path.join(path, f"{name}.bin")) // dtype.itemsize for name, dtype in dtypes)
+    columns = {}
+    for name, dtype in dtypes:
+        if rows == 0:
+            columns[name] = np.empty(0, dtype)  # np.memmap no acepta archivos vacíos
+        else:
+            columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype, "r", shape=(rows,))
+    return columns
+
+
+def step_log_parts(path: str) -> List[str]:
+    """
+    Directorios de registro dentro de path (el propio path si es un registro), por ejemplo
+    los que escribe cada proceso de monte_carlo.run_monte_carlo.
+    """
+    if os.path.exists(os.path.join(path, SCHEMA_FILE)):
+        return [path]
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if os.path.exists(os.path.join(path, name, SCHEMA_FILE)))
@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import time
+from multiprocessing import get_context
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from batch_engine import END_NAMES, END_RESCUED
+from file_parser import board_size, parse_game_config
+from monte_carlo import OUTCOMES, GameRunner, OutcomeStats
+
+# Parámetros de FlashPointModel que se pueden barrer
+SWEEP_PARAMETERS = ("n_agents", "n_rescuers", "max_pois", "max_damage", "max_lost", "rescue_goal")
+
+# Módulos de los que dependen los resultados de un juego; cambiar cualquiera cambia la versión del código
+SIMULATION_MODULES = ("FlashPoint_Backend", "agent_registry", "board_state", "board_topology", "edge_store",
+                      "fire_frontier", "flashpoint_env", "free_cells", "lookahead", "monte_carlo", "navigation",
+                      "reservations", "shockwave_rays", "simcore")
+
+# Contexto de cada proceso del pool, creado una sola vez por proceso
+_worker = None
+
+# Resultado de un juego guardado en el caché: (semilla, motivo de fin, pasos, rescatadas, perdidas, daño)
+Row = Tuple[int, int, int, int, int, int]
+
+
+def code_version() -> str:
+    """
+    Huella de las fuentes de la simulación (SIMULATION_MODULES), para no reutilizar
+    resultados calculados con otra versión del código.
+    """
+    digest = hashlib.sha256()
+    for name in SIMULATION_MODULES:
+        module = sys.modules.get(name) or __import__(name)
+        with open(module.__file__, "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()[:16]
+
+
+def scenario_hash(scenario: Dict, width: int, height: int) -> str:
+    """
+    Huella de un escenario (paredes, POIs, fuego, puertas y salidas) y sus dimensiones.
+    """
+    data = json.dumps({"width": width, "height": height, **scenario}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+def params_key(params: Dict) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def expand_grid(grid: Dict[str, Sequence]) -> List[Dict]:
+    """
+    Expande una rejilla de parámetros en la lista de sus combinaciones.
+
+    Parámetros:
+    - grid: Valores de cada parámetro (nombres de SWEEP_PARAMETERS).
+
+    Retorna:
+    - Un diccionario de parámetros por combinación, en orden de los nombres y los valores.
+
+    Lanza:
+    - ValueError si un parámetro no se puede barrer.
+    """
+    unknown = set(grid) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+class ResultCache:
+    """
+    Resultados de juegos guardados en una base SQLite local, uno por (escenario, versión del
+    código, parámetros, semilla), para que repetir un barrido solo juegue lo que falta.
+    """
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "scenario TEXT NOT NULL, code TEXT NOT NULL, params TEXT NOT NULL, seed INTEGER NOT NULL, "
+            "reason INTEGER NOT NULL, steps INTEGER NOT NULL, rescued INTEGER NOT NULL, lost INTEGER NOT NULL, "
+            "damage INTEGER NOT NULL, PRIMARY KEY (scenario, code, params, seed)) WITHOUT ROWID")
+        self.connection.commit()
+
+    def missing(self, scenario: str, code: str, params: str, seeds: range) -> List[int]:
+        """
+        Devuelve las semillas de seeds que todavía no tienen resultado.
+        """
+        cursor = self.connection.execute(
+            "SELECT seed FROM results WHERE scenario = ? AND code = ? AND params = ? AND seed >= ? AND seed < ?",
+            (scenario, code, params, seeds.start, seeds.stop))
+        done = {seed for (seed,) in cursor}
+        return [seed for seed in seeds if seed not in done]
+
+    def store(self, scenario: str, code: str, params: str, rows: Iterable[Row]) -> None:
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((scenario, code, params) + tuple(row) for row in rows))
+        self.connection.commit()
+
+    def summarize(self, scenario: str, code: str, params: str, seeds: range) -> OutcomeStats:
+        """
+        Resume los resultados guardados para las semillas de seeds, sin cargarlos todos a la vez.
+        """
+        stats = OutcomeStats()
+        cursor = self.connection.execute(
+            "SELECT reason, steps, rescued, lost, damage FROM results "
+            "WHERE scenario = ? AND code = ? AND params = ? AND seed >= ? AND seed < ?",
+            (scenario, code, params, seeds.start, seeds.stop))
+        names = [name for _, name in OUTCOMES]
+        for reason, *values in cursor:
+            stats.add(reason, dict(zip(names, values)))
+        return stats
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def _init_worker(*args) -> None:
+    global _worker
+    _worker = GameRunner(*args)
+
+
+def _play_job(job: Tuple[Dict, List[int]]) -> Tuple[Dict, List[Row]]:
+    params, seeds = job
+    rows = []
+    for seed in seeds:
+        reason, outcome = _worker.play_game(seed, params)
+        rows.append((seed, reason) + tuple(outcome[name] for _, name in OUTCOMES))
+    return params, rows
+
+
+def run_sweep(scenario: Dict, grid: Dict[str, Sequence], games: int, seed: int = 0,
+              cache_path: str = "sweep_cache.sqlite", workers: Optional[int] = None, chunk_size: int = 64,
+              width: int = None, height: int = None, max_steps: int = 1000,
+              on_progress: Callable[[int, int], None] = None) -> Tuple[List[Tuple[Dict, OutcomeStats]], int]:
+    """
+    Juega games juegos (semillas seed .. seed + games - 1) por cada combinación de la rejilla,
+    reutilizando los resultados que ya están en el caché.
+
+    Parámetros:
+    - scenario: Escenario como lo devuelve file_parser.parse_game_config.
+    - grid: Valores de cada parámetro (ver expand_grid).
+    - cache_path: Archivo SQLite del caché.
+    - workers: Procesos del pool (por defecto uno por CPU); 0 juega en este proceso.
+    - chunk_size: Juegos por tarea del pool.
+    - width, height, max_steps: Como en monte_carlo.GameRunner.
+    - on_progress: Se llama con (juegos nuevos terminados, juegos nuevos en total) tras cada tarea.
+
+    Retorna:
+    - ([(parámetros, resumen)] en el orden de expand_grid, número de juegos que se jugaron).
+    """
+    cells = expand_grid(grid)
+    seeds = range(seed, seed + games)
+    default_width, default_height = board_size(scenario)
+    width, height = width or default_width, height or default_height
+    scenario_key = scenario_hash(scenario, width, height)
+    code = code_version()
+    cache = ResultCache(cache_path)
+
+    def key(params: Dict) -> str:
+        return params_key({**params, "max_steps": max_steps})  # El límite de pasos también cambia los resultados
+
+    try:
+        jobs = []
+        for params in cells:
+            missing = cache.missing(scenario_key, code, key(params), seeds)
+            jobs.extend((params, missing[i:i + chunk_size]) for i in range(0, len(missing), chunk_size))
+        total = sum(len(job_seeds) for _, job_seeds in jobs)
+        played = 0
+
+        def collect(results) -> None:
+            nonlocal played
+            for params, rows in results:
+                cache.store(scenario_key, code, key(params), rows)
+                played += len(rows)
+                if on_progress is not None:
+                    on_progress(played, total)
+
+        args = (scenario, width, height, 6, max_steps)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if jobs and workers == 0:
+            _init_worker(*args)
+            collect(map(_play_job, jobs))
+        elif jobs:
+            with get_context().Pool(min(workers, len(jobs)), initializer=_init_worker, initargs=args) as pool:
+                collect(pool.imap_unordered(_play_job, jobs))
+        return [(params, cache.summarize(scenario_key, code, key(params), seeds)) for params in cells], played
+    finally:
+        cache.close()
+
+
+def _parse_param(text: str) -> Tuple[str, List[int]]:
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"Se esperaba nombre=v1,v2,...: {text}")
+    return name, [int(value) for value in values.split(",")]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Barre parámetros de Flash Point con resultados guardados en disco.")
+    parser.add_argument("scenario", nargs="?", default="input.txt", help="Archivo del escenario (por defecto input.txt)")
+    parser.add_argument("-p", "--param", type=_parse_param, action="append", default=[],
+                        help=f"nombre=v1,v2,... con nombre en {', '.join(SWEEP_PARAMETERS)}")
+    parser.add_argument("-n", "--games", type=int, default=200, help="Juegos por combinación")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Semilla del primer juego de cada combinación")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos (por defecto uno por CPU; 0 = sin pool)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Juegos por tarea del pool")
+    parser.add_argument("--cache", default="sweep_cache.sqlite", help="Archivo SQLite con los resultados guardados")
+    parser.add_argument("--max-steps", type=int, default=1000, help="Pasos máximos por juego")
+    parser.add_argument("--width", type=int, default=None, help="Ancho del edificio (por defecto el de la matriz de paredes)")
+    parser.add_argument("--height", type=int, default=None, help="Altura del edificio (por defecto la de la matriz de paredes)")
+    parser.add_argument("--json", action="store_true", help="Imprime los resultados como JSON")
+    args = parser.parse_args(argv)
+
+    grid = dict(args.param)
+    try:
+        expand_grid(grid)
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    results, played = run_sweep(parse_game_config(args.scenario), grid, args.games, args.seed, args.cache,
+                                args.workers, args.chunk_size, args.width, args.height, args.max_steps)
+    if args.json:
+        print(json.dumps([{"params": params, **stats.to_dict()} for params, stats in results], indent=2))
+        return 0
+    for params, stats in results:
+        wins = stats.reasons[END_RESCUED] / stats.games if stats.games else 0.0
+        reasons = ", ".join(f"{name} {count}" for name, count in zip(END_NAMES, stats.reasons) if count)
+        rescued, lost = stats.stats["rescued"], stats.stats["lost"]
+        print(f"{params_key(params)}: {stats.games} games, win {100.0 * wins:.1f}%, "
+              f"rescued {rescued.mean:.3f} ± {1.96 * rescued.stderr:.3f}, lost {lost.mean:.3f} ± {1.96 * lost.stderr:.3f}, "
+              f"damage {stats.stats['damage'].mean:.2f}, steps {stats.stats['steps'].mean:.1f} [{reasons}]")
+    cached = sum(stats.games for _, stats in results) - played
+    print(f"played {played} games, {cached} from cache, {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())